@@ -1,15 +1,45 @@
-import sqlite3
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import json
 
+from database import get_pool, close_pool
+from search_index import install_search_indexes
+from kpi_store import install_kpi_store
+from ar_aging import install_ar_aging
+from migrations import migrate, schema_version
+from sales_rollups import monthly_sales, category_sales
+from stock_checkpoints import checkpoint, stock_rows
+import replenishment
+import forecasting
+import change_log
+
 class BusinessDatabase:
     def __init__(self, db_name='business_erp.db'):
-        self.conn = sqlite3.connect(db_name)
+        self.db_name = db_name
+        # Share the process-wide writer connection for this database file
+        self.pool = get_pool(db_name)
+        self.conn = self.pool.writer_connection
         self.cursor = self.conn.cursor()
-        self.create_tables()
+        
+        # Only a fresh or outdated database runs any DDL
+        started = time.perf_counter()
+        with self.pool.writer_lock:
+            self.applied_migrations = migrate(self.conn, baseline=self.create_tables)
+            # Stock checkpoints for the month ends that passed since the last open
+            with self.transaction():
+                checkpoint(self.conn)
+        self.startup_time = time.perf_counter() - started
+        print(f"Database ready in {self.startup_time * 1000:.1f} ms "
+              f"(schema version {schema_version(self.conn)}, {len(self.applied_migrations)} migrations applied)")
         
     def create_tables(self):
-        """Create all necessary tables for the business system"""
+        """Create all necessary tables for the business system
+        
+        This is the baseline schema (version 0); it runs inside the migration
+        transaction on databases that have never been versioned. Later schema
+        changes belong in migrations.MIGRATIONS.
+        """
         
         # 1. Employees/HR Module
         self.cursor.execute('''
@@ -401,13 +431,30 @@ class BusinessDatabase:
         )
         ''')
         
+        # 22. Document Number Sequences
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS document_sequences (
+            prefix TEXT NOT NULL,
+            period TEXT NOT NULL, -- YYYYMM
+            last_value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (prefix, period)
+        ) WITHOUT ROWID
+        ''')
+        
         # Create indexes for better performance
         self.create_indexes()
+
+        # Full-text search indexes for clients, suppliers and products
+        install_search_indexes(self.conn)
+        
+        # Materialized dashboard KPIs
+        install_kpi_store(self.conn)
+        
+        # Accounts receivable aging summary
+        install_ar_aging(self.conn)
         
         # Insert sample data
         self.insert_sample_data()
-        
-        self.conn.commit()
         print("Database and tables created successfully!")
     
     def create_indexes(self):
@@ -468,52 +515,72 @@ class BusinessDatabase:
                 VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (sku, name, desc, category, price, cost, 100))
             
-            self.conn.commit()
             print("Sample data inserted successfully!")
     
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Run a block atomically on the shared writer connection.
+        
+        Shares the pool's writer() nesting depth, so a block nested in either
+        joins the outermost one, which alone commits or rolls back (BEGIN
+        IMMEDIATE takes the write lock up front, so concurrent writers queue
+        instead of failing mid-way).
+        """
+        with self.pool.writer(immediate):
+            yield self.cursor
+    
+    # Prefix, table and number column for each numbered document type
+    DOCUMENT_TYPES = {
+        'quotation': ('QUOT', 'quotations', 'quotation_number'),
+        'sales_order': ('SO', 'sales_orders', 'order_number'),
+        'purchase_order': ('PO', 'purchase_orders', 'po_number'),
+    }
+    
+    def reserve_document_numbers(self, document_type, count=1):
+        """Atomically reserve count consecutive document numbers for this month"""
+        prefix, table, column = self.DOCUMENT_TYPES[document_type]
+        period = datetime.now().strftime('%Y%m')
+        
+        with self.transaction(immediate=True):
+            self.cursor.execute("SELECT 1 FROM document_sequences WHERE prefix = ? AND period = ?",
+                                (prefix, period))
+            if self.cursor.fetchone() is None:
+                # First number of the period: continue after any existing documents
+                self.cursor.execute(f'''
+                INSERT INTO document_sequences (prefix, period, last_value)
+                SELECT ?, ?, COUNT(*) FROM {table} WHERE {column} LIKE ?
+                ''', (prefix, period, f"{prefix}{period}%"))
+            
+            self.cursor.execute('''
+            UPDATE document_sequences SET last_value = last_value + ?
+            WHERE prefix = ? AND period = ?
+            RETURNING last_value
+            ''', (count, prefix, period))
+            last_value = self.cursor.fetchone()[0]
+        
+        return [f"{prefix}{period}{number:04d}" for number in range(last_value - count + 1, last_value + 1)]
+    
     def generate_quotation_number(self):
         """Generate unique quotation number"""
-        prefix = "QUOT"
-        year = datetime.now().year
-        month = datetime.now().strftime('%m')
-        
-        self.cursor.execute("SELECT COUNT(*) FROM quotations WHERE quotation_number LIKE ?", 
-                           (f"{prefix}{year}{month}%",))
-        count = self.cursor.fetchone()[0] + 1
-        
-        return f"{prefix}{year}{month}{count:04d}"
+        return self.reserve_document_numbers('quotation')[0]
     
     def generate_order_number(self):
         """Generate unique order number"""
-        prefix = "SO"
-        year = datetime.now().year
-        month = datetime.now().strftime('%m')
-        
-        self.cursor.execute("SELECT COUNT(*) FROM sales_orders WHERE order_number LIKE ?", 
-                           (f"{prefix}{year}{month}%",))
-        count = self.cursor.fetchone()[0] + 1
-        
-        return f"{prefix}{year}{month}{count:04d}"
+        return self.reserve_document_numbers('sales_order')[0]
     
     def generate_po_number(self):
         """Generate unique purchase order number"""
-        prefix = "PO"
-        year = datetime.now().year
-        month = datetime.now().strftime('%m')
-        
-        self.cursor.execute("SELECT COUNT(*) FROM purchase_orders WHERE po_number LIKE ?", 
-                           (f"{prefix}{year}{month}%",))
-        count = self.cursor.fetchone()[0] + 1
-        
-        return f"{prefix}{year}{month}{count:04d}"
+        return self.reserve_document_numbers('purchase_order')[0]
     
     def update_inventory(self, product_id, quantity_change, transaction_type, reference_id, reference_number, notes=""):
         """Update inventory and log transaction"""
-        # Get current stock
-        self.cursor.execute("SELECT current_stock, cost_price FROM products WHERE product_id = ?", (product_id,))
-        result = self.cursor.fetchone()
-        
-        if result:
+        with self.transaction(immediate=True):
+            # Get current stock
+            self.cursor.execute("SELECT current_stock, cost_price FROM products WHERE product_id = ?", (product_id,))
+            result = self.cursor.fetchone()
+            if not result:
+                return False
+            
             current_stock, unit_cost = result
             new_stock = current_stock + quantity_change
             
@@ -529,11 +596,68 @@ class BusinessDatabase:
             VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (product_id, transaction_type, reference_id, reference_number, quantity_change, unit_cost, notes))
             
-            return True
-        return False
+            self.pool.cache.invalidate('products', 'inventory_transactions')
+        return True
+    
+    def post_inventory_movements(self, movements):
+        """Apply a batch of stock movements in a single transaction
+        
+        movements is an iterable of (product_id, quantity_change, transaction_type,
+        reference_id, reference_number[, notes]) tuples. Deltas are aggregated per
+        product and applied with one set-based UPDATE; the ledger rows are written
+        with executemany. Movements for unknown products are skipped. Returns the
+        number of inventory transactions written.
+        """
+        ledger = []
+        deltas = {}
+        for movement in movements:
+            product_id, quantity_change, transaction_type, reference_id, reference_number = movement[:5]
+            notes = movement[5] if len(movement) > 5 else ""
+            deltas[product_id] = deltas.get(product_id, 0) + quantity_change
+            ledger.append((product_id, transaction_type, reference_id, reference_number,
+                           quantity_change, notes, product_id))
+        
+        if not ledger:
+            return 0
+        
+        with self.transaction(immediate=True):
+            self.cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS stock_deltas (
+                product_id INTEGER PRIMARY KEY,
+                delta INTEGER NOT NULL
+            )
+            ''')
+            self.cursor.execute("DELETE FROM temp.stock_deltas")
+            self.cursor.executemany("INSERT INTO temp.stock_deltas (product_id, delta) VALUES (?, ?)",
+                                    deltas.items())
+            
+            # Update product stock
+            self.cursor.execute('''
+            UPDATE products SET current_stock = current_stock + d.delta
+            FROM temp.stock_deltas d
+            WHERE products.product_id = d.product_id
+            ''')
+            
+            # Log inventory transactions, costed at the product's cost price
+            self.cursor.executemany('''
+            INSERT INTO inventory_transactions 
+            (product_id, transaction_type, reference_id, reference_number, quantity_change, unit_cost, notes)
+            SELECT ?, ?, ?, ?, ?, cost_price, ? FROM products WHERE product_id = ?
+            ''', ledger)
+            posted = self.cursor.rowcount
+            
+            self.cursor.execute("DELETE FROM temp.stock_deltas")
+            self.pool.cache.invalidate('products', 'inventory_transactions')
+        
+        return posted
     
-    def get_client_statement(self, client_id, start_date=None, end_date=None):
-        """Generate statement of accounts for a client"""
+    def get_client_statement(self, client_id, start_date=None, end_date=None, conn=None):
+        """Generate statement of accounts for a client
+        
+        conn is the connection to read from (e.g. a pool reader); the
+        writer connection by default. The same applies to the other get_
+        methods below.
+        """
         query = '''
         SELECT 
             i.invoice_number,
@@ -560,31 +684,31 @@ class BusinessDatabase:
         
         query += " GROUP BY i.invoice_id ORDER BY i.invoice_date DESC"
         
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        return (conn or self.conn).execute(query, params).fetchall()
     
-    def get_sales_statistics(self, start_date, end_date):
-        """Get sales statistics for the given period"""
-        query = '''
-        SELECT 
-            strftime('%Y-%m', i.invoice_date) as month,
-            COUNT(DISTINCT i.invoice_id) as invoice_count,
-            COUNT(DISTINCT o.client_id) as client_count,
-            SUM(i.grand_total) as total_sales,
-            AVG(i.grand_total) as avg_invoice_amount,
-            SUM(i.balance_due) as outstanding_amount
-        FROM invoices i
-        JOIN sales_orders o ON i.order_id = o.order_id
-        WHERE i.invoice_date BETWEEN ? AND ?
-        GROUP BY strftime('%Y-%m', i.invoice_date)
-        ORDER BY month
-        '''
+    def get_sales_statistics(self, start_date, end_date, conn=None):
+        """Get sales statistics for the given period
+        
+        Rows of (month, invoice_count, client_count, total_sales,
+        avg_invoice_amount, outstanding_amount), read from the sales rollups.
+        """
+        return [row[:6] for row in monthly_sales(conn or self.conn, start_date, end_date)]
+    
+    def get_category_sales(self, start_date, end_date, conn=None):
+        """Invoiced order lines per month and product category for the given period
         
-        self.cursor.execute(query, (start_date, end_date))
-        return self.cursor.fetchall()
+        Rows of (month, category, line_count, quantity, revenue), highest
+        revenue first within each month.
+        """
+        return category_sales(conn or self.conn, start_date, end_date)
     
-    def get_product_availability(self, product_id=None, category=None):
-        """Check product availability and stock levels"""
+    def get_product_availability(self, product_id=None, category=None, conn=None, cached=True):
+        """Check product availability and stock levels
+        
+        Served from the pool's result cache; stock writes made through
+        update_inventory and post_inventory_movements invalidate it, but only
+        in this process. Pass cached=False when other processes write stock.
+        """
         query = '''
         SELECT 
             p.product_id,
@@ -617,12 +741,56 @@ class BusinessDatabase:
         
         query += " ORDER BY p.current_stock ASC"
         
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        if not cached:
+            return (conn or self.conn).execute(query, params).fetchall()
+        return list(self.pool.cache.fetchall(conn or self.conn, query, params))
+    
+    def get_stock_on(self, as_of, product_id=None, conn=None):
+        """Stock of each product at the end of a past (UTC) date
+        
+        Rows of (product_id, sku, name, stock) in product order; the nearest
+        month-end checkpoint plus the ledger movements after it, so the cost
+        does not depend on how far back as_of is.
+        """
+        return stock_rows(conn or self.conn, as_of, [product_id] if product_id else None)
+    
+    def plan_replenishment(self, full=False):
+        """Re-plan reorder suggestions for the products changed since the last run
+        
+        Returns {supplier_id: [(product_id, quantity, unit_cost, lead_time_days)]}
+        for every product that should be reordered.
+        """
+        with self.transaction(immediate=True):
+            replenishment.plan(self.conn, full)
+        return replenishment.suggestions(self.conn)
     
+    def create_draft_purchase_orders(self, supplier_ids=None, created_by=None):
+        """Draft one purchase order per supplier from the reorder suggestions"""
+        return replenishment.draft_purchase_orders(self, supplier_ids, created_by)
+    
+    def forecast_sales(self, workers=1):
+        """Refresh sales_forecasts for every product and backfill completed periods
+        
+        workers > 1 fits product partitions on a process pool.
+        """
+        return forecasting.run(self, workers)
+
+    def get_changes(self, entity=None, entity_id=None, start_date=None, end_date=None, conn=None):
+        """Audit trail of client, supplier, product and employee records
+
+        Rows of (change_id, changed_at, entity, entity_id, operation, payload),
+        oldest first; see change_log.changes.
+        """
+        return change_log.changes(conn or self.conn, entity, entity_id, start_date, end_date)
+
+    def compact_change_log(self):
+        """Compress the change log payloads written since the last compaction"""
+        with self.transaction(immediate=True):
+            return change_log.compact(self.conn)
+
     def close(self):
         """Close database connection"""
-        self.conn.close()
+        close_pool(self.db_name)
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,345 @@
+"""Headless HTTP/JSON API over BusinessDatabase, built on asyncio.
+
+Lets POS terminals, scanners and scripts use the ERP alongside the Tk
+application. The event loop only parses requests and writes responses;
+every query runs on a bounded pool of reader threads, each borrowing a
+read-only connection from the database's ConnectionPool, and every write
+is queued to one writer thread, so writes are applied one at a time in
+arrival order instead of contending for the writer lock.
+
+    GET  /health
+    GET  /clients?after=&limit=&status=            keyset pages by client_id
+    GET  /clients/{id}
+    GET  /clients/{id}/statement?from=&to=
+    GET  /products?after=&limit=&category=         keyset pages by product_id
+    GET  /products/{id}/availability
+    GET  /availability?category=
+    GET  /sales/statistics?from=&to=
+    POST /inventory/movements                      {"movements": [{product_id, quantity_change, ...}]}
+
+List responses carry "next", the after= value of the following page, or
+null on the last page. Every GET response has an ETag; a request whose
+If-None-Match matches gets 304 Not Modified with no body. The availability
+endpoints bypass the result cache: the Tk application writes stock from
+another process, and its writes cannot invalidate this process's cache.
+
+Usage: python api_server.py [database] [port] [host]
+"""
+import asyncio
+import hashlib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+from keyset import KeysetQuery
+from report_engine import row_totals
+
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+MAX_BODY = 1 << 20
+
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+CLIENT_COLUMNS = ("client_id", "company_name", "contact_person", "email", "phone", "city", "country",
+                  "payment_terms", "credit_limit", "status")
+PRODUCT_COLUMNS = ("product_id", "sku", "name", "category", "unit_price", "unit_of_measure", "reorder_level",
+                   "current_stock", "supplier_id")
+AVAILABILITY_COLUMNS = ("product_id", "sku", "name", "category", "current_stock", "reorder_level", "unit_price",
+                        "stock_status", "supplier_name", "lead_time_days")
+STATEMENT_COLUMNS = ("invoice_number", "invoice_date", "due_date", "grand_total", "amount_paid", "balance_due",
+                     "status", "order_numbers")
+STATISTICS_COLUMNS = ("month", "invoice_count", "client_count", "total_sales", "avg_invoice_amount",
+                      "outstanding_amount")
+
+CLIENTS_SQL = f"SELECT {', '.join(CLIENT_COLUMNS)} FROM clients WHERE 1=1"
+PRODUCTS_SQL = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE 1=1"
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def records(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def int_param(query, name, default=None, minimum=None, maximum=None):
+    value = query.get(name, default)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be an integer")
+    if minimum is not None:
+        value = max(minimum, value)
+    return min(maximum, value) if maximum is not None else value
+
+
+def date_param(query, name, default):
+    value = query.get(name)
+    if value is None:
+        return default
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a YYYY-MM-DD date")
+
+
+def keyset_page(conn, query, select_sql, columns, filters):
+    """One page of a list endpoint, keyed on the first column"""
+    sql, params = select_sql, []
+    for column, value in filters.items():
+        if value is not None:
+            sql += f" AND {column} = ?"
+            params.append(value)
+    limit = int_param(query, 'limit', DEFAULT_LIMIT, 1, MAX_LIMIT)
+    after = int_param(query, 'after')
+    rows = KeysetQuery(sql, params, [(columns[0], 0)]).page(conn, None if after is None else (after,), limit)
+    return {'items': records(columns, rows), 'next': rows[-1][0] if len(rows) == limit else None}
+
+
+def entity_tag(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def tag_matches(header, tag):
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == tag for candidate in candidates)
+
+
+class APIServer:
+    """Routes requests to BusinessDatabase queries on worker threads"""
+
+    def __init__(self, db, read_workers=None):
+        self.db = db
+        self.pool = db.pool
+        # One reader thread per pooled read connection, so threads never wait for one
+        self.readers = ThreadPoolExecutor(read_workers or self.pool.max_readers, thread_name_prefix="api-reader")
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="api-writer")
+        self.server = None
+        self.requests = 0
+        self.not_modified = 0
+        self.routes = [
+            ("GET", r"/health", self.health),
+            ("GET", r"/clients", self.clients),
+            ("GET", r"/clients/(\d+)", self.client),
+            ("GET", r"/clients/(\d+)/statement", self.statement),
+            ("GET", r"/products", self.products),
+            ("GET", r"/products/(\d+)/availability", self.product_availability),
+            ("GET", r"/availability", self.availability),
+            ("GET", r"/sales/statistics", self.sales_statistics),
+            ("POST", r"/inventory/movements", self.post_movements),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in self.routes]
+
+    # Handlers: (conn, path arguments, query) -> JSON-serializable result; run on worker threads
+
+    def health(self, conn, query):
+        return {'status': 'ok', 'schema_version': conn.execute("PRAGMA user_version").fetchone()[0]}
+
+    def clients(self, conn, query):
+        return keyset_page(conn, query, CLIENTS_SQL, CLIENT_COLUMNS, {'status': query.get('status')})
+
+    def client(self, conn, query, client_id):
+        row = conn.execute(CLIENTS_SQL + " AND client_id = ?", (int(client_id),)).fetchone()
+        if row is None:
+            raise HTTPError(404, f"client {client_id} not found")
+        return dict(zip(CLIENT_COLUMNS, row))
+
+    def statement(self, conn, query, client_id):
+        today = date.today()
+        start = date_param(query, 'from', today.replace(month=1, day=1).isoformat())
+        end = date_param(query, 'to', today.isoformat())
+        rows = self.db.get_client_statement(int(client_id), start, end, conn=conn)
+        invoiced, paid, balance = row_totals(rows, 3, 4, 5)
+        return {'client_id': int(client_id), 'from': start, 'to': end, 'invoices': records(STATEMENT_COLUMNS, rows),
+                'totals': {'invoiced': invoiced, 'paid': paid, 'balance': balance}}
+
+    def products(self, conn, query):
+        return keyset_page(conn, query, PRODUCTS_SQL, PRODUCT_COLUMNS, {'category': query.get('category')})
+
+    def product_availability(self, conn, query, product_id):
+        rows = self.db.get_product_availability(int(product_id), conn=conn, cached=False)
+        if not rows:
+            raise HTTPError(404, f"product {product_id} not found")
+        return dict(zip(AVAILABILITY_COLUMNS, rows[0]))
+
+    def availability(self, conn, query):
+        if not query.get('category'):
+            raise HTTPError(400, "category is required; use /products/{id}/availability for one product")
+        return {'items': records(AVAILABILITY_COLUMNS,
+                                 self.db.get_product_availability(category=query['category'], conn=conn,
+                                                                  cached=False))}
+
+    def sales_statistics(self, conn, query):
+        today = date.today()
+        start = date_param(query, 'from', today.replace(year=today.year - 1, day=1).isoformat())
+        end = date_param(query, 'to', today.isoformat())
+        return {'from': start, 'to': end,
+                'months': records(STATISTICS_COLUMNS, self.db.get_sales_statistics(start, end, conn=conn))}
+
+    def post_movements(self, body):
+        """Runs on the writer thread"""
+        try:
+            movements = [(int(item['product_id']), int(item['quantity_change']),
+                          item.get('transaction_type', 'Adjustment'), item.get('reference_id'),
+                          item.get('reference_number'), item.get('notes', ''))
+                         for item in json.loads(body)['movements']]
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPError(400, f"invalid movements: {e}")
+        return {'posted': self.db.post_inventory_movements(movements)}
+
+    # Request handling
+
+    def run_read(self, handler, query, arguments):
+        """Run a GET handler on a pooled reader connection and encode its result"""
+        with self.pool.reader() as conn:
+            result = handler(conn, query, *arguments)
+        body = json.dumps(result, separators=(",", ":")).encode()
+        return body, entity_tag(body)
+
+    def run_write(self, handler, body):
+        return json.dumps(handler(body), separators=(",", ":")).encode(), None
+
+    async def dispatch(self, method, target, headers, body):
+        """Return (status, body, extra headers) for one request"""
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        allowed = []
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(url.path.rstrip("/") or "/")
+            if match is None:
+                continue
+            if route_method != method:
+                allowed.append(route_method)
+                continue
+
+            loop = asyncio.get_running_loop()
+            if method == "GET":
+                payload, tag = await loop.run_in_executor(self.readers, self.run_read, handler, query, match.groups())
+            else:
+                payload, tag = await loop.run_in_executor(self.writer, self.run_write, handler, body)
+            if tag is not None and tag_matches(headers.get("if-none-match"), tag):
+                self.not_modified += 1
+                return 304, b"", {"ETag": tag}
+            return 200, payload, {"ETag": tag} if tag else {}
+
+        if allowed:
+            raise HTTPError(405, f"{method} not allowed on {url.path}")
+        raise HTTPError(404, f"no route for {url.path}")
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it (HTTP/1.1 keep-alive)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+                    # Client went away, or the server is shutting down while the connection idles
+                    return
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, 413, {'error': "request headers too large"}, close=True)
+                    return
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self.respond(writer, 400, {'error': "malformed request line"}, close=True)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {'error': "invalid Content-Length"}, close=True)
+                    return
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {'error': "request body too large"}, close=True)
+                    return
+                body = await reader.readexactly(length) if length else b""
+
+                close = (headers.get("connection", "").lower() == "close"
+                         or (version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive"))
+                self.requests += 1
+                try:
+                    status, payload, extra = await self.dispatch(method.upper(), target, headers, body)
+                except HTTPError as e:
+                    status, payload, extra = e.status, {'error': str(e)}, {}
+                except Exception as e:
+                    print(f"API error on {method} {target}: {e}")
+                    status, payload, extra = 500, {'error': "internal error"}, {}
+                await self.respond(writer, status, payload, extra, close)
+                if close:
+                    return
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, extra=None, close=False):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        headers = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+                   "Content-Type: application/json",
+                   f"Content-Length: {len(body)}",
+                   f"Connection: {'close' if close else 'keep-alive'}"]
+        headers += [f"{name}: {value}" for name, value in (extra or {}).items()]
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """Start listening; port 0 picks a free port (see self.port)"""
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.readers.shutdown()
+        self.writer.shutdown()
+
+
+async def serve(db, host="127.0.0.1", port=DEFAULT_PORT):
+    api = APIServer(db)
+    server = await api.start(host, port)
+    print(f"ERP API listening on http://{host}:{api.port} "
+          f"({api.readers._max_workers} reader threads, 1 writer thread)")
+    started = time.perf_counter()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await api.close()
+        print(f"Served {api.requests:,} requests in {time.perf_counter() - started:.0f}s "
+              f"({api.not_modified:,} not modified)")
+
+
+if __name__ == "__main__":
+    from ERPSQLiteDB import BusinessDatabase
+    from database import DEFAULT_DB_NAME
+
+    database = BusinessDatabase(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_NAME)
+    try:
+        asyncio.run(serve(database, sys.argv[3] if len(sys.argv) > 3 else "127.0.0.1",
+                          int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        database.close()
@@ -0,0 +1,259 @@
+import threading
+from datetime import date, datetime, timedelta
+
+def bucket_sql(due_date, as_of):
+    """SQL expression for the aging bucket of due_date as seen on as_of.
+
+    Buckets: 0 current (under 30 days past due), 1 31-60, 2 61-90, 3 over 90.
+    """
+    return f'''(CASE
+        WHEN julianday({as_of}) - julianday({due_date}) >= 90 THEN 3
+        WHEN julianday({as_of}) - julianday({due_date}) >= 60 THEN 2
+        WHEN julianday({as_of}) - julianday({due_date}) >= 30 THEN 1
+        ELSE 0 END)'''
+
+
+def bucket_for(due_date, as_of):
+    """Python twin of bucket_sql, for dates given as YYYY-MM-DD strings"""
+    if not due_date:
+        return 0
+    days = (date.fromisoformat(as_of) - date.fromisoformat(due_date)).days
+    if days >= 90:
+        return 3
+    if days >= 60:
+        return 2
+    if days >= 30:
+        return 1
+    return 0
+
+
+# An invoice's client is the client of its sales order
+INVOICE_CLIENT = "COALESCE((SELECT client_id FROM sales_orders WHERE order_id = {row}.order_id), 0)"
+
+# Open balance per client and bucket as of :as_of, straight from the invoices
+AGING_COMPUTE_SQL = f'''
+    SELECT {INVOICE_CLIENT.format(row="i")} AS client_id,
+           {bucket_sql("i.due_date", ":as_of")} AS bucket,
+           SUM(i.balance_due)
+    FROM invoices i
+    WHERE COALESCE(i.balance_due, 0) <> 0
+    GROUP BY 1, 2
+'''
+
+
+def install_ar_aging(conn):
+    """Create the AR aging summary tables and the triggers that maintain them.
+
+    ar_open_items keeps the open balance per client and due date, and
+    ar_aging the same balances summed per client and bucket as of the date
+    in ar_aging_state. Invoice changes adjust both incrementally; as days
+    pass, ARAging.roll_forward() moves balances between buckets. Returns
+    True when the tables were created now and filled from the invoices.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ar_aging'").fetchone()
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ar_open_items (
+        client_id INTEGER NOT NULL,
+        due_date DATE NOT NULL,
+        balance REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (client_id, due_date)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ar_open_items_due_date ON ar_open_items(due_date)")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ar_aging (
+        client_id INTEGER NOT NULL,
+        bucket INTEGER NOT NULL, -- 0 Current, 1 31-60, 2 61-90, 3 Over 90
+        balance REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (client_id, bucket)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ar_aging_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        as_of DATE NOT NULL
+    )
+    ''')
+
+    apply_change = '''
+        INSERT INTO ar_open_items (client_id, due_date, balance)
+        VALUES ({client}, COALESCE({row}.due_date, ''), {sign}{row}.balance_due)
+        ON CONFLICT (client_id, due_date) DO UPDATE SET balance = balance + excluded.balance;
+        INSERT INTO ar_aging (client_id, bucket, balance)
+        VALUES ({client}, {bucket}, {sign}{row}.balance_due)
+        ON CONFLICT (client_id, bucket) DO UPDATE SET balance = balance + excluded.balance;
+    '''
+
+    def body(row, sign):
+        return apply_change.format(
+            row=row, sign=sign,
+            client=INVOICE_CLIENT.format(row=row),
+            bucket=bucket_sql(f"{row}.due_date", "(SELECT as_of FROM ar_aging_state WHERE id = 1)"))
+
+    new_cond = "COALESCE(new.balance_due, 0) <> 0"
+    old_cond = "COALESCE(old.balance_due, 0) <> 0"
+    watched = "UPDATE OF balance_due, due_date, order_id ON invoices"
+
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS ar_aging_ai AFTER INSERT ON invoices WHEN {new_cond} BEGIN
+        {body("new", "")}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS ar_aging_ad AFTER DELETE ON invoices WHEN {old_cond} BEGIN
+        {body("old", "-")}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS ar_aging_au_old AFTER {watched} WHEN {old_cond} BEGIN
+        {body("old", "-")}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS ar_aging_au_new AFTER {watched} WHEN {new_cond} BEGIN
+        {body("new", "")}
+    END
+    ''')
+
+    if exists:
+        return False
+
+    ARAging.rebuild(conn)
+    return True
+
+
+class ARAging:
+    """Accounts receivable aging read from the maintained summary"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.job_thread = None
+        self.stop_event = threading.Event()
+
+    @staticmethod
+    def compute(conn, as_of):
+        """Aging per client and bucket computed from the raw invoices (full scan)"""
+        rows = conn.execute(AGING_COMPUTE_SQL, {'as_of': as_of}).fetchall()
+        return {(client_id, bucket): balance for client_id, bucket, balance in rows}
+
+    @classmethod
+    def rebuild(cls, conn, as_of=None):
+        """Refill both summary tables from the invoices"""
+        as_of = as_of or date.today().isoformat()
+        conn.execute("DELETE FROM ar_open_items")
+        conn.execute(f'''
+            INSERT INTO ar_open_items (client_id, due_date, balance)
+            SELECT {INVOICE_CLIENT.format(row="i")}, COALESCE(i.due_date, ''), SUM(i.balance_due)
+            FROM invoices i
+            WHERE COALESCE(i.balance_due, 0) <> 0
+            GROUP BY 1, 2
+        ''')
+        conn.execute("DELETE FROM ar_aging")
+        conn.executemany("INSERT INTO ar_aging (client_id, bucket, balance) VALUES (?, ?, ?)",
+                         [(client_id, bucket, balance) for (client_id, bucket), balance
+                          in cls.compute(conn, as_of).items()])
+        conn.execute("INSERT OR REPLACE INTO ar_aging_state (id, as_of) VALUES (1, ?)", (as_of,))
+
+    def roll_forward(self, as_of=None):
+        """Re-bucket balances for the days that passed since the last run.
+
+        Only open items whose due date crossed a 30/60/90 day boundary
+        between the previous and the new as-of date are read. Returns the
+        number of (client, due date) rows that changed bucket.
+        """
+        as_of = as_of or date.today().isoformat()
+
+        with self.pool.writer() as conn:
+            previous = conn.execute("SELECT as_of FROM ar_aging_state WHERE id = 1").fetchone()[0]
+            if previous == as_of:
+                return 0
+
+            earlier, later = sorted([previous, as_of])
+            rows = conn.execute('''
+                SELECT client_id, due_date, balance FROM ar_open_items
+                WHERE due_date > date(?, '-90 days') AND due_date <= date(?, '-30 days')
+            ''', (earlier, later)).fetchall()
+
+            moves = {}
+            moved = 0
+            for client_id, due_date, balance in rows:
+                old_bucket = bucket_for(due_date, previous)
+                new_bucket = bucket_for(due_date, as_of)
+                if old_bucket == new_bucket:
+                    continue
+                moved += 1
+                moves[(client_id, old_bucket)] = moves.get((client_id, old_bucket), 0) - balance
+                moves[(client_id, new_bucket)] = moves.get((client_id, new_bucket), 0) + balance
+
+            conn.executemany('''
+                INSERT INTO ar_aging (client_id, bucket, balance) VALUES (?, ?, ?)
+                ON CONFLICT (client_id, bucket) DO UPDATE SET balance = balance + excluded.balance
+            ''', [(client_id, bucket, delta) for (client_id, bucket), delta in moves.items()])
+
+            # Drop rows for balances that have been settled
+            conn.execute("DELETE FROM ar_aging WHERE abs(balance) < 0.005")
+            conn.execute("DELETE FROM ar_open_items WHERE abs(balance) < 0.005")
+            conn.execute("UPDATE ar_aging_state SET as_of = ? WHERE id = 1", (as_of,))
+
+        return moved
+
+    @staticmethod
+    def report_rows(conn):
+        """Rows of (company, over 90, 61-90, 31-60, current, total), largest total first"""
+        return conn.execute('''
+            SELECT COALESCE(c.company_name, 'Unknown client'),
+                   SUM(CASE WHEN a.bucket = 3 THEN a.balance ELSE 0 END) as over_90,
+                   SUM(CASE WHEN a.bucket = 2 THEN a.balance ELSE 0 END) as days_61_90,
+                   SUM(CASE WHEN a.bucket = 1 THEN a.balance ELSE 0 END) as days_31_60,
+                   SUM(CASE WHEN a.bucket = 0 THEN a.balance ELSE 0 END) as current,
+                   SUM(a.balance) as total
+            FROM ar_aging a
+            LEFT JOIN clients c ON c.client_id = a.client_id
+            GROUP BY a.client_id
+            HAVING total > 0
+            ORDER BY total DESC
+        ''').fetchall()
+
+    def check_consistency(self):
+        """Compare the summary with the raw computation.
+
+        Returns a dict of (client_id, bucket) -> (stored, actual) for every
+        entry that differs; an empty dict means the summary is consistent.
+        """
+        with self.pool.reader() as conn:
+            conn.execute("BEGIN")
+            as_of = conn.execute("SELECT as_of FROM ar_aging_state WHERE id = 1").fetchone()[0]
+            actual = self.compute(conn, as_of)
+            stored = {(client_id, bucket): balance for client_id, bucket, balance in
+                      conn.execute("SELECT client_id, bucket, balance FROM ar_aging")}
+
+        differences = {}
+        for key in set(actual) | set(stored):
+            if abs(stored.get(key, 0) - actual.get(key, 0)) > 0.005:
+                differences[key] = (stored.get(key, 0), actual.get(key, 0))
+        return differences
+
+    def start_nightly_roll_forward(self):
+        """Roll the buckets forward shortly after every midnight"""
+        if self.job_thread is not None:
+            return
+
+        def run():
+            while True:
+                now = datetime.now()
+                next_run = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+                if self.stop_event.wait((next_run - now).total_seconds() + 5):
+                    return
+                try:
+                    self.roll_forward()
+                except Exception as e:
+                    print(f"AR aging roll-forward failed: {e}")
+
+        self.stop_event.clear()
+        self.job_thread = threading.Thread(target=run, name="ar-aging", daemon=True)
+        self.job_thread.start()
+
+    def stop_nightly_roll_forward(self):
+        self.stop_event.set()
+        self.job_thread = None
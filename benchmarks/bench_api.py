@@ -0,0 +1,130 @@
+"""Load test for the HTTP/JSON API.
+
+Generates a database, starts the API server on a free port and drives it
+with concurrent keep-alive connections issuing a mix of reads (client and
+product pages, availability, statements, sales statistics) with a stock
+movement post every 20th request. Reports requests per second and p50/p99
+latency per endpoint, then repeats the reads with If-None-Match to measure
+304 revalidation.
+
+Usage: python benchmarks/bench_api.py [invoices] [connections] [seconds]
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from api_server import APIServer
+from datagen import generate
+
+END = date(2026, 9, 30)
+
+
+async def request(reader, writer, method, target, body=b"", headers=None):
+    head = f"{method} {target} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    writer.write((head + "\r\n").encode() + body)
+    response = await reader.readuntil(b"\r\n\r\n")
+    lines = response.decode("latin-1").split("\r\n")
+    received = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+    payload = await reader.readexactly(int(received["Content-Length"]))
+    return int(lines[0].split()[1]), received.get("ETag"), payload
+
+
+def targets(rng, client_ids, product_ids, categories):
+    client_id, product_id = rng.choice(client_ids), rng.choice(product_ids)
+    return rng.choice([
+        ("clients", f"/clients?after={rng.choice(client_ids)}&limit=50"),
+        ("client", f"/clients/{client_id}"),
+        ("statement", f"/clients/{client_id}/statement?from=2026-01-01&to=2026-09-30"),
+        ("products", f"/products?after={rng.choice(product_ids)}&limit=100"),
+        ("availability", f"/products/{product_id}/availability"),
+        ("availability", f"/availability?category={rng.choice(categories)}"),
+        ("statistics", "/sales/statistics?from=2025-10-01&to=2026-09-30"),
+    ])
+
+
+async def client(port, seconds, seed, ids, latencies, revalidate):
+    rng = random.Random(seed)
+    tags = {}
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        count += 1
+        if not revalidate and count % 20 == 0:
+            name, method, target = "post", "POST", "/inventory/movements"
+            body = json.dumps({'movements': [{'product_id': rng.choice(ids[1]), 'quantity_change': 1,
+                                              'reference_number': "BENCH"}]}).encode()
+        else:
+            (name, target), method, body = targets(rng, *ids), "GET", b""
+        headers = {"If-None-Match": tags[target]} if revalidate and target in tags else None
+
+        started = time.perf_counter()
+        status, tag, _ = await request(reader, writer, method, target, body, headers)
+        latencies.setdefault(name, []).append(time.perf_counter() - started)
+        if status not in (200, 304):
+            raise RuntimeError(f"{method} {target}: {status}")
+        if tag:
+            tags[target] = tag
+    writer.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+async def load(port, connections, seconds, ids, revalidate):
+    latencies = {}
+    if revalidate:
+        # Prime each connection's tags with one untimed pass
+        await asyncio.gather(*(client(port, seconds / 4, n, ids, {}, True) for n in range(connections)))
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, seconds, n, ids, latencies, revalidate) for n in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    everything = [value for values in latencies.values() for value in values]
+    print(f"  {len(everything) / elapsed:8,.0f} req/s   p50 {percentile(everything, 0.5):6.2f} ms   "
+          f"p99 {percentile(everything, 0.99):6.2f} ms   ({len(everything):,} requests)")
+    for name, values in sorted(latencies.items()):
+        print(f"    {name:<13}{len(values):7,}   p50 {percentile(values, 0.5):6.2f} ms   "
+              f"p99 {percentile(values, 0.99):6.2f} ms")
+
+
+async def main(db, connections, seconds):
+    api = APIServer(db)
+    await api.start(port=0)
+    conn = db.conn
+    ids = ([row[0] for row in conn.execute("SELECT client_id FROM clients")],
+           [row[0] for row in conn.execute("SELECT product_id FROM products")],
+           [row[0] for row in conn.execute("SELECT DISTINCT category FROM products WHERE category IS NOT NULL")])
+
+    print(f"{connections} connections, {seconds}s, {api.readers._max_workers} reader threads; {os.cpu_count()} CPUs")
+    print("mixed reads and writes:")
+    await load(api.port, connections, seconds, ids, False)
+    print("reads revalidated with If-None-Match:")
+    await load(api.port, connections, seconds, ids, True)
+    print(f"server: {api.requests:,} requests, {api.not_modified:,} answered 304")
+    await api.close()
+
+
+def run(invoices, connections, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'api.db'))
+        generate(db, invoices, 42, END, progress=None)
+        asyncio.run(main(db, connections, seconds))
+        db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 16,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 10)
@@ -0,0 +1,77 @@
+"""Result cache on the product availability and client list lookups.
+
+Times each lookup uncached and cached, then mixes lookups with stock
+movements to show hit rate and cost when writes keep invalidating.
+
+Usage: python benchmarks/bench_cache.py [invoices] [lookups]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from datagen import generate
+
+CLIENTS_SQL = "SELECT client_id, company_name FROM clients ORDER BY company_name"
+
+
+def per_call(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1000
+
+
+def run(invoices, lookups):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'cache.db'))
+        generate(db, invoices, 42, date(2026, 9, 30), progress=None)
+        cache = db.pool.cache
+
+        def client_list():
+            with db.pool.reader() as conn:
+                return cache.fetchall(conn, CLIENTS_SQL)
+
+        cases = [
+            ("product availability", db.get_product_availability),
+            ("availability by category", lambda: db.get_product_availability(category='Electronics')),
+            ("client list", client_list),
+        ]
+        for name, fn in cases:
+            cache.enabled = False
+            uncached = per_call(fn, max(lookups // 20, 5))
+            cache.enabled = True
+            fn()
+            cached = per_call(fn, lookups)
+            print(f"{name:<26} uncached {uncached:8.3f} ms   cached {cached:8.4f} ms   "
+                  f"({uncached / cached:,.0f}x)")
+
+        # One stock movement every write_every lookups
+        for write_every in (1000, 100, 10):
+            cache.clear()
+            before = cache.stats()
+            started = time.perf_counter()
+            for n in range(lookups):
+                if n % write_every == 0:
+                    db.update_inventory(1 + n % 50, 1, 'adjustment', None, 'BENCH')
+                    db.conn.commit()
+                db.get_product_availability()
+            elapsed = (time.perf_counter() - started) / lookups * 1000
+            stats = cache.stats()
+            hits = stats['hits'] - before['hits']
+            misses = stats['misses'] - before['misses']
+            print(f"write every {write_every:>5} lookups: {elapsed:8.4f} ms/lookup, "
+                  f"hit rate {hits / (hits + misses):.1%}")
+
+        stats = cache.stats()
+        print(f"cache: {stats['entries']} entries, {stats['bytes'] / 1024:,.0f} KB")
+        db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,129 @@
+"""Write overhead of the change log, compaction and audit queries.
+
+Builds two identical databases of synthetic products, one with the
+capture triggers dropped, and times the write paths on both in alternation:
+update_inventory, batched post_inventory_movements, bulk client inserts and
+updates, and single committed client saves. Then compacts the log and
+times the audit queries.
+
+Usage: python benchmarks/bench_change_log.py [products] [operations]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+import change_log
+
+ROUNDS = 5
+
+
+def build(db, products, rng):
+    with db.transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO products (sku, name, category, unit_price, cost_price, reorder_level, current_stock)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(f"BENCH{n:07d}", f"Bench product {n}", rng.choice(["Electronics", "Accessories", "Office"]),
+               20.0, 12.5, rng.randint(5, 50), rng.randint(0, 400)) for n in range(products)])
+        product_ids = [row[0] for row in cursor.execute("SELECT product_id FROM products WHERE sku LIKE 'BENCH%'")]
+        cursor.execute("DELETE FROM change_log")
+    return product_ids
+
+
+def workloads(db, product_ids, operations, rng):
+    conn = db.conn
+
+    def update_inventory():
+        with db.transaction():
+            for _ in range(operations):
+                db.update_inventory(rng.choice(product_ids), -1, "Sale", None, "BENCH")
+
+    def post_movements():
+        db.post_inventory_movements([(rng.choice(product_ids), -1, "Sale", None, "BENCH")
+                                     for _ in range(operations)])
+
+    def insert_clients():
+        with db.transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO clients (company_name, contact_person, email, phone, city, country, credit_limit)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(f"Bench Client {rng.random()}", "Pat Doe", "pat@example.com", "+100200300", "Manila", "PH",
+                   5000.0) for _ in range(operations)])
+
+    def update_clients():
+        client_ids = [row[0] for row in conn.execute("SELECT client_id FROM clients")]
+        with db.transaction() as cursor:
+            cursor.executemany("UPDATE clients SET credit_limit = ?, city = ? WHERE client_id = ?",
+                               [(rng.randint(1, 100) * 500.0, rng.choice(["Manila", "Cebu", "Davao"]),
+                                 rng.choice(client_ids)) for _ in range(operations)])
+
+    def save_clients():
+        # One committed update per client, as the Clients screen saves them
+        client_ids = [row[0] for row in conn.execute("SELECT client_id FROM clients")]
+        for _ in range(operations):
+            with db.transaction() as cursor:
+                cursor.execute("UPDATE clients SET phone = ?, status = ? WHERE client_id = ?",
+                               (f"+1{rng.randrange(10 ** 9)}", rng.choice(["Active", "On Hold"]),
+                                rng.choice(client_ids)))
+
+    return {'update_inventory': update_inventory, 'post movements': post_movements,
+            'insert clients': insert_clients, 'update clients': update_clients, 'save client': save_clients}
+
+
+def run(products, operations):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Two identical databases, one without the capture triggers, timed in alternation
+        databases = {}
+        for name in ("without", "with"):
+            db = BusinessDatabase(os.path.join(tmp, f"{name}.db"))
+            rng = random.Random(42)
+            product_ids = build(db, products, rng)
+            if name == "without":
+                with db.transaction():
+                    for table in change_log.TRACKED:
+                        for suffix in ("ai", "ad", "au"):
+                            db.conn.execute(f"DROP TRIGGER change_log_{table}_{suffix}")
+            databases[name] = db, workloads(db, product_ids, operations, rng)
+
+        timings = {name: {} for name in databases}
+        for task in databases["with"][1]:
+            for _ in range(ROUNDS):
+                for name, (db, tasks) in databases.items():
+                    started = time.perf_counter()
+                    tasks[task]()
+                    elapsed = (time.perf_counter() - started) / operations * 1e6
+                    timings[name][task] = min(timings[name].get(task, elapsed), elapsed)
+
+        print(f"{products:,} products, {operations:,} operations per run, best of {ROUNDS}:")
+        for task, without_log in timings["without"].items():
+            with_log = timings["with"][task]
+            print(f"  {task:<17}{without_log:7.1f} us without the log, {with_log:7.1f} us with "
+                  f"({with_log / without_log - 1:+.1%})")
+
+        db = databases["with"][0]
+        logged = db.conn.execute("SELECT COUNT(*), SUM(LENGTH(payload)) FROM change_log").fetchone()
+        started = time.perf_counter()
+        compacted, saved = db.compact_change_log()
+        print(f"{logged[0]:,} changes logged, {logged[1]:,} payload bytes; compacted {compacted:,} "
+              f"in {time.perf_counter() - started:.2f}s, {saved:,} bytes saved ({saved / logged[1]:.0%})")
+
+        product_id = db.conn.execute("SELECT product_id FROM inventory_transactions "
+                                     "GROUP BY product_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+        started = time.perf_counter()
+        rows = db.get_changes('products', product_id)
+        print(f"history of the busiest product: {len(rows)} changes in {(time.perf_counter() - started) * 1000:.2f} ms")
+        started = time.perf_counter()
+        rows = db.get_changes('clients', start_date='2000-01-01', end_date='2099-12-31')
+        print(f"client changes by time range: {len(rows):,} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        for db, _ in databases.values():
+            db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
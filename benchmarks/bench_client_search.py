@@ -0,0 +1,77 @@
+"""Compare LIKE scans with the FTS5 prefix index for client search.
+
+Usage: python benchmarks/bench_client_search.py [size ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from search_index import SearchIndex
+
+WORDS = ["Global", "Acme", "North", "Blue", "Summit", "Prime", "Metro", "Pacific", "Delta", "Apex",
+         "Union", "Silver", "Harbor", "Vertex", "Eagle", "Orion", "Nova", "Atlas", "Zenith", "Crown"]
+SUFFIXES = ["Corporation", "Trading", "Supplies", "Industries", "Logistics", "Foods", "Systems", "Ltd"]
+FIRST_NAMES = ["Jane", "John", "Maria", "Chen", "Ahmed", "Olga", "Luis", "Priya", "Tom", "Aiko"]
+LAST_NAMES = ["Smith", "Garcia", "Wang", "Khan", "Ivanova", "Lopez", "Patel", "Brown", "Sato", "Reyes"]
+TERMS = ["acme", "sum", "jane", "patel", "harbor log", "zzz"]
+REPEAT = 20
+
+
+def fill_clients(db, size, seed=42):
+    rng = random.Random(seed)
+    batch = []
+    for n in range(size):
+        company = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(SUFFIXES)} {n}"
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        batch.append((company, f"{first} {last}", f"{first.lower()}.{last.lower()}{n}@example.com",
+                      f"+1{rng.randrange(10 ** 9, 10 ** 10)}"))
+        if len(batch) == 10000:
+            db.cursor.executemany("INSERT INTO clients (company_name, contact_person, email, phone) "
+                                  "VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        db.cursor.executemany("INSERT INTO clients (company_name, contact_person, email, phone) "
+                              "VALUES (?, ?, ?, ?)", batch)
+    db.conn.commit()
+
+
+def time_search(fn):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        for term in TERMS:
+            fn(term)
+    return (time.perf_counter() - started) / (REPEAT * len(TERMS)) * 1000
+
+
+def run(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'bench.db'))
+        fill_clients(db, size)
+
+        index = SearchIndex(db.pool)
+        columns = "client_id, company_name, contact_person, email, phone"
+
+        def like(term):
+            with db.pool.reader() as conn:
+                index.like_search(conn, "clients", term, columns, "company_name", 200)
+
+        def fts(term):
+            index.search("clients", term, columns, limit=200)
+
+        like_ms = time_search(like)
+        fts_ms = time_search(fts)
+        db.close()
+
+    print(f"{size:>10,} clients  LIKE {like_ms:9.2f} ms  FTS5 {fts_ms:9.2f} ms  "
+          f"speedup {like_ms / fts_ms if fts_ms else 0:6.1f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    for size in sizes:
+        run(size)
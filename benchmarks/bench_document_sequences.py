@@ -0,0 +1,56 @@
+"""Multi-process stress test for document number allocation.
+
+Several processes allocate quotation numbers from the same database file,
+mixing single allocations with batch reservations, and the results are
+checked for duplicates.
+
+Usage: python benchmarks/bench_document_sequences.py [processes] [allocations_per_process]
+"""
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+
+BATCH_SIZE = 25
+
+
+def allocate(args):
+    db_name, allocations = args
+    db = BusinessDatabase(db_name)
+    numbers = []
+    while len(numbers) < allocations:
+        # Every fifth round reserves a batch, as a bulk import would
+        if len(numbers) % 5 == 0 and allocations - len(numbers) >= BATCH_SIZE:
+            numbers.extend(db.reserve_document_numbers('quotation', BATCH_SIZE))
+        else:
+            numbers.append(db.generate_quotation_number())
+    db.close()
+    return numbers
+
+
+def run(processes, allocations):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'sequences.db')
+        BusinessDatabase(db_name).close()
+
+        started = time.perf_counter()
+        with Pool(processes) as pool:
+            results = pool.map(allocate, [(db_name, allocations)] * processes)
+        elapsed = time.perf_counter() - started
+
+    numbers = [number for result in results for number in result]
+    duplicates = len(numbers) - len(set(numbers))
+    print(f"{processes} processes x {allocations} numbers: {len(numbers)} allocated, "
+          f"{duplicates} duplicates, {len(numbers) / elapsed:,.0f} allocations/s")
+    return duplicates
+
+
+if __name__ == "__main__":
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    allocations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    sys.exit(1 if run(processes, allocations) else 0)
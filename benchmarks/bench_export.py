@@ -0,0 +1,107 @@
+"""Streaming export of a large invoice ledger to CSV and XLSX.
+
+Reports elapsed time, rows per second and the peak Python heap for each
+format, and fails if the heap grows past the memory ceiling, which would
+mean the export is holding the result set in memory.
+
+Usage: python benchmarks/bench_export.py [invoices] [ceiling_mb]
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from export import export_report
+
+
+def populate(db, invoices, seed=5):
+    rng = random.Random(seed)
+    client_ids = [row[0] for row in db.conn.execute("SELECT client_id FROM clients")]
+
+    with db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO sales_orders (order_number, client_id, order_date, status, grand_total)
+            VALUES (?, ?, ?, 'Delivered', 0)
+        """, [(f"SO-EXP-{n:05d}", rng.choice(client_ids), "2024-01-01") for n in range(1000)])
+    order_ids = [row[0] for row in db.conn.execute(
+        "SELECT order_id FROM sales_orders WHERE order_number LIKE 'SO-EXP-%'")]
+
+    start = date(2022, 1, 1)
+    batch = []
+    for n in range(invoices):
+        invoice_date = start + timedelta(days=rng.randrange(1000))
+        subtotal = round(rng.uniform(50, 5000), 2)
+        tax = round(subtotal * 0.1, 2)
+        total = subtotal + tax
+        paid = rng.choice([0, 0, total, round(total / 2, 2)])
+        batch.append((f"INV-EXP-{n:08d}", rng.choice(order_ids), invoice_date.isoformat(),
+                      (invoice_date + timedelta(days=30)).isoformat(),
+                      subtotal, tax, total, paid, total - paid))
+        if len(batch) == 50000:
+            insert_invoices(db, batch)
+            batch = []
+    if batch:
+        insert_invoices(db, batch)
+
+
+def insert_invoices(db, batch):
+    with db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO invoices (invoice_number, order_id, invoice_date, due_date,
+                                  subtotal, tax_amount, grand_total, amount_paid, balance_due)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+
+
+def measure(db, path, ceiling_mb):
+    tracemalloc.start()
+    started = time.perf_counter()
+    with db.pool.reader() as conn:
+        rows = export_report(conn, 'invoice_ledger', path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    peak_mb = peak / (1024 * 1024)
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"{os.path.splitext(path)[1][1:]:<5} {rows:>10,} rows  {elapsed:6.1f}s  "
+          f"{rows / elapsed:>9,.0f} rows/s  file {size_mb:6.1f} MB  heap peak {peak_mb:5.1f} MB")
+    if peak_mb > ceiling_mb:
+        raise SystemExit(f"heap peak {peak_mb:.1f} MB exceeds the {ceiling_mb} MB ceiling")
+    return rows
+
+
+def run(invoices, ceiling_mb):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'export.db'))
+
+        started = time.perf_counter()
+        populate(db, invoices)
+        print(f"populated {invoices:,} invoices in {time.perf_counter() - started:.1f}s")
+
+        csv_rows = measure(db, os.path.join(tmp, 'ledger.csv'), ceiling_mb)
+        xlsx_path = os.path.join(tmp, 'ledger.xlsx')
+        xlsx_rows = measure(db, xlsx_path, ceiling_mb)
+        assert csv_rows == xlsx_rows
+
+        with zipfile.ZipFile(xlsx_path) as archive:
+            sheets = [name for name in archive.namelist() if name.startswith("xl/worksheets/")]
+        print(f"xlsx worksheets: {len(sheets)}")
+        db.close()
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS: {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    ceiling_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    run(invoices, ceiling_mb)
@@ -0,0 +1,57 @@
+"""Forecasting job over a generated order history.
+
+Generates a database, then runs the forecasting job over every product in
+this process and on process pools of increasing size, reporting the
+forecasts written, the model mix and the time per run. The fitting step
+alone is also timed on a synthetic demand matrix (products x days).
+
+Usage: python benchmarks/bench_forecasting.py [invoices] [products]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from datagen import generate
+import forecasting
+
+END = date(2026, 9, 30)
+TODAY = date(2026, 10, 1)
+
+
+def run(invoices, products):
+    print(f"models backend: {'numpy ' + forecasting.numpy.__version__ if forecasting.numpy is not None else 'lists (numpy not installed)'}")
+
+    # Fitting alone, on a synthetic daily demand matrix
+    rng = random.Random(42)
+    history, holdout, horizon, season, window = forecasting.PERIODS['Daily']
+    matrix = [[float(rng.choice((0, 0, 0, 1, 2, 3, 8))) for _ in range(history)] for _ in range(products)]
+    if forecasting.numpy is not None:
+        matrix = forecasting.numpy.array(matrix)
+    started = time.perf_counter()
+    forecasting.fit(matrix, holdout, horizon, season, window)
+    print(f"fit {products:,} daily series of {history} days: {time.perf_counter() - started:.2f}s")
+    del matrix
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'forecasting.db'))
+        generate(db, invoices, 42, END, progress=None)
+
+        print(f"database, {invoices:,} invoices; {os.cpu_count()} CPUs")
+        for workers in (1, 2, 4):
+            started = time.perf_counter()
+            totals = forecasting.run(db, workers, today=TODAY, progress=None)
+            print(f"  {workers} worker{'s' if workers > 1 else ' '}: {time.perf_counter() - started:6.2f}s  "
+                  f"{totals['forecasts']:,} forecasts; "
+                  + ", ".join(f"{model} {totals[model]:,}" for model in forecasting.MODELS))
+        db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
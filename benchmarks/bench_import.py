@@ -0,0 +1,67 @@
+"""Import throughput for generated client and product files.
+
+Usage: python benchmarks/bench_import.py [products] [clients]
+"""
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from importer import import_clients, import_products
+
+
+def write_products(path, count, seed=3):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["product_code", "product_name", "description", "category", "unit",
+                         "unit_price", "cost_price", "reorder_point", "current_stock"])
+        for n in range(count):
+            cost = round(rng.uniform(1, 500), 2)
+            writer.writerow([f"IMP{n:07d}", f"Imported product {n}", "Bulk catalog item",
+                             rng.choice(["Electronics", "Accessories", "Office", "Tools"]), "pcs",
+                             round(cost * 1.4, 2), cost, rng.randint(5, 50), rng.randint(0, 500)])
+
+
+def write_clients(path, count, seed=4):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["company_name", "contact_person", "email", "phone", "city", "country", "credit_limit"])
+        for n in range(count):
+            writer.writerow([f"Client {n} Ltd", f"Contact {n}", f"client{n}@example.com",
+                             f"+1{rng.randrange(10 ** 9, 10 ** 10)}", "Springfield", "USA",
+                             rng.choice([5000, 10000, 25000])])
+
+
+def run(products, clients):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'import.db'))
+        product_file = os.path.join(tmp, 'products.csv')
+        client_file = os.path.join(tmp, 'clients.csv')
+        write_products(product_file, products)
+        write_clients(client_file, clients)
+
+        result = import_products(db.pool, product_file)
+        print(f"products: {result.summary()} in {result.elapsed:.1f}s")
+        result = import_clients(db.pool, client_file)
+        print(f"clients:  {result.summary()} in {result.elapsed:.1f}s")
+
+        # Re-importing the catalog exercises the update side of the upsert
+        result = import_products(db.pool, product_file)
+        print(f"products (re-import): {result.summary()} in {result.elapsed:.1f}s")
+        db.close()
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS: {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 30000
+    run(products, clients)
@@ -0,0 +1,122 @@
+"""Hot query timings before and after the index migrations.
+
+Builds a large generated dataset, removes the migration indexes, times
+every query in the index advisor registry, applies the migrations and
+times them again.
+
+Usage: python benchmarks/bench_indexes.py [invoices] [clients]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from index_advisor import QUERIES, INDEX_NAME, analyze
+from migrations import MIGRATIONS, migrate
+
+
+def populate(db, invoices, clients, seed=6):
+    rng = random.Random(seed)
+    conn = db.conn
+    start = date(2020, 1, 1)
+
+    with db.transaction() as cursor:
+        cursor.executemany("INSERT INTO clients (company_name, email) VALUES (?, ?)",
+                           [(f"Bench Client {n}", f"bench{n}@example.com") for n in range(clients)])
+        cursor.executemany("""
+            INSERT INTO products (sku, name, category, unit_price, cost_price, current_stock, reorder_level)
+            VALUES (?, ?, ?, 10, 7, ?, 10)
+        """, [(f"BENCH{n:06d}", f"Bench product {n}", rng.choice(["Electronics", "Office", "Tools", "Parts"]),
+               rng.randint(0, 500)) for n in range(20000)])
+
+    client_ids = [row[0] for row in conn.execute("SELECT client_id FROM clients")]
+    product_ids = [row[0] for row in conn.execute("SELECT product_id FROM products")]
+
+    orders = invoices // 2
+    with db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO sales_orders (order_number, client_id, order_date, status, grand_total)
+            VALUES (?, ?, ?, 'Delivered', 0)
+        """, [(f"SO-BENCH-{n:07d}", rng.choice(client_ids),
+               (start + timedelta(days=rng.randrange(1800))).isoformat()) for n in range(orders)])
+    order_ids = [row[0] for row in conn.execute(
+        "SELECT order_id FROM sales_orders WHERE order_number LIKE 'SO-BENCH-%'")]
+
+    with db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO sales_order_items (order_id, product_id, quantity, unit_price, line_total)
+            VALUES (?, ?, ?, 10, ?)
+        """, [(order_id, rng.choice(product_ids), qty, qty * 10)
+              for order_id in order_ids for qty in [rng.randint(1, 20)] * 2])
+
+    invoice_rows = []
+    for n in range(invoices):
+        invoice_date = start + timedelta(days=rng.randrange(1800))
+        total = round(rng.uniform(50, 5000), 2)
+        paid = rng.choice([0, total, total, round(total / 2, 2)])
+        invoice_rows.append((f"INV-BENCH-{n:08d}", rng.choice(order_ids), invoice_date.isoformat(),
+                             (invoice_date + timedelta(days=30)).isoformat(), total, paid, total - paid))
+    with db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO invoices (invoice_number, order_id, invoice_date, due_date,
+                                  grand_total, amount_paid, balance_due)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, invoice_rows)
+
+    with db.transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO receipts (receipt_number, invoice_id, receipt_date, payment_method, amount)
+            SELECT 'RCPT-BENCH-' || invoice_id, invoice_id, date(invoice_date, '+10 days'), 'Bank Transfer',
+                   amount_paid
+            FROM invoices WHERE amount_paid > 0
+        """)
+
+
+def drop_migration_indexes(conn):
+    for _, _, statements in MIGRATIONS:
+        for sql in statements:
+            match = INDEX_NAME.search(sql) if isinstance(sql, str) else None
+            if match:
+                conn.execute(f"DROP INDEX IF EXISTS {match.group(1)}")
+    conn.execute("PRAGMA user_version = 0")
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def run(invoices, clients):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'indexes.db'))
+
+        started = time.perf_counter()
+        populate(db, invoices, clients)
+        print(f"populated {invoices:,} invoices for {clients:,} clients in {time.perf_counter() - started:.1f}s")
+
+        drop_migration_indexes(db.conn)
+        before = analyze(db.conn, timed=True)
+
+        started = time.perf_counter()
+        migrate(db.conn)
+        db.conn.execute("ANALYZE")
+        db.conn.commit()
+        print(f"migrations applied in {time.perf_counter() - started:.1f}s")
+        after = analyze(db.conn, timed=True)
+        db.close()
+
+    print(f"\n{'query':<22} {'before ms':>10} {'after ms':>10} {'speedup':>8}  issues before -> after")
+    for name in QUERIES:
+        was, now = before[name]['seconds'] * 1000, after[name]['seconds'] * 1000
+        print(f"{name:<22} {was:>10.2f} {now:>10.2f} {was / now if now else 0:>7.1f}x  "
+              f"{len(before[name]['issues'])} -> {len(after[name]['issues'])}")
+        for issue in after[name]['issues']:
+            print(f"{'':<24}! {issue}")
+
+
+if __name__ == "__main__":
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    run(invoices, clients)
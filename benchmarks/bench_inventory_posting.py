@@ -0,0 +1,63 @@
+"""Compare per-line update_inventory with the batched posting engine.
+
+Usage: python benchmarks/bench_inventory_posting.py [lines_per_document] [documents]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+
+PRODUCTS = 2000
+
+
+def seed_products(db):
+    db.cursor.executemany('''
+    INSERT INTO products (sku, name, category, unit_price, cost_price, current_stock)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(f"BENCH{n:06d}", f"Product {n}", "Bench", 10.0, 6.0, 1000) for n in range(PRODUCTS)])
+    db.conn.commit()
+    db.cursor.execute("SELECT product_id FROM products")
+    return [row[0] for row in db.cursor.fetchall()]
+
+
+def make_documents(product_ids, lines, documents, seed=7):
+    rng = random.Random(seed)
+    return [[(rng.choice(product_ids), -rng.randint(1, 5), 'Sale', doc, f"SO-BENCH-{doc}")
+             for _ in range(lines)] for doc in range(documents)]
+
+
+def run(lines, documents):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'posting.db'))
+        product_ids = seed_products(db)
+        batches = make_documents(product_ids, lines, documents)
+
+        started = time.perf_counter()
+        for movements in batches:
+            for movement in movements:
+                db.update_inventory(*movement)
+            db.conn.commit()
+        loop_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for movements in batches:
+            db.post_inventory_movements(movements)
+        batch_time = time.perf_counter() - started
+
+        db.close()
+
+    print(f"{documents} documents x {lines} lines")
+    print(f"  update_inventory loop:    {loop_time / documents * 1000:8.2f} ms/document")
+    print(f"  post_inventory_movements: {batch_time / documents * 1000:8.2f} ms/document "
+          f"({loop_time / batch_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    documents = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    run(lines, documents)
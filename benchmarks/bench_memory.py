@@ -0,0 +1,101 @@
+"""Memory held by large query results in each representation.
+
+Loads every invoice and every inventory transaction of a generated
+database as a list of tuples (fetchall), as model dataclasses, as the
+slotted model records and as a ColumnarResult, and reports the traced
+allocation, bytes per row and load time of each.
+
+Usage: python benchmarks/bench_memory.py [invoices]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from columnar import ColumnarResult
+from datagen import generate
+from models import Invoice, InvoiceRecord
+
+INVOICES_SQL = '''
+    SELECT i.invoice_id, i.invoice_number, i.order_id, o.client_id, i.invoice_date, i.due_date,
+           i.subtotal, i.tax_amount, i.grand_total, i.amount_paid, i.balance_due, i.status
+    FROM invoices i JOIN sales_orders o ON o.order_id = i.order_id
+'''
+
+TRANSACTIONS_SQL = '''
+    SELECT transaction_id, product_id, transaction_type, reference_id, reference_number,
+           quantity_change, unit_cost, transaction_date
+    FROM inventory_transactions
+'''
+
+
+def as_models(model):
+    def load(conn):
+        return [model(*row) for row in conn.execute(INVOICES_SQL)]
+    return load
+
+
+def measure(load, conn):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = load(conn)
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def report(title, cases, conn):
+    print(title)
+    base = None
+    for name, load in cases:
+        result, size, elapsed = measure(load, conn)
+        rows = len(result)
+        base = base or size
+        print(f"  {name:<22} {size / 2**20:8.1f} MB  {size / rows:6.0f} B/row  "
+              f"{base / size:5.1f}x smaller  load {elapsed:5.2f}s")
+        del result
+
+
+def run(invoices):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'memory.db'))
+        generate(db, invoices, 42, date(2026, 9, 30), progress=None)
+        conn = db.conn
+
+        report(f"{conn.execute('SELECT COUNT(*) FROM invoices').fetchone()[0]:,} invoices", [
+            ("tuples (fetchall)", lambda c: c.execute(INVOICES_SQL).fetchall()),
+            ("Invoice dataclass", as_models(Invoice)),
+            ("InvoiceRecord slotted", as_models(InvoiceRecord)),
+            ("ColumnarResult", lambda c: ColumnarResult.from_query(c, INVOICES_SQL)),
+        ], conn)
+        report(f"{conn.execute('SELECT COUNT(*) FROM inventory_transactions').fetchone()[0]:,} inventory transactions", [
+            ("tuples (fetchall)", lambda c: c.execute(TRANSACTIONS_SQL).fetchall()),
+            ("ColumnarResult", lambda c: ColumnarResult.from_query(c, TRANSACTIONS_SQL)),
+        ], conn)
+
+        # Slicing a report page out of the full result
+        rows = conn.execute(TRANSACTIONS_SQL).fetchall()
+        columnar = ColumnarResult.from_query(conn, TRANSACTIONS_SQL)
+        half = len(rows) // 2
+        started = time.perf_counter()
+        for _ in range(100):
+            rows[half:]
+        list_slice = (time.perf_counter() - started) / 100 * 1000
+        started = time.perf_counter()
+        for _ in range(100):
+            columnar[half:].column('quantity_change')
+        view_slice = (time.perf_counter() - started) / 100 * 1000
+        print(f"slice of {len(rows) - half:,} rows: list {list_slice:.3f} ms, columnar view {view_slice:.4f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,59 @@
+"""Cost of the SQL profiling layer.
+
+Runs the same point lookups on a plain sqlite3 connection, on a
+ProfiledConnection with profiling disabled and with it enabled.
+
+Usage: python benchmarks/bench_profiler.py [queries]
+"""
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from query_profiler import PROFILER, ProfiledConnection
+
+
+def setup(conn):
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, price REAL)")
+    conn.executemany("INSERT INTO items VALUES (?, ?, ?)", ((n, f"item {n}", n * 1.5) for n in range(10000)))
+
+
+def lookups(conn, queries):
+    started = time.perf_counter()
+    for n in range(queries):
+        conn.execute("SELECT name, price FROM items WHERE id = ?", (n % 10000,)).fetchone()
+    return (time.perf_counter() - started) / queries * 1e6
+
+
+def scan(conn):
+    started = time.perf_counter()
+    for _ in conn.execute("SELECT * FROM items"):
+        pass
+    return (time.perf_counter() - started) * 1000
+
+
+def run(queries):
+    plain = sqlite3.connect(":memory:")
+    profiled = sqlite3.connect(":memory:", factory=ProfiledConnection)
+    setup(plain)
+    setup(profiled)
+
+    results = [
+        ("plain sqlite3", lookups(plain, queries), scan(plain)),
+        ("profiler disabled", lookups(profiled, queries), scan(profiled)),
+    ]
+    PROFILER.enable(threshold_ms=1)
+    results.append(("profiler enabled", lookups(profiled, queries), scan(profiled)))
+    PROFILER.disable()
+
+    base = results[0][1]
+    for name, per_query, scan_ms in results:
+        print(f"{name:<18} {per_query:6.2f} us/lookup ({(per_query / base - 1) * 100:+5.1f}%)  "
+              f"10k-row scan {scan_ms:5.2f} ms")
+    print(f"statements recorded while enabled: {PROFILER.statements:,}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,113 @@
+"""Replenishment planning over a large catalogue.
+
+Builds a catalogue of synthetic SKUs (100k by default) spread over
+suppliers with lead times, with a year of monthly forecasts per SKU, open
+purchase orders for a fifth of them and open sales order lines for a third.
+Times a full plan, an incremental re-plan after stock movements on 1% of
+the SKUs, drafting the purchase orders, and the cost the change-tracking
+triggers add to posting movements.
+
+Usage: python benchmarks/bench_replenishment.py [skus]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+import replenishment
+
+TODAY = date(2026, 9, 30)
+SUPPLIERS = 500
+
+
+def build(db, skus, rng):
+    months = [(TODAY.replace(day=1) - timedelta(days=31 * n)).replace(day=1) for n in range(-3, 9)]
+    with db.transaction() as cursor:
+        cursor.executemany("INSERT INTO suppliers (company_name, lead_time_days) VALUES (?, ?)",
+                           [(f"Bench Supplier {n}", rng.choice([3, 7, 14, 21, 30, 45])) for n in range(SUPPLIERS)])
+        first_supplier = cursor.execute("SELECT MIN(supplier_id) FROM suppliers "
+                                        "WHERE company_name LIKE 'Bench Supplier %'").fetchone()[0]
+        cursor.executemany('''
+            INSERT INTO products (sku, name, unit_price, cost_price, reorder_level, current_stock, supplier_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(f"BENCH{n:07d}", f"Bench product {n}", 20.0, 12.5, rng.randint(5, 50), rng.randint(0, 400),
+               first_supplier + rng.randrange(SUPPLIERS)) for n in range(skus)])
+        product_ids = [row[0] for row in cursor.execute("SELECT product_id FROM products WHERE sku LIKE 'BENCH%'")]
+
+        cursor.executemany('''
+            INSERT INTO sales_forecasts (product_id, forecast_date, forecast_period, forecasted_quantity)
+            VALUES (?, ?, 'Monthly', ?)
+        ''', ((product_id, month.isoformat(), rng.randint(0, 120)) for product_id in product_ids for month in months))
+
+        cursor.execute('''
+            INSERT INTO purchase_orders (po_id, po_number, supplier_id, status) VALUES (900000000, 'BENCH-PO', ?, 'Sent')
+        ''', (first_supplier,))
+        cursor.executemany('''
+            INSERT INTO purchase_order_items (po_id, product_id, quantity, unit_price, line_total, received_quantity)
+            VALUES (900000000, ?, ?, 12.5, 0, ?)
+        ''', [(product_id, 100, rng.choice([0, 0, 40])) for product_id in rng.sample(product_ids, skus // 5)])
+
+        cursor.execute('''
+            INSERT INTO sales_orders (order_id, order_number, client_id, status) VALUES (900000000, 'BENCH-SO', 1, 'Confirmed')
+        ''')
+        cursor.executemany('''
+            INSERT INTO sales_order_items (order_id, product_id, quantity, unit_price, line_total)
+            VALUES (900000000, ?, ?, 20.0, 0)
+        ''', [(product_id, rng.randint(1, 80)) for product_id in rng.sample(product_ids, skus // 3)])
+    return product_ids
+
+
+def run(skus):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'replenishment.db'))
+        conn = db.conn
+        started = time.perf_counter()
+        product_ids = build(db, skus, rng)
+        print(f"built {skus:,} SKUs in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        with db.transaction(immediate=True):
+            planned = replenishment.plan(conn, full=True, today=TODAY)
+        grouped = replenishment.suggestions(conn)
+        print(f"full plan: {planned:,} products in {time.perf_counter() - started:.2f}s, "
+              f"{sum(len(lines) for lines in grouped.values()):,} to reorder from {len(grouped)} suppliers")
+
+        # Stock movements on 1% of the SKUs, then an incremental re-plan
+        moved = rng.sample(product_ids, max(1, skus // 100))
+        db.post_inventory_movements([(product_id, -rng.randint(1, 30), "Sale", None, "BENCH") for product_id in moved])
+        started = time.perf_counter()
+        with db.transaction(immediate=True):
+            planned = replenishment.plan(conn, today=TODAY)
+        print(f"incremental re-plan: {planned:,} products in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        started = time.perf_counter()
+        drafted = replenishment.draft_purchase_orders(db, today=TODAY)
+        print(f"drafted {len(drafted)} purchase orders, {sum(lines for _, _, _, lines, _ in drafted):,} lines "
+              f"in {time.perf_counter() - started:.2f}s")
+
+        # Posting cost: movements with and without the change-tracking triggers
+        batch = [(rng.choice(product_ids), 1, "Adjustment", None, "BENCH") for _ in range(5000)]
+
+        def post():
+            started = time.perf_counter()
+            db.post_inventory_movements(batch)
+            return (time.perf_counter() - started) / len(batch) * 1e6
+
+        with_triggers = post()
+        with db.transaction():
+            for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                        "AND name LIKE 'replenishment_%'").fetchall():
+                conn.execute(f"DROP TRIGGER {name}")
+        without_triggers = post()
+        print(f"posting a movement: {without_triggers:.1f} us without tracking, {with_triggers:.1f} us with")
+        db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,111 @@
+"""Sales statistics from the rollups against the raw invoice scan.
+
+Generates five years of invoices, then times get_sales_statistics and the
+category breakdown over ranges from a week to the full five years, next
+to the original GROUP BY strftime() query over invoices. Also times a
+full rebuild and the extra cost the rollup triggers add to posting.
+
+Usage: python benchmarks/bench_rollups.py [invoices]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from datagen import generate
+from sales_rollups import rebuild, check
+
+END = date(2026, 9, 30)
+YEARS = 5
+REPEAT = 5
+
+RAW_SALES_STATISTICS_SQL = '''
+    SELECT strftime('%Y-%m', i.invoice_date) as month,
+           COUNT(DISTINCT i.invoice_id), COUNT(DISTINCT o.client_id),
+           SUM(i.grand_total), AVG(i.grand_total), SUM(i.balance_due)
+    FROM invoices i
+    JOIN sales_orders o ON i.order_id = o.order_id
+    WHERE i.invoice_date BETWEEN ? AND ?
+    GROUP BY strftime('%Y-%m', i.invoice_date)
+    ORDER BY month
+'''
+
+RAW_CATEGORY_SQL = '''
+    SELECT strftime('%Y-%m', inv.invoice_date), COALESCE(p.category, 'Uncategorized'),
+           COUNT(*), SUM(i.quantity), SUM(i.line_total)
+    FROM invoices inv
+    JOIN sales_order_items i ON i.order_id = inv.order_id
+    LEFT JOIN products p ON p.product_id = i.product_id
+    WHERE inv.invoice_date BETWEEN ? AND ?
+    GROUP BY 1, 2
+'''
+
+RANGES = [
+    ("one week", '2026-09-01', '2026-09-07'),
+    ("one month", '2026-08-01', '2026-08-31'),
+    ("quarter, ragged", '2026-06-17', '2026-09-12'),
+    ("one year", '2025-10-01', '2026-09-30'),
+    ("five years", '2021-10-01', '2026-09-30'),
+]
+
+
+def best(fn):
+    times = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times) * 1000
+
+
+def run(invoices):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'rollups.db'))
+        started = time.perf_counter()
+        generate(db, invoices, 42, END, progress=None, years=YEARS)
+        print(f"generated {invoices:,} invoices over {YEARS} years in {time.perf_counter() - started:.1f}s")
+        conn = db.conn
+
+        print(f"{'range':<18}{'raw stats':>12}{'rollup':>10}{'raw categories':>17}{'rollup':>10}")
+        for name, start, end in RANGES:
+            raw = best(lambda: conn.execute(RAW_SALES_STATISTICS_SQL, (start, end)).fetchall())
+            rolled = best(lambda: db.get_sales_statistics(start, end))
+            raw_categories = best(lambda: conn.execute(RAW_CATEGORY_SQL, (start, end)).fetchall())
+            rolled_categories = best(lambda: db.get_category_sales(start, end))
+            print(f"{name:<18}{raw:>10.2f}ms{rolled:>8.2f}ms{raw_categories:>15.2f}ms{rolled_categories:>8.2f}ms")
+
+        started = time.perf_counter()
+        with db.transaction():
+            rebuild(conn)
+        print(f"full rebuild: {time.perf_counter() - started:.2f}s")
+
+        started = time.perf_counter()
+        drift = check(conn)
+        print(f"check: {len(drift)} rows differ ({time.perf_counter() - started:.2f}s)")
+
+        # Posting cost: payment updates with and without the rollup triggers
+        ids = [row[0] for row in conn.execute("SELECT invoice_id FROM invoices ORDER BY invoice_id LIMIT 5000")]
+        payment = "UPDATE invoices SET amount_paid = amount_paid + 1, balance_due = balance_due - 1 WHERE invoice_id = ?"
+
+        def post():
+            with db.transaction():
+                for invoice_id in ids:
+                    conn.execute(payment, (invoice_id,))
+
+        with_triggers = best(post) / len(ids) * 1000
+        triggers = conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                "AND name LIKE 'sales_rollup_%'").fetchall()
+        with db.transaction():
+            for (name,) in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+        without_triggers = best(post) / len(ids) * 1000
+        print(f"payment update: {without_triggers:.1f} us without rollups, {with_triggers:.1f} us with")
+        db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,75 @@
+"""Cold launch and module switching times for the desktop application.
+
+Import cost is measured in fresh interpreters: main.py alone (modules are
+loaded on first use) against main.py plus every module imported up
+front, as before the module registry. Window startup and module switching
+need a display; without one that part is skipped.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+EAGER_IMPORTS = "import modules.clients, modules.accounting"
+
+
+def import_time(code, runs):
+    """Median wall time of a fresh interpreter running code"""
+    script = f"import time; t = time.perf_counter(); {code}; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def window_times():
+    import tkinter as tk
+    import main
+
+    root = tk.Tk()
+    started = time.perf_counter()
+    app = main.ERPSystem(root)
+    root.update()
+    print(f"window ready:            {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    for key in ['clients', 'accounting', 'dashboard', 'clients', 'accounting']:
+        started = time.perf_counter()
+        app.show_module(key)
+        root.update()
+        print(f"show {key:<19} {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    app.executor.shutdown()
+    app.kpis.stop_background_refresh()
+    app.aging.stop_nightly_roll_forward()
+    root.destroy()
+
+
+def run(runs):
+    lazy = import_time("import main", runs)
+    eager = import_time(f"import main; {EAGER_IMPORTS}", runs)
+    print(f"import main (lazy):      {lazy * 1000:8.1f} ms")
+    print(f"import main + modules:   {eager * 1000:8.1f} ms")
+
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        print("no display, skipping window startup and module switching")
+        return
+
+    # The application opens its database in the working directory
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            window_times()
+        finally:
+            os.chdir(ROOT)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
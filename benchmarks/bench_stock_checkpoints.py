@@ -0,0 +1,104 @@
+"""Point-in-time stock from month-end checkpoints against the full ledger.
+
+Generates ten years of movements, then times the stock of single products
+on random past dates and of every product on one date, answered from the
+checkpoints and by summing the ledger. Also times a full checkpoint
+rebuild and the cost the checkpoint triggers add to posting movements.
+
+Usage: python benchmarks/bench_stock_checkpoints.py [invoices]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from datagen import generate
+import stock_checkpoints
+
+END = date(2026, 9, 30)
+YEARS = 10
+LOOKUPS = 2000
+
+# Stock on a date without checkpoints: today's figure less every later movement
+LEDGER_STOCK_SQL = '''
+    SELECT p.current_stock - COALESCE((SELECT SUM(t.quantity_change) FROM inventory_transactions t
+                                       WHERE t.product_id = p.product_id
+                                       AND t.transaction_date >= date(:as_of, '+1 day')), 0)
+    FROM products p WHERE p.product_id = :product_id
+'''
+
+
+def run(invoices):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BusinessDatabase(os.path.join(tmp, 'stock.db'))
+        started = time.perf_counter()
+        generate(db, invoices, 42, END, progress=None, years=YEARS)
+        conn = db.conn
+        movements = conn.execute("SELECT COUNT(*) FROM inventory_transactions").fetchone()[0]
+        checkpoints = conn.execute("SELECT COUNT(*) FROM stock_checkpoints").fetchone()[0]
+        print(f"generated {movements:,} movements over {YEARS} years, {checkpoints:,} checkpoints "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(42)
+        product_ids = [row[0] for row in conn.execute("SELECT product_id FROM products")]
+        busiest = [row[0] for row in conn.execute("SELECT product_id FROM inventory_transactions "
+                                                  "GROUP BY product_id ORDER BY COUNT(*) DESC LIMIT 10")]
+        for name, choices in (("any product", product_ids), ("busiest 10 products", busiest)):
+            lookups = [(rng.choice(choices), (END - timedelta(days=rng.randint(0, 365 * YEARS))).isoformat())
+                       for _ in range(LOOKUPS)]
+            started = time.perf_counter()
+            ledger = [conn.execute(LEDGER_STOCK_SQL, {'product_id': product_id, 'as_of': as_of}).fetchone()[0]
+                      for product_id, as_of in lookups]
+            ledger_time = (time.perf_counter() - started) / LOOKUPS * 1000
+            started = time.perf_counter()
+            checked = [stock_checkpoints.stock_on(conn, as_of, [product_id])[product_id]
+                       for product_id, as_of in lookups]
+            checkpoint_time = (time.perf_counter() - started) / LOOKUPS * 1000
+            mismatches = sum(a != b for a, b in zip(ledger, checked))
+            print(f"{name} on a random date: ledger {ledger_time:.3f} ms, checkpoints {checkpoint_time:.3f} ms "
+                  f"({mismatches} mismatches)")
+
+        for as_of in ((END - timedelta(days=365 * (YEARS - 1))).isoformat(), END.isoformat()):
+            started = time.perf_counter()
+            conn.execute('''
+                SELECT p.product_id, p.current_stock - COALESCE(SUM(t.quantity_change), 0)
+                FROM products p LEFT JOIN inventory_transactions t
+                ON t.product_id = p.product_id AND t.transaction_date >= date(?, '+1 day')
+                GROUP BY p.product_id
+            ''', (as_of,)).fetchall()
+            ledger_time = time.perf_counter() - started
+            started = time.perf_counter()
+            db.get_stock_on(as_of)
+            print(f"every product on {as_of}: ledger {ledger_time * 1000:.1f} ms, "
+                  f"checkpoints {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        started = time.perf_counter()
+        with db.transaction():
+            stock_checkpoints.rebuild(conn)
+        print(f"full rebuild: {time.perf_counter() - started:.2f}s")
+
+        # Posting cost: movements with and without the checkpoint triggers
+        batch = [(rng.choice(product_ids), 1, "Adjustment", None, "BENCH") for _ in range(5000)]
+
+        def post():
+            started = time.perf_counter()
+            db.post_inventory_movements(batch)
+            return (time.perf_counter() - started) / len(batch) * 1e6
+
+        with_triggers = post()
+        with db.transaction():
+            for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                        "AND name LIKE 'stock_checkpoint_%'").fetchall():
+                conn.execute(f"DROP TRIGGER {name}")
+        without_triggers = post()
+        print(f"posting a movement: {without_triggers:.1f} us without checkpoints, {with_triggers:.1f} us with")
+        db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
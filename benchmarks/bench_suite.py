@@ -0,0 +1,144 @@
+"""Benchmark suite for the main read paths on generated data.
+
+Generates a seeded database (or reuses one made by datagen.py), times
+get_client_statement, get_sales_statistics, get_product_availability,
+the aging report and client search, and writes the results to JSON so
+runs can be compared over time.
+
+Usage: python benchmarks/bench_suite.py [scale] [output.json] [database]
+"""
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ERPSQLiteDB import BusinessDatabase
+from ar_aging import ARAging
+from datagen import SCALES, generate
+from search_index import SearchIndex
+
+SEED = 42
+END = date(2026, 9, 30)
+REPEAT = 7
+
+
+def measure(fn, repeat=REPEAT):
+    """Run fn repeat times; returns timing stats in ms and the last result's row count"""
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+        rows = len(result) if result is not None else 0
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'min_ms': round(samples[0], 3),
+        'max_ms': round(samples[-1], 3),
+        'runs': repeat,
+        'rows': rows,
+    }
+
+
+def clients_by_activity(conn):
+    """The busiest, a median and a light client, by invoice count"""
+    ranked = [row[0] for row in conn.execute('''
+        SELECT o.client_id FROM invoices i JOIN sales_orders o ON i.order_id = o.order_id
+        GROUP BY o.client_id ORDER BY COUNT(*) DESC
+    ''')]
+    return {'heavy': ranked[0], 'median': ranked[len(ranked) // 2], 'light': ranked[-1]}
+
+
+def run_suite(db):
+    conn = db.conn
+    pool = db.pool
+    # Time the queries themselves, not result cache hits
+    pool.cache.enabled = False
+    aging = ARAging(pool)
+    search = SearchIndex(pool)
+    year_start = (END - timedelta(days=365)).isoformat()
+
+    cases = {}
+    for label, client_id in clients_by_activity(conn).items():
+        cases[f'client_statement_{label}'] = lambda c=client_id: db.get_client_statement(c)
+        cases[f'client_statement_{label}_1y'] = lambda c=client_id: db.get_client_statement(
+            c, year_start, END.isoformat())
+
+    cases['sales_statistics_1y'] = lambda: db.get_sales_statistics(year_start, END.isoformat())
+    cases['sales_statistics_all'] = lambda: db.get_sales_statistics('2000-01-01', END.isoformat())
+    cases['product_availability_all'] = lambda: db.get_product_availability()
+    cases['product_availability_category'] = lambda: db.get_product_availability(category='Electronics')
+    cases['product_availability_one'] = lambda: db.get_product_availability(product_id=1)
+
+    def aging_report():
+        with pool.reader() as reader:
+            return aging.report_rows(reader)
+
+    def aging_full_recompute():
+        with pool.reader() as reader:
+            return list(aging.compute(reader, END.isoformat()).items())
+
+    cases['aging_report'] = aging_report
+    cases['aging_full_recompute'] = aging_full_recompute
+
+    cases['client_search_name'] = lambda: search.search("clients", "Pacific", order_by="company_name")
+    cases['client_search_prefix'] = lambda: search.search("clients", "Sum", order_by="company_name")
+    cases['client_search_email'] = lambda: search.search("clients", "client42", order_by="company_name")
+
+    return {name: measure(fn) for name, fn in cases.items()}
+
+
+def table_counts(conn):
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE '%VIRTUAL%'")]
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+
+
+def run(scale, output, db_path=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_data = db_path is None or not os.path.exists(db_path)
+        db = BusinessDatabase(db_path or os.path.join(tmp, 'suite.db'))
+
+        generation_seconds = None
+        if generate_data:
+            started = time.perf_counter()
+            generate(db, scale if scale in SCALES else int(scale), SEED, END, progress=None)
+            generation_seconds = round(time.perf_counter() - started, 2)
+
+        results = run_suite(db)
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'scale': scale,
+                'seed': SEED,
+                'end_date': END.isoformat(),
+                'generation_seconds': generation_seconds,
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'rows': table_counts(db.conn),
+            },
+            'results': results,
+        }
+        db.close()
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in results.items():
+        print(f"{name:<34} {result['median_ms']:>10.2f} ms  {result['rows']:>8,} rows")
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else 'small',
+        sys.argv[2] if len(sys.argv) > 2 else 'bench_results.json',
+        sys.argv[3] if len(sys.argv) > 3 else None)
@@ -0,0 +1,248 @@
+"""Audit trail: an append-only change-data-capture log of master data.
+
+Triggers on the tracked tables append one row to change_log per inserted,
+updated or deleted record, in the same transaction as the write, so every
+path that writes those tables is covered and a rolled back write leaves
+no trace. Payloads are compact JSON:
+
+    insert   {"column": value, ...}            the new row, NULLs left out
+    update   {"column": [old, new], ...}       only the columns that changed
+    delete   {"column": value, ...}            the row as it was
+
+An UPDATE that changes nothing logs nothing. Updates that only move a
+product's current_stock fire no trigger at all: every stock movement
+already writes a row, with its reason, to the inventory_transactions
+ledger, and changes() merges those rows into a product's history as
+"stock" entries.
+
+compact() later rewrites old payloads as zlib blobs (with a preset
+dictionary of the column names, which is what makes payloads this small
+compress at all); changes() decodes both forms, so readers never need to
+know which rows were compacted.
+
+Usage: python change_log.py [database] [entity [entity_id]]
+       python change_log.py [database] compact
+"""
+import json
+import sys
+import zlib
+from datetime import date, datetime, timedelta
+
+# table -> (key column, logged columns); created_at is never logged
+TRACKED = {
+    'clients': ("client_id", ("company_name", "contact_person", "email", "phone", "address", "city", "country",
+                              "tax_id", "credit_limit", "payment_terms", "status", "assigned_to")),
+    'suppliers': ("supplier_id", ("company_name", "contact_person", "email", "phone", "address", "city", "country",
+                                  "tax_id", "lead_time_days", "payment_terms", "status")),
+    'products': ("product_id", ("sku", "name", "description", "category", "unit_price", "cost_price",
+                                "unit_of_measure", "reorder_level", "current_stock", "supplier_id")),
+    'employees': ("employee_id", ("first_name", "last_name", "email", "phone", "position", "department",
+                                  "hire_date", "salary", "status", "address")),
+}
+
+# Columns kept out of the update triggers because a ledger records them
+LEDGER_TRACKED = {'products': ("current_stock",)}
+LEDGER_COLUMNS = ("quantity_change", "transaction_type", "reference_number", "notes")
+
+OPERATIONS = {'I': "insert", 'U': "update", 'D': "delete", 'S': "stock"}
+
+# Preset zlib dictionary for compacted payloads. Compacted rows can only be
+# read with the dictionary they were written with: never edit it.
+ZDICT = "".join(f'"{column}":' for _, columns in TRACKED.values() for column in columns).encode()
+
+COMPACT_LEVEL = 6
+
+
+def _row_object(row, columns):
+    # json_patch drops the members whose value is NULL
+    pairs = ", ".join(f"'{column}', {row}.{column}" for column in columns)
+    return f"json_patch('{{}}', json_object({pairs}))"
+
+
+def _log(table, operation, row, key, payload):
+    return f'''INSERT INTO change_log (entity, entity_id, operation, payload)
+               VALUES ('{table}', {row}.{key}, '{operation}', {payload});'''
+
+
+def _schema():
+    statements = [
+        '''CREATE TABLE IF NOT EXISTS change_log (
+            change_id INTEGER PRIMARY KEY,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')), -- UTC
+            entity TEXT NOT NULL,
+            entity_id INTEGER,
+            operation TEXT NOT NULL, -- I, U or D
+            payload -- JSON text, or a zlib blob once compacted
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_change_log_entity_id ON change_log(entity, entity_id, change_id)",
+        '''CREATE TABLE IF NOT EXISTS change_log_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            compacted_through INTEGER NOT NULL -- last change_id compact() has seen
+        )''',
+        "INSERT OR IGNORE INTO change_log_state (id, compacted_through) VALUES (1, 0)",
+    ]
+
+    for table, (key, columns) in TRACKED.items():
+        updated = [column for column in columns if column not in LEDGER_TRACKED.get(table, ())]
+        changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in updated)
+        diff = ", ".join(f"'{column}', CASE WHEN old.{column} IS NOT new.{column} "
+                         f"THEN json_array(old.{column}, new.{column}) END" for column in updated)
+        statements += [
+            f'''CREATE TRIGGER IF NOT EXISTS change_log_{table}_ai AFTER INSERT ON {table} BEGIN
+                {_log(table, 'I', 'new', key, _row_object('new', columns))}
+            END''',
+            f'''CREATE TRIGGER IF NOT EXISTS change_log_{table}_ad AFTER DELETE ON {table} BEGIN
+                {_log(table, 'D', 'old', key, _row_object('old', columns))}
+            END''',
+            f'''CREATE TRIGGER IF NOT EXISTS change_log_{table}_au AFTER UPDATE OF {", ".join(updated)} ON {table}
+                WHEN {changed} BEGIN
+                {_log(table, 'U', 'new', key, f"json_patch('{{}}', json_object({diff}))")}
+            END''',
+        ]
+    return statements
+
+
+# Creates the log, its indexes and the capture triggers; run by migration 5
+CHANGE_LOG_SCHEMA = _schema()
+
+# Time-range queries; run by migration 8
+CHANGE_LOG_TIME_INDEX = ["CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log(changed_at)"]
+
+
+def encode(payload, level=COMPACT_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=ZDICT)
+    return compressor.compress(payload.encode()) + compressor.flush()
+
+
+def decode(payload):
+    """Payload as a dict, whether stored as JSON text or as a compacted blob"""
+    if isinstance(payload, bytes):
+        decompressor = zlib.decompressobj(-15, zdict=ZDICT)
+        payload = (decompressor.decompress(payload) + decompressor.flush()).decode()
+    return json.loads(payload) if payload else {}
+
+
+def compact(conn, through=None, batch_size=5000, level=COMPACT_LEVEL):
+    """Rewrite JSON payloads up to change_id through (default: all) as zlib blobs
+
+    Works in batches from where the last run stopped; payloads that would not
+    get smaller stay as text. Returns (rows compacted, bytes saved). Run it
+    inside a write transaction.
+    """
+    start = conn.execute("SELECT compacted_through FROM change_log_state WHERE id = 1").fetchone()[0]
+    if through is None:
+        through = conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM change_log").fetchone()[0]
+
+    compacted = saved = 0
+    while start < through:
+        rows = conn.execute('''
+            SELECT change_id, payload FROM change_log
+            WHERE change_id > ? AND change_id <= ?
+            ORDER BY change_id LIMIT ?
+        ''', (start, through, batch_size)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for change_id, payload in rows:
+            if isinstance(payload, str):
+                blob = encode(payload, level)
+                if len(blob) < len(payload):
+                    updates.append((blob, change_id))
+                    saved += len(payload) - len(blob)
+        conn.executemany("UPDATE change_log SET payload = ? WHERE change_id = ?", updates)
+        compacted += len(updates)
+        start = rows[-1][0]
+    conn.execute("UPDATE change_log_state SET compacted_through = MAX(compacted_through, ?) WHERE id = 1", (through,))
+    return compacted, saved
+
+
+def _upper_bound(end):
+    """Exclusive upper bound for an inclusive end date or timestamp
+
+    changed_at has millisecond precision, so an end given to the day or to
+    the second includes everything up to the next day or second.
+    """
+    if len(end) == 10:
+        return (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+    moment = datetime.fromisoformat(end)
+    if moment.microsecond:
+        return (moment + timedelta(milliseconds=1)).isoformat(" ", "milliseconds")
+    return (moment + timedelta(seconds=1)).isoformat(" ", "seconds")
+
+
+def changes(conn, entity=None, entity_id=None, start=None, end=None, limit=None):
+    """Logged changes, oldest first
+
+    Rows of (change_id, changed_at, entity, entity_id, operation, payload)
+    with operation spelled out and payload decoded to a dict. Product stock
+    movements come from the inventory_transactions ledger as "stock" rows
+    with no change_id. start and end are UTC dates or 'YYYY-MM-DD HH:MM:SS'
+    timestamps; entity_id needs an entity.
+    """
+    query = "SELECT change_id, changed_at, entity, entity_id, operation, payload FROM change_log WHERE 1=1"
+    ledger = ""
+    params, ledger_params = [], []
+    if entity is not None:
+        query += " AND entity = ?"
+        params.append(entity)
+    if entity_id is not None:
+        query += " AND entity_id = ?"
+        ledger += " AND product_id = ?"
+        params.append(entity_id)
+        ledger_params.append(entity_id)
+    if start:
+        query += " AND changed_at >= ?"
+        ledger += " AND transaction_date >= ?"
+        params.append(start)
+        ledger_params.append(start)
+    if end:
+        bound = _upper_bound(end)
+        query += " AND changed_at < ?"
+        ledger += " AND transaction_date < ?"
+        params.append(bound)
+        ledger_params.append(bound)
+
+    if entity in (None, 'products'):
+        query += f'''
+            UNION ALL
+            SELECT NULL, transaction_date, 'products', product_id, 'S',
+                   json_object({", ".join(f"'{column}', {column}" for column in LEDGER_COLUMNS)})
+            FROM inventory_transactions WHERE 1=1{ledger}'''
+        params += ledger_params
+    query += " ORDER BY 2, 1"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    return [(change_id, changed_at, entity, entity_id, OPERATIONS[operation], decode(payload))
+            for change_id, changed_at, entity, entity_id, operation, payload in conn.execute(query, params)]
+
+
+def history(conn, entity, entity_id):
+    """Every logged change of one record, oldest first"""
+    return changes(conn, entity, entity_id)
+
+
+def describe(payload, operation):
+    if operation == "update":
+        return ", ".join(f"{column}: {old!r} -> {new!r}" for column, (old, new) in payload.items())
+    return ", ".join(f"{column}={value!r}" for column, value in payload.items())
+
+
+if __name__ == "__main__":
+    from ERPSQLiteDB import BusinessDatabase
+    from database import DEFAULT_DB_NAME
+
+    db = BusinessDatabase(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_NAME)
+    try:
+        if len(sys.argv) > 2 and sys.argv[2] == "compact":
+            with db.transaction(immediate=True):
+                rows, saved = compact(db.conn)
+            print(f"Compacted {rows:,} change log payloads, {saved:,} bytes saved")
+        else:
+            entity = sys.argv[2] if len(sys.argv) > 2 else None
+            entity_id = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            for change_id, changed_at, entity, entity_id, operation, payload in changes(db.conn, entity, entity_id):
+                print(f"{changed_at}  {entity} {entity_id} {operation}: {describe(payload, operation)}")
+    finally:
+        db.close()
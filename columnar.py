@@ -0,0 +1,268 @@
+"""Column-oriented query results for large analysis loads.
+
+A list of row tuples costs a tuple plus a boxed int/float/str per cell,
+which is over 100 bytes per row for even a narrow query. ColumnarResult
+keeps integer and real columns in array buffers (8 bytes per cell) and
+text columns as 4-byte codes into one list of distinct strings, so
+repeated values such as statuses, categories and dates are stored once.
+
+Slicing returns a view over the same buffers, and column() hands out
+memoryviews (or NumPy arrays when NumPy is installed) without copying.
+"""
+import sys
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Rows read from the cursor per fetchmany call
+FETCH_SIZE = 10000
+
+INT, REAL, TEXT, OBJECT = "int", "real", "text", "object"
+
+# NumPy dtypes matching the array typecodes used for numeric columns
+NUMPY_TYPES = {'q': 'int64', 'd': 'float64'}
+
+
+class Column:
+    """One column's values: a typed buffer, plus a null mask for numeric columns"""
+
+    __slots__ = ('kind', 'values', 'nulls', 'strings', 'lookup', 'count')
+
+    def __init__(self):
+        self.kind = None
+        self.values = None
+        self.nulls = None
+        self.strings = None
+        self.lookup = None
+        self.count = 0
+
+    def _start(self, value):
+        """Pick the storage from the first non-NULL value; earlier rows were NULL"""
+        count = self.count
+        if not isinstance(value, (int, float, str)):
+            self.kind, self.values = OBJECT, [None] * count
+        elif isinstance(value, str):
+            self.kind, self.values = TEXT, array('i', [-1]) * count
+            self.strings, self.lookup = [], {}
+        else:
+            self.kind = INT if isinstance(value, int) else REAL
+            self.values = array('q' if self.kind == INT else 'd', bytes(8 * count))
+            if count:
+                self.nulls = bytearray(b'\x01' * count)
+
+    def _accepts(self, value):
+        if self.kind == OBJECT:
+            return True
+        if self.kind == TEXT:
+            return isinstance(value, str)
+        if not isinstance(value, (int, float)):
+            return False
+        return self.kind == REAL or isinstance(value, int)
+
+    def _promote(self, value):
+        """Widen the column so it can hold value"""
+        if self.kind == INT and isinstance(value, float):
+            self.kind, self.values = REAL, array('d', self.values)
+        else:
+            self.values = self.to_list()
+            self.kind, self.nulls, self.strings, self.lookup = OBJECT, None, None, None
+
+    def append(self, value):
+        if value is None:
+            if self.kind in (INT, REAL):
+                if self.nulls is None:
+                    self.nulls = bytearray(self.count)
+                self.nulls.append(1)
+                self.values.append(0)
+            elif self.kind == TEXT:
+                self.values.append(-1)
+            elif self.kind == OBJECT:
+                self.values.append(None)
+            self.count += 1
+            return
+
+        if self.kind is None:
+            self._start(value)
+        elif not self._accepts(value):
+            self._promote(value)
+
+        if self.kind == TEXT:
+            code = self.lookup.get(value)
+            if code is None:
+                code = self.lookup[value] = len(self.strings)
+                self.strings.append(value)
+            self.values.append(code)
+        else:
+            self.values.append(value)
+            if self.nulls is not None:
+                self.nulls.append(0)
+        self.count += 1
+
+    def extend(self, values):
+        """Append a batch of values; whole batches take a fast path when they fit"""
+        if self.kind == TEXT:
+            lookup = self.lookup
+            if None not in lookup:
+                lookup[None] = -1
+            missing = set(values).difference(lookup)
+            if all(isinstance(value, str) for value in missing):
+                for value in missing:
+                    lookup[value] = len(self.strings)
+                    self.strings.append(value)
+                self.values.extend(map(lookup.__getitem__, values))
+                self.count += len(values)
+                return
+        elif self.kind in (INT, REAL) and self.nulls is None:
+            before = len(self.values)
+            try:
+                self.values.extend(values)
+                self.count += len(values)
+                return
+            except TypeError:
+                # A NULL or a value of another type; undo the part that went in
+                del self.values[before:]
+        elif self.kind == OBJECT:
+            self.values.extend(values)
+            self.count += len(values)
+            return
+
+        for value in values:
+            self.append(value)
+
+    def finish(self):
+        """Drop build-time state once every row has been appended"""
+        if self.kind is None:
+            # Every value was NULL
+            self.kind, self.values = OBJECT, [None] * self.count
+        self.lookup = None
+
+    def get(self, index):
+        value = self.values[index]
+        if self.kind == TEXT:
+            return self.strings[value] if value >= 0 else None
+        if self.nulls is not None and self.nulls[index]:
+            return None
+        return value
+
+    def to_list(self, start=0, stop=None):
+        stop = self.count if stop is None else stop
+        if self.kind == TEXT:
+            strings = self.strings
+            return [strings[code] if code >= 0 else None for code in self.values[start:stop]]
+        values = list(self.values[start:stop])
+        if self.nulls is not None:
+            for offset, null in enumerate(self.nulls[start:stop]):
+                if null:
+                    values[offset] = None
+        return values
+
+    def nbytes(self):
+        size = sys.getsizeof(self.values)
+        if self.kind == OBJECT:
+            size += sum(sys.getsizeof(value) for value in self.values)
+        if self.strings is not None:
+            size += sys.getsizeof(self.strings) + sum(sys.getsizeof(value) for value in self.strings)
+        if self.nulls is not None:
+            size += sys.getsizeof(self.nulls)
+        return size
+
+
+class ColumnarResult:
+    """Query result stored by column; behaves like a read-only list of row tuples.
+
+    Indexing returns a row tuple, slicing with step 1 returns a
+    ColumnarResult sharing the parent's buffers.
+    """
+
+    def __init__(self, names, columns, start=0, stop=None):
+        self.names = list(names)
+        self.columns = columns
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self.start = start
+        self.stop = (columns[0].count if columns else 0) if stop is None else stop
+
+    @classmethod
+    def from_cursor(cls, cursor, fetch_size=FETCH_SIZE):
+        names = [description[0] for description in cursor.description or ()]
+        columns = [Column() for _ in names]
+        count = 0
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+            count += len(rows)
+        for column in columns:
+            column.finish()
+        return cls(names, columns, 0, count)
+
+    @classmethod
+    def from_query(cls, conn, sql, params=(), fetch_size=FETCH_SIZE):
+        return cls.from_cursor(conn.execute(sql, params), fetch_size)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        getters = [column.get for column in self.columns]
+        for index in range(self.start, self.stop):
+            yield tuple(get(index) for get in getters)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError("ColumnarResult slices must be contiguous")
+            return ColumnarResult(self.names, self.columns, self.start + start, self.start + max(start, stop))
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("row index out of range")
+        return tuple(column.get(self.start + item) for column in self.columns)
+
+    def kind(self, name):
+        return self.columns[self.index[name]].kind
+
+    def column(self, name):
+        """The values of one column for the rows in view.
+
+        Numeric columns without NULLs come back as a memoryview of the
+        buffer (a NumPy array when NumPy is installed), without copying;
+        text and mixed columns, and columns with NULLs, as a list.
+        """
+        column = self.columns[self.index[name]]
+        if column.kind in (INT, REAL) and column.nulls is None:
+            if numpy is not None:
+                return numpy.frombuffer(column.values, dtype=NUMPY_TYPES[column.values.typecode])[self.start:self.stop]
+            return memoryview(column.values)[self.start:self.stop]
+        return column.to_list(self.start, self.stop)
+
+    def codes(self, name):
+        """Text column as (memoryview of codes, distinct strings); code -1 is NULL"""
+        column = self.columns[self.index[name]]
+        if column.kind != TEXT:
+            raise TypeError(f"column {name} is not a text column")
+        return memoryview(column.values)[self.start:self.stop], column.strings
+
+    def to_numpy(self, name):
+        if numpy is None:
+            raise RuntimeError("to_numpy requires numpy (pip install numpy)")
+        column = self.columns[self.index[name]]
+        if column.kind in (INT, REAL):
+            values = numpy.frombuffer(column.values, dtype=NUMPY_TYPES[column.values.typecode])[self.start:self.stop]
+            if column.nulls is not None:
+                mask = numpy.frombuffer(column.nulls, dtype='uint8')[self.start:self.stop].astype(bool)
+                values = numpy.where(mask, numpy.nan, values)
+            return values
+        return numpy.array(column.to_list(self.start, self.stop), dtype=object)
+
+    def rows(self):
+        return list(self)
+
+    def nbytes(self):
+        """Approximate memory held by the shared buffers"""
+        return sum(column.nbytes() for column in self.columns)
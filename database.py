@@ -0,0 +1,224 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from queue import Queue, Empty
+
+from query_profiler import ProfiledConnection
+from result_cache import ResultCache
+
+DEFAULT_DB_NAME = 'erp_system.db'
+
+# Applied to every connection the pool opens
+CONNECTION_PRAGMAS = [
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+]
+
+
+class ConnectionPool:
+    """Process-wide connection manager for one database file.
+
+    Holds a single long-lived writer connection (guarded by a lock, since
+    SQLite only allows one writer at a time) and a pool of read-only reader
+    connections. The database is switched to WAL mode so readers never block
+    the writer and vice versa.
+    """
+
+    def __init__(self, db_name=DEFAULT_DB_NAME, readers=4, statement_cache=256, timeout=30.0):
+        self.db_name = db_name
+        self.max_readers = readers
+        self.statement_cache = statement_cache
+        self.timeout = timeout
+
+        self.writer_lock = threading.RLock()
+        self.writer_depth = 0
+        self.writer_connection = self._connect()
+        self.writer_connection.execute("PRAGMA journal_mode = WAL")
+
+        self.idle_readers = Queue()
+        self.reader_count = 0
+        self.reader_count_lock = threading.Lock()
+
+        self.stats_lock = threading.Lock()
+        self.counters = {
+            'reader_hits': 0,
+            'reader_misses': 0,
+            'reader_waits': 0,
+            'reader_wait_time': 0.0,
+            'writer_acquires': 0,
+            'writer_wait_time': 0.0,
+        }
+
+        # Cached lookups; writers invalidate the tables they change
+        self.cache = ResultCache(in_transaction=lambda: self.writer_connection.in_transaction)
+
+    @property
+    def in_memory(self):
+        return self.db_name == ':memory:' or self.db_name.startswith('file::memory:')
+
+    def _connect(self, read_only=False):
+        if read_only:
+            conn = sqlite3.connect(f"file:{self.db_name}?mode=ro", uri=True,
+                                   timeout=self.timeout,
+                                   check_same_thread=False,
+                                   cached_statements=self.statement_cache,
+                                   factory=ProfiledConnection)
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn = sqlite3.connect(self.db_name,
+                                   timeout=self.timeout,
+                                   check_same_thread=False,
+                                   cached_statements=self.statement_cache,
+                                   factory=ProfiledConnection)
+
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _count(self, name, amount=1):
+        with self.stats_lock:
+            self.counters[name] += amount
+
+    def _acquire_reader(self):
+        # Reuse an idle connection when one is available
+        try:
+            conn = self.idle_readers.get_nowait()
+            self._count('reader_hits')
+            return conn
+        except Empty:
+            pass
+
+        # Otherwise open a new one if the pool has room
+        with self.reader_count_lock:
+            if self.reader_count < self.max_readers:
+                self.reader_count += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            self._count('reader_misses')
+            try:
+                return self._connect(read_only=True)
+            except sqlite3.Error:
+                with self.reader_count_lock:
+                    self.reader_count -= 1
+                raise
+
+        # Pool exhausted, wait for a connection to be returned
+        started = time.perf_counter()
+        conn = self.idle_readers.get(timeout=self.timeout)
+        with self.stats_lock:
+            self.counters['reader_waits'] += 1
+            self.counters['reader_wait_time'] += time.perf_counter() - started
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only connection for the duration of the block"""
+        # In-memory databases cannot be shared between connections
+        if self.in_memory:
+            with self.writer() as conn:
+                yield conn
+            return
+
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self.idle_readers.put(conn)
+
+    @contextmanager
+    def writer(self, immediate=False):
+        """Hold the writer connection; commits on success, rolls back on error.
+
+        Nested blocks (including BusinessDatabase.transaction, which is built
+        on this) join the outer transaction and only the outermost block
+        commits. The outermost block begins the transaction explicitly;
+        immediate takes SQLite's write lock up front.
+        """
+        started = time.perf_counter()
+        self.writer_lock.acquire()
+        with self.stats_lock:
+            self.counters['writer_acquires'] += 1
+            self.counters['writer_wait_time'] += time.perf_counter() - started
+
+        self.writer_depth += 1
+        try:
+            if self.writer_depth == 1 and not self.writer_connection.in_transaction:
+                self.writer_connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            yield self.writer_connection
+            if self.writer_depth == 1:
+                self.writer_connection.commit()
+        except BaseException:
+            if self.writer_depth == 1:
+                self.writer_connection.rollback()
+            raise
+        finally:
+            self.writer_depth -= 1
+            self.writer_lock.release()
+
+    def stats(self):
+        """Return a snapshot of the pool counters"""
+        with self.stats_lock:
+            snapshot = dict(self.counters)
+        snapshot['readers_open'] = self.reader_count
+        snapshot['readers_idle'] = self.idle_readers.qsize()
+        return snapshot
+
+    def close(self):
+        """Close the writer and every idle reader connection"""
+        self.cache.clear()
+        while True:
+            try:
+                self.idle_readers.get_nowait().close()
+            except Empty:
+                break
+        with self.writer_lock:
+            self.writer_connection.close()
+
+
+_pools = {}
+_databases = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name=DEFAULT_DB_NAME):
+    """Return the shared pool for db_name, creating it on first use"""
+    with _pools_lock:
+        pool = _pools.get(db_name)
+        if pool is None:
+            pool = ConnectionPool(db_name)
+            _pools[db_name] = pool
+        return pool
+
+
+def close_pool(db_name=DEFAULT_DB_NAME):
+    """Close and forget the shared pool for db_name"""
+    with _pools_lock:
+        pool = _pools.pop(db_name, None)
+        _databases.pop(db_name, None)
+    if pool is not None:
+        pool.close()
+
+
+def create_database(db_name=DEFAULT_DB_NAME):
+    """Create (or open) the application database through the shared pool.
+
+    The schema is checked and migrated once per process; later calls return
+    the same BusinessDatabase.
+    """
+    from ERPSQLiteDB import BusinessDatabase
+
+    with _pools_lock:
+        database = _databases.get(db_name)
+    if database is None:
+        database = BusinessDatabase(db_name)
+        with _pools_lock:
+            database = _databases.setdefault(db_name, database)
+    return database
@@ -0,0 +1,590 @@
+"""Deterministic synthetic data for the ERP schema.
+
+Fills every business table with data shaped like a real distributor:
+client activity and product popularity follow a Zipf-like skew, sales
+are seasonal with year-on-year growth, older invoices are mostly paid
+and recent ones mostly open, and stock moves through purchase receipts
+and sales deliveries. The same seed, scale and end date always produce
+the same database.
+
+Usage: python datagen.py <database> [scale] [seed] [end YYYY-MM-DD]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+import stock_checkpoints
+
+# Rows per executemany call / transaction
+CHUNK_SIZE = 20000
+
+# Invoices per scale; everything else is sized from the invoice count
+SCALES = {
+    'tiny': 2000,
+    'small': 20000,
+    'medium': 250000,
+    'large': 2000000,
+}
+
+YEARS = 3
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David",
+               "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas",
+               "Sarah", "Charles", "Karen", "Wei", "Aiko", "Carlos", "Fatima", "Ivan", "Priya"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore",
+              "Chen", "Tanaka", "Silva", "Khan", "Petrov", "Patel", "Dubois", "Rossi", "Novak"]
+COMPANY_WORDS = ["Global", "Pacific", "Summit", "Pioneer", "Atlas", "Vertex", "Harbor", "Northern",
+                 "Crescent", "Evergreen", "Silverline", "Keystone", "Blue Ridge", "Redwood", "Sterling",
+                 "Union", "Metro", "Prime", "Coastal", "Frontier", "Horizon", "Liberty", "Apex", "Cedar"]
+COMPANY_KINDS = ["Trading", "Industries", "Logistics", "Supplies", "Holdings", "Manufacturing",
+                 "Retail", "Systems", "Distribution", "Enterprises", "Solutions", "Foods"]
+COMPANY_SUFFIXES = ["Ltd", "Inc", "LLC", "Corp", "GmbH", "Pty Ltd", "SA", "Co"]
+CITIES = [("New York", "USA"), ("Chicago", "USA"), ("Houston", "USA"), ("Toronto", "Canada"),
+          ("London", "UK"), ("Manchester", "UK"), ("Berlin", "Germany"), ("Paris", "France"),
+          ("Madrid", "Spain"), ("Milan", "Italy"), ("Tokyo", "Japan"), ("Singapore", "Singapore"),
+          ("Sydney", "Australia"), ("Sao Paulo", "Brazil"), ("Mexico City", "Mexico"),
+          ("Mumbai", "India"), ("Dubai", "UAE"), ("Manila", "Philippines")]
+DEPARTMENTS = [("Sales", "Sales Representative"), ("Sales", "Account Manager"), ("Purchasing", "Buyer"),
+               ("Warehouse", "Warehouse Clerk"), ("Accounting", "Accountant"), ("Logistics", "Dispatcher")]
+CATEGORIES = {
+    'Electronics': (80, 2500), 'Accessories': (5, 120), 'Office': (2, 300), 'Furniture': (60, 1500),
+    'Tools': (10, 600), 'Networking': (20, 900), 'Storage': (30, 700), 'Consumables': (1, 60),
+}
+PRODUCT_ADJECTIVES = ["Compact", "Pro", "Ultra", "Heavy Duty", "Wireless", "Smart", "Classic", "Eco",
+                      "Premium", "Portable", "Industrial", "Mini"]
+PRODUCT_NOUNS = {
+    'Electronics': ["Laptop", "Monitor", "Tablet", "Printer", "Projector", "Scanner"],
+    'Accessories': ["Mouse", "Keyboard", "Headset", "Webcam", "Dock", "Charger"],
+    'Office': ["Stapler", "Shredder", "Whiteboard", "Desk Lamp", "Label Maker", "Binder Set"],
+    'Furniture': ["Desk", "Chair", "Cabinet", "Bookshelf", "Workstation", "Filing Drawer"],
+    'Tools': ["Drill", "Saw", "Wrench Set", "Multimeter", "Soldering Station", "Tool Kit"],
+    'Networking': ["Router", "Switch", "Access Point", "Firewall", "Patch Panel", "Modem"],
+    'Storage': ["SSD", "NAS", "Hard Drive", "USB Drive", "Tape Cartridge", "Memory Card"],
+    'Consumables': ["Paper Ream", "Toner", "Ink Cartridge", "Batteries", "Cable Ties", "Labels"],
+}
+PAYMENT_METHODS = ["Bank Transfer", "Bank Transfer", "Bank Transfer", "Check", "Credit Card", "Cash"]
+PAYMENT_TERMS = [("NET30", 30), ("NET30", 30), ("NET60", 60), ("NET15", 15), ("COD", 0)]
+TAX_RATE = 0.10
+
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative weights where the item at rank r is picked about 1/r**exponent often"""
+    return list(accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def season_weights(days):
+    """Cumulative weights for picking a sale date: growth, seasonality, quiet weekends"""
+    first = days[0]
+    weights = []
+    for day in days:
+        growth = 1.0 + 0.15 * (day - first).days / 365.0
+        season = 1.0 + 0.25 * (day.month in (11, 12)) - 0.15 * (day.month in (1, 7, 8))
+        weekday = 0.25 if day.weekday() >= 5 else 1.0
+        weights.append(growth * season * weekday)
+    return list(accumulate(weights))
+
+
+def chunks(rows, size=CHUNK_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Numbering:
+    """Document numbers in the PREFIXyyyymmNNNN style of reserve_document_numbers"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.counters = {}
+
+    def next(self, day):
+        period = day.strftime('%Y%m')
+        value = self.counters.get(period, 0) + 1
+        self.counters[period] = value
+        return f"{self.prefix}{period}{value:04d}"
+
+
+class DataGenerator:
+    def __init__(self, db, invoices=SCALES['small'], seed=42, end=None, progress=print, years=YEARS):
+        self.db = db
+        self.conn = db.conn
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.invoice_count = invoices
+        self.end = end or (date.today().replace(day=1) - timedelta(days=1))
+        self.start = self.end - timedelta(days=365 * years)
+        self.progress = progress or (lambda message: None)
+        self.counts = {}
+
+        self.employee_count = max(10, min(300, invoices // 5000))
+        self.client_count = max(50, invoices // 150)
+        self.supplier_count = max(10, invoices // 5000)
+        self.product_count = max(100, min(50000, invoices // 40))
+
+        self.days = [self.start + timedelta(days=n) for n in range((self.end - self.start).days + 1)]
+        self.day_weights = season_weights(self.days)
+
+    def base_id(self, table, column):
+        return self.conn.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}").fetchone()[0]
+
+    def insert(self, table, columns, rows):
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        count = 0
+        for batch in chunks(rows):
+            with self.db.transaction() as cursor:
+                cursor.executemany(sql, batch)
+            count += len(batch)
+        self.counts[table] = self.counts.get(table, 0) + count
+        return count
+
+    def person(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def phone(self):
+        return f"+{self.rng.randint(1, 99)}-{self.rng.randint(100, 999)}-{self.rng.randint(1000000, 9999999)}"
+
+    def company(self, n):
+        rng = self.rng
+        return f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_KINDS)} {n} {rng.choice(COMPANY_SUFFIXES)}"
+
+    def generate(self):
+        started = time.perf_counter()
+        steps = [self.employees, self.clients, self.suppliers, self.products, self.inquiries,
+                 self.quotations, self.sales, self.purchasing, self.checkpoints, self.forecasts, self.communications,
+                 self.sequences]
+        for step in steps:
+            step_started = time.perf_counter()
+            step()
+            self.progress(f"{step.__name__}: {time.perf_counter() - step_started:.1f}s")
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+        self.db.pool.cache.clear()
+        self.progress(f"generated in {time.perf_counter() - started:.1f}s")
+        return self.counts
+
+    def employees(self):
+        base = self.base_id("employees", "employee_id")
+        rows = []
+        for n in range(self.employee_count):
+            first, last = self.person()
+            department, position = self.rng.choice(DEPARTMENTS)
+            hired = self.start - timedelta(days=self.rng.randint(0, 3000))
+            rows.append((base + n + 1, first, last, f"{first.lower()}.{last.lower()}.{base + n + 1}@company.com",
+                         self.phone(), position, department, hired.isoformat(),
+                         round(self.rng.uniform(35000, 120000), -2)))
+        self.insert("employees", ["employee_id", "first_name", "last_name", "email", "phone", "position",
+                                  "department", "hire_date", "salary"], rows)
+        self.employee_ids = [row[0] for row in rows]
+        self.sales_reps = [row[0] for row in rows if row[6] == "Sales"] or self.employee_ids
+
+    def clients(self):
+        base = self.base_id("clients", "client_id")
+        rng = self.rng
+
+        def rows():
+            for n in range(self.client_count):
+                first, last = self.person()
+                city, country = rng.choice(CITIES)
+                terms, _ = rng.choice(PAYMENT_TERMS)
+                status = "Active" if rng.random() < 0.92 else "Inactive"
+                client_id = base + n + 1
+                yield (client_id, self.company(client_id), f"{first} {last}",
+                       f"{first.lower()}@client{client_id}.example.com", self.phone(),
+                       f"{rng.randint(1, 9999)} {rng.choice(LAST_NAMES)} Street", city, country,
+                       f"TAX{client_id:08d}", rng.choice([5000, 10000, 25000, 50000, 100000]),
+                       terms, status, rng.choice(self.sales_reps))
+
+        self.insert("clients", ["client_id", "company_name", "contact_person", "email", "phone", "address",
+                                "city", "country", "tax_id", "credit_limit", "payment_terms", "status",
+                                "assigned_to"], rows())
+
+        # Shuffle so the busiest clients are not simply the lowest ids
+        self.client_ids = list(range(base + 1, base + self.client_count + 1))
+        rng.shuffle(self.client_ids)
+        self.client_weights = zipf_weights(len(self.client_ids))
+        # Share of clients who pay late, on time or early
+        self.client_delay = {client_id: rng.choice([-5, 0, 0, 5, 15, 45]) for client_id in self.client_ids}
+
+    def suppliers(self):
+        base = self.base_id("suppliers", "supplier_id")
+        rows = []
+        for n in range(self.supplier_count):
+            first, last = self.person()
+            city, country = self.rng.choice(CITIES)
+            supplier_id = base + n + 1
+            rows.append((supplier_id, self.company(supplier_id), f"{first} {last}",
+                         f"sales@supplier{supplier_id}.example.com", self.phone(), city, country,
+                         self.rng.choice([3, 5, 7, 14, 21, 30, 45])))
+        self.insert("suppliers", ["supplier_id", "company_name", "contact_person", "email", "phone",
+                                  "city", "country", "lead_time_days"], rows)
+        self.supplier_ids = [row[0] for row in rows]
+
+    def products(self):
+        base = self.base_id("products", "product_id")
+        rng = self.rng
+        categories = list(CATEGORIES)
+        self.product_price = {}
+        self.product_cost = {}
+        rows = []
+        for n in range(self.product_count):
+            product_id = base + n + 1
+            category = rng.choice(categories)
+            low, high = CATEGORIES[category]
+            price = round(rng.uniform(low, high), 2)
+            cost = round(price * rng.uniform(0.55, 0.8), 2)
+            self.product_price[product_id] = price
+            self.product_cost[product_id] = cost
+            rows.append((product_id, f"GEN-{product_id:06d}",
+                         f"{rng.choice(PRODUCT_ADJECTIVES)} {rng.choice(PRODUCT_NOUNS[category])} {product_id}",
+                         f"{category} item {product_id}", category, price, cost,
+                         rng.choice([5, 10, 20, 50]), rng.choice(self.supplier_ids)))
+        self.insert("products", ["product_id", "sku", "name", "description", "category", "unit_price",
+                                 "cost_price", "reorder_level", "supplier_id"], rows)
+        self.product_ids = [row[0] for row in rows]
+        rng.shuffle(self.product_ids)
+        self.product_weights = zipf_weights(len(self.product_ids), exponent=0.9)
+        self.product_supplier = {row[0]: row[8] for row in rows}
+
+    def pick_clients(self, k):
+        return self.rng.choices(self.client_ids, cum_weights=self.client_weights, k=k)
+
+    def pick_products(self, k):
+        return self.rng.choices(self.product_ids, cum_weights=self.product_weights, k=k)
+
+    def pick_days(self, k):
+        return self.rng.choices(self.days, cum_weights=self.day_weights, k=k)
+
+    def line_items(self):
+        """(product_id, quantity, unit_price) for one document"""
+        count = min(12, int(self.rng.expovariate(1 / 2.5)) + 1)
+        return [(product_id, max(1, int(self.rng.lognormvariate(1.2, 0.8))), self.product_price[product_id])
+                for product_id in self.pick_products(count)]
+
+    def inquiries(self):
+        rng = self.rng
+        count = max(20, self.invoice_count // 10)
+        inquiry_base = self.base_id("client_inquiries", "inquiry_id")
+        inquiries, lines = [], []
+        for n, (client_id, day) in enumerate(zip(self.pick_clients(count), self.pick_days(count))):
+            inquiry_id = inquiry_base + n + 1
+            inquiries.append((inquiry_id, client_id, day.isoformat(), "Request for pricing and availability",
+                              rng.choice(["Low", "Normal", "Normal", "High"]),
+                              rng.choice(["Open", "Quoted", "Quoted", "Closed"]), rng.choice(self.sales_reps)))
+            for product_id, quantity, _ in self.line_items():
+                lines.append((inquiry_id, product_id, quantity))
+        self.insert("client_inquiries", ["inquiry_id", "client_id", "inquiry_date", "inquiry_details", "priority",
+                                         "status", "assigned_to"], inquiries)
+        self.insert("inquiry_products", ["inquiry_id", "product_id", "quantity"], lines)
+        self.inquiry_clients = [(row[0], row[1], row[2]) for row in inquiries]
+
+    def quotations(self):
+        rng = self.rng
+        numbering = Numbering("QUOT")
+        quotation_base = self.base_id("quotations", "quotation_id")
+        quotations, lines = [], []
+        for n, (inquiry_id, client_id, inquiry_date) in enumerate(self.inquiry_clients):
+            quotation_id = quotation_base + n + 1
+            issued = date.fromisoformat(inquiry_date) + timedelta(days=rng.randint(0, 5))
+            if issued > self.end:
+                issued = self.end
+            total = 0
+            for product_id, quantity, price in self.line_items():
+                discount = rng.choice([0, 0, 0, 5, 10])
+                line_total = round(quantity * price * (1 - discount / 100), 2)
+                total += line_total
+                lines.append((quotation_id, product_id, quantity, price, discount,
+                              round(quantity * price - line_total, 2), line_total, rng.choice([3, 7, 14])))
+            total = round(total, 2)
+            tax = round(total * TAX_RATE, 2)
+            quotations.append((quotation_id, numbering.next(issued), client_id, inquiry_id, issued.isoformat(),
+                               (issued + timedelta(days=30)).isoformat(),
+                               rng.choice(["Sent", "Accepted", "Accepted", "Rejected", "Expired"]),
+                               total, TAX_RATE * 100, tax, round(total + tax, 2), rng.choice(self.sales_reps)))
+        self.insert("quotations", ["quotation_id", "quotation_number", "client_id", "inquiry_id", "issue_date",
+                                   "expiry_date", "status", "total_amount", "tax_percentage", "tax_amount",
+                                   "grand_total", "prepared_by"], quotations)
+        self.insert("quotation_items", ["quotation_id", "product_id", "quantity", "unit_price",
+                                        "discount_percentage", "discount_amount", "line_total",
+                                        "estimated_delivery_days"], lines)
+        self.numbering = {'QUOT': numbering}
+        self.accepted_quotations = [(row[0], row[2]) for row in quotations if row[6] == "Accepted"]
+
+    def sales(self):
+        """Sales orders with their lines, deliveries, invoices, receipts and stock movements"""
+        rng = self.rng
+        numbering = {prefix: Numbering(prefix) for prefix in ("SO", "DN", "INV", "RCPT")}
+        self.numbering.update(numbering)
+        base = {
+            'order': self.base_id("sales_orders", "order_id"),
+            'item': self.base_id("sales_order_items", "order_item_id"),
+            'delivery': self.base_id("delivery_notes", "delivery_id"),
+            'invoice': self.base_id("invoices", "invoice_id"),
+        }
+        terms_days = dict(PAYMENT_TERMS)
+        client_terms = dict(self.conn.execute("SELECT client_id, payment_terms FROM clients"))
+        quotations = iter(self.accepted_quotations)
+        self.sold = {}
+
+        def documents():
+            """Yield one tuple of rows per table for each order"""
+            order_days = sorted(self.pick_days(self.invoice_count))
+            clients = self.pick_clients(self.invoice_count)
+            item_id = base['item']
+            for n, (day, client_id) in enumerate(zip(order_days, clients)):
+                order_id = base['order'] + n + 1
+                delivery_id = base['delivery'] + n + 1
+                invoice_id = base['invoice'] + n + 1
+                quotation_id = None
+                if rng.random() < 0.3:
+                    quotation = next(quotations, None)
+                    if quotation is not None:
+                        quotation_id, client_id = quotation
+
+                items, deliveries, movements = [], [], []
+                subtotal = 0
+                for product_id, quantity, price in self.line_items():
+                    item_id += 1
+                    discount = round(quantity * price * rng.choice([0, 0, 0, 0.05]), 2)
+                    line_total = round(quantity * price - discount, 2)
+                    subtotal += line_total
+                    items.append((item_id, order_id, product_id, quantity, price, discount, line_total, "Delivered"))
+                    deliveries.append((delivery_id, item_id, quantity))
+                    movements.append((product_id, quantity))
+                    self.sold[product_id] = self.sold.get(product_id, 0) + quantity
+                subtotal = round(subtotal, 2)
+                tax = round(subtotal * TAX_RATE, 2)
+                total = round(subtotal + tax, 2)
+
+                terms = client_terms.get(client_id) or "NET30"
+                due = day + timedelta(days=terms_days.get(terms, 30))
+                delivered = day + timedelta(days=rng.randint(1, 7))
+
+                # Payment: older invoices are paid, late payers lag by their delay
+                age = (self.end - due).days - self.client_delay.get(client_id, 0)
+                if age > 60 or (age > 0 and rng.random() < 0.85):
+                    paid = total
+                elif age > -30 and rng.random() < 0.3:
+                    paid = round(total * rng.choice([0.25, 0.5]), 2)
+                else:
+                    paid = 0
+                status = "Paid" if paid == total else ("Partially Paid" if paid else
+                                                       ("Overdue" if due < self.end else "Unpaid"))
+
+                receipts = []
+                if paid:
+                    paid_on = min(self.end, due + timedelta(days=self.client_delay.get(client_id, 0)
+                                                            + rng.randint(-10, 10)))
+                    paid_on = max(paid_on, day)
+                    receipts.append((numbering["RCPT"].next(paid_on), invoice_id, paid_on.isoformat(),
+                                     "Official", rng.choice(PAYMENT_METHODS), paid, f"REF{invoice_id:09d}"))
+
+                yield (
+                    (order_id, numbering["SO"].next(day), client_id, quotation_id, day.isoformat(),
+                     delivered.isoformat(), "Delivered", subtotal, tax, total, terms, rng.choice(self.sales_reps)),
+                    items,
+                    (delivery_id, numbering["DN"].next(delivered), order_id, delivered.isoformat(),
+                     rng.choice(["Courier", "Freight", "Pickup"]), f"TRK{delivery_id:010d}", "Delivered",
+                     delivered.isoformat()),
+                    deliveries,
+                    (invoice_id, numbering["INV"].next(day), order_id, delivery_id, day.isoformat(),
+                     due.isoformat(), status, subtotal, tax, total, paid, round(total - paid, 2), terms),
+                    receipts,
+                    [(product_id, "Sale", order_id, None, -quantity, self.product_cost[product_id],
+                      f"{delivered.isoformat()} 12:00:00") for product_id, quantity in movements],
+                )
+
+        tables = [
+            ("sales_orders", ["order_id", "order_number", "client_id", "quotation_id", "order_date",
+                              "expected_delivery_date", "status", "total_amount", "tax_amount", "grand_total",
+                              "payment_terms", "created_by"], False),
+            ("sales_order_items", ["order_item_id", "order_id", "product_id", "quantity", "unit_price",
+                                   "discount_amount", "line_total", "status"], True),
+            ("delivery_notes", ["delivery_id", "delivery_number", "order_id", "delivery_date", "shipping_method",
+                                "tracking_number", "status", "received_date"], False),
+            ("delivery_note_items", ["delivery_id", "order_item_id", "quantity_delivered"], True),
+            ("invoices", ["invoice_id", "invoice_number", "order_id", "delivery_id", "invoice_date", "due_date",
+                          "status", "subtotal", "tax_amount", "grand_total", "amount_paid", "balance_due",
+                          "payment_terms"], False),
+            ("receipts", ["receipt_number", "invoice_id", "receipt_date", "receipt_type", "payment_method",
+                          "amount", "reference_number"], True),
+            ("inventory_transactions", ["product_id", "transaction_type", "reference_id", "reference_number",
+                                        "quantity_change", "unit_cost", "transaction_date"], True),
+        ]
+        sql = [f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+               for table, columns, _ in tables]
+
+        batch_size = max(1, CHUNK_SIZE // 4)
+        batch = []
+        for document in documents():
+            batch.append(document)
+            if len(batch) == batch_size:
+                self.write_documents(tables, sql, batch)
+                batch = []
+        if batch:
+            self.write_documents(tables, sql, batch)
+
+    def write_documents(self, tables, sql, documents):
+        with self.db.transaction() as cursor:
+            for index, (table, _, many) in enumerate(tables):
+                if many:
+                    rows = [row for document in documents for row in document[index]]
+                else:
+                    rows = [document[index] for document in documents]
+                cursor.executemany(sql[index], rows)
+                self.counts[table] = self.counts.get(table, 0) + len(rows)
+
+    def purchasing(self):
+        """Purchase orders and goods receipts that replenish what was sold"""
+        rng = self.rng
+        numbering = {prefix: Numbering(prefix) for prefix in ("PO", "GRN")}
+        self.numbering.update(numbering)
+        po_base = self.base_id("purchase_orders", "po_id")
+        item_base = self.base_id("purchase_order_items", "po_item_id")
+        receipt_base = self.base_id("goods_receipts", "receipt_id")
+
+        # Buy each product's sales plus some safety stock, in a few orders per supplier
+        by_supplier = {}
+        for product_id, sold in self.sold.items():
+            by_supplier.setdefault(self.product_supplier[product_id], []).append(
+                (product_id, sold + rng.randint(10, 60)))
+        for product_id in self.product_ids:
+            if product_id not in self.sold:
+                by_supplier.setdefault(self.product_supplier[product_id], []).append(
+                    (product_id, rng.randint(10, 60)))
+
+        orders, items, receipts, receipt_items, movements = [], [], [], [], []
+        po_id, item_id, receipt_id = po_base, item_base, receipt_base
+        for supplier_id, wanted in sorted(by_supplier.items()):
+            splits = max(1, min(36, len(wanted)))
+            for part in range(splits):
+                lines = wanted[part::splits]
+                if not lines:
+                    continue
+                po_id += 1
+                receipt_id += 1
+                issued = self.start + timedelta(days=int(part * (len(self.days) - 30) / splits))
+                received = issued + timedelta(days=rng.choice([3, 5, 7, 14, 21]))
+                total = 0
+                for product_id, quantity in lines:
+                    item_id += 1
+                    cost = self.product_cost[product_id]
+                    line_total = round(quantity * cost, 2)
+                    total += line_total
+                    items.append((item_id, po_id, product_id, quantity, cost, line_total,
+                                  received.isoformat(), quantity, "Received"))
+                    receipt_items.append((receipt_id, item_id, quantity, cost, f"B{po_id:06d}",
+                                          f"WH-{rng.randint(1, 20):02d}"))
+                    movements.append((product_id, "Purchase", po_id, None, quantity, cost,
+                                      f"{received.isoformat()} 09:00:00"))
+                total = round(total, 2)
+                tax = round(total * TAX_RATE, 2)
+                po_number = numbering["PO"].next(issued)
+                orders.append((po_id, po_number, supplier_id, issued.isoformat(), received.isoformat(), "Received",
+                               total, tax, round(total + tax, 2), "NET30", issued.isoformat(), "Confirmed",
+                               rng.choice(self.employee_ids)))
+                receipts.append((receipt_id, numbering["GRN"].next(received), po_id, received.isoformat(),
+                                 rng.choice(self.employee_ids), f"SDN-{po_id:07d}", "Received"))
+
+        self.insert("purchase_orders", ["po_id", "po_number", "supplier_id", "issue_date", "expected_delivery_date",
+                                        "status", "total_amount", "tax_amount", "grand_total", "payment_terms",
+                                        "confirmed_date", "confirmed_by_supplier", "created_by"], orders)
+        self.insert("purchase_order_items", ["po_item_id", "po_id", "product_id", "quantity", "unit_price",
+                                             "line_total", "expected_date", "received_quantity", "status"], items)
+        self.insert("goods_receipts", ["receipt_id", "receipt_number", "po_id", "receipt_date", "received_by",
+                                       "supplier_delivery_note", "status"], receipts)
+        self.insert("goods_receipt_items", ["receipt_id", "po_item_id", "quantity_received", "unit_price",
+                                            "batch_number", "location"], receipt_items)
+        self.insert("inventory_transactions", ["product_id", "transaction_type", "reference_id", "reference_number",
+                                               "quantity_change", "unit_cost", "transaction_date"], movements)
+
+        # Stock on hand is what was received less what was sold
+        bought = {}
+        for product_id, _, _, _, quantity, _, _ in movements:
+            bought[product_id] = bought.get(product_id, 0) + quantity
+        with self.db.transaction() as cursor:
+            cursor.executemany("UPDATE products SET current_stock = ? WHERE product_id = ?",
+                               [(quantity - self.sold.get(product_id, 0), product_id)
+                                for product_id, quantity in bought.items()])
+
+    def checkpoints(self):
+        """Month-end stock checkpoints over the generated ledger"""
+        with self.db.transaction():
+            stock_checkpoints.rebuild(self.conn)
+        self.counts["stock_checkpoints"] = self.conn.execute("SELECT COUNT(*) FROM stock_checkpoints").fetchone()[0]
+
+    def forecasts(self):
+        """Monthly forecasts for the most popular products"""
+        rng = self.rng
+        top = self.product_ids[:min(len(self.product_ids), 500)]
+        months = sorted({day.replace(day=1) for day in self.days})
+        rows = []
+        for product_id in top:
+            level = max(1, self.sold.get(product_id, 0) / len(months))
+            for month in months:
+                actual = max(0, int(rng.gauss(level, level * 0.3)))
+                forecast = max(0, int(level * rng.uniform(0.85, 1.15)))
+                rows.append((product_id, month.isoformat(), "Monthly", forecast, actual,
+                             round(rng.uniform(70, 95), 2)))
+        self.insert("sales_forecasts", ["product_id", "forecast_date", "forecast_period", "forecasted_quantity",
+                                        "actual_quantity", "confidence_level"], rows)
+
+    def communications(self):
+        rng = self.rng
+        count = max(50, self.invoice_count // 5)
+        kinds = ["Email", "Email", "Phone", "Meeting"]
+
+        def rows():
+            for client_id, day in zip(self.pick_clients(count), self.pick_days(count)):
+                yield ("Client", client_id, rng.choice(kinds), rng.choice(["Order follow-up", "Payment reminder",
+                                                                           "Price request", "Delivery query"]),
+                       "Generated communication", rng.choice(["Incoming", "Outgoing"]),
+                       rng.choice(self.employee_ids), f"{day.isoformat()} {rng.randint(8, 17):02d}:00:00")
+
+        self.insert("communication_logs", ["entity_type", "entity_id", "communication_type", "subject", "message",
+                                           "direction", "created_by", "created_at"], rows())
+
+    def sequences(self):
+        """Continue document numbering after the generated documents"""
+        managed = {prefix for prefix, _, _ in self.db.DOCUMENT_TYPES.values()}
+        with self.db.transaction() as cursor:
+            for prefix, numbering in self.numbering.items():
+                if prefix not in managed:
+                    continue
+                cursor.executemany('''
+                    INSERT INTO document_sequences (prefix, period, last_value) VALUES (?, ?, ?)
+                    ON CONFLICT (prefix, period) DO UPDATE SET last_value = MAX(last_value, excluded.last_value)
+                ''', [(prefix, period, value) for period, value in numbering.counters.items()])
+
+
+def generate(db, scale='small', seed=42, end=None, progress=print, years=YEARS):
+    """Fill db (a BusinessDatabase) and return the row counts per table.
+
+    scale is a key of SCALES or an invoice count; the invoices are spread
+    over the years before end.
+    """
+    invoices = SCALES[scale] if isinstance(scale, str) else int(scale)
+    return DataGenerator(db, invoices, seed, end, progress, years).generate()
+
+
+if __name__ == "__main__":
+    from ERPSQLiteDB import BusinessDatabase
+
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    scale = sys.argv[2] if len(sys.argv) > 2 else 'small'
+    database = BusinessDatabase(sys.argv[1])
+    counts = generate(database,
+                      scale if scale in SCALES else int(scale),
+                      int(sys.argv[3]) if len(sys.argv) > 3 else 42,
+                      date.fromisoformat(sys.argv[4]) if len(sys.argv) > 4 else None)
+    for table, count in counts.items():
+        print(f"{table:<24} {count:>12,}")
+    database.close()
@@ -0,0 +1,167 @@
+import csv
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from reports import REPORTS
+
+# Rows pulled from the cursor per round trip
+FETCH_SIZE = 5000
+
+# Excel's row limit per worksheet, less the header row
+XLSX_MAX_ROWS = 1048575
+
+# Characters that are not allowed in XML 1.0 documents
+INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+XLSX_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+class CSVWriter:
+    def __init__(self, path, headers):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(headers)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class XLSXWriter:
+    """Minimal streaming XLSX writer.
+
+    Worksheet XML is written straight into the zip archive as rows arrive,
+    so memory use does not depend on the number of rows. Strings are stored
+    inline rather than in a shared-strings table, which would have to be
+    held in memory. A new worksheet is started when Excel's row limit is hit.
+    """
+
+    def __init__(self, path, headers, sheet_name="Report"):
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self.headers = headers
+        self.sheet_name = sheet_name[:28]
+        self.sheets = 0
+        self.sheet = None
+        self.sheet_rows = 0
+        self._new_sheet()
+
+    def _cell(self, value):
+        if value is None:
+            return "<c/>"
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return f'<c t="n"><v>{value}</v></c>'
+        text = escape(INVALID_XML_CHARS.sub("", str(value)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def _row(self, values):
+        return "<row>" + "".join(self._cell(value) for value in values) + "</row>"
+
+    def _new_sheet(self):
+        if self.sheet is not None:
+            self._close_sheet()
+        self.sheets += 1
+        self.sheet = self.zip.open(f"xl/worksheets/sheet{self.sheets}.xml", "w", force_zip64=True)
+        self.sheet.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         f'<worksheet xmlns="{XLSX_NS}"><sheetData>'.encode("utf-8"))
+        self.sheet.write(self._row(self.headers).encode("utf-8"))
+        self.sheet_rows = 0
+
+    def _close_sheet(self):
+        self.sheet.write(b"</sheetData></worksheet>")
+        self.sheet.close()
+
+    def write_rows(self, rows):
+        parts = []
+        for row in rows:
+            if self.sheet_rows == XLSX_MAX_ROWS:
+                self.sheet.write("".join(parts).encode("utf-8"))
+                parts = []
+                self._new_sheet()
+            parts.append(self._row(row))
+            self.sheet_rows += 1
+        self.sheet.write("".join(parts).encode("utf-8"))
+
+    def close(self):
+        self._close_sheet()
+
+        sheet_ids = range(1, self.sheets + 1)
+        names = [self.sheet_name if n == 1 else f"{self.sheet_name} {n}" for n in sheet_ids]
+
+        self.zip.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                      f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for n in sheet_ids)
+            + '</Types>'))
+        self.zip.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'))
+        self.zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{XLSX_NS}" xmlns:r="{REL_NS}"><sheets>'
+            + "".join(f'<sheet name="{escape(name)}" sheetId="{n}" r:id="rId{n}"/>'
+                      for n, name in zip(sheet_ids, names))
+            + '</sheets></workbook>'))
+        self.zip.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{PKG_REL_NS}">'
+            + "".join(f'<Relationship Id="rId{n}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+                      for n in sheet_ids)
+            + '</Relationships>'))
+        self.zip.close()
+
+
+def open_writer(path, headers, title="Report"):
+    """Pick the writer from the file extension (.xlsx, otherwise CSV)"""
+    if path.lower().endswith(".xlsx"):
+        return XLSXWriter(path, headers, title)
+    return CSVWriter(path, headers)
+
+
+def export_rows(rows, path, headers, title="Report", progress=None, fetch_size=FETCH_SIZE):
+    """Stream rows (a cursor or any iterable) into path; returns the row count.
+
+    Cursors are read with fetchmany, so only one batch is in memory at a
+    time. progress(rows_written) is called after every batch. If the export
+    fails or is cancelled, the partial file is removed.
+    """
+    writer = open_writer(path, headers, title)
+    written = 0
+    try:
+        if hasattr(rows, "fetchmany"):
+            batches = iter(lambda: rows.fetchmany(fetch_size), [])
+        else:
+            batches = [rows]
+
+        for batch in batches:
+            writer.write_rows(batch)
+            written += len(batch)
+            if progress:
+                progress(written)
+    except BaseException:
+        try:
+            writer.close()
+        finally:
+            os.remove(path)
+        raise
+    writer.close()
+    return written
+
+
+def export_report(conn, report, path, progress=None):
+    """Export one of reports.REPORTS to path"""
+    title, headers, query = REPORTS[report]
+    return export_rows(query(conn), path, headers, title, progress)
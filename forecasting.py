@@ -0,0 +1,333 @@
+"""Sales forecasting job: fills sales_forecasts from the order history.
+
+Demand per product and day is the quantity on sales order lines (by order
+date, cancelled orders excluded) plus Sale movements in the inventory
+ledger that do not come from an order. It is rolled up into Daily, Weekly
+(weeks start on Monday) and Monthly series and three models are fitted to
+every product at once:
+
+    moving average          mean of the last few periods
+    exponential smoothing   smoothed level, alpha = ALPHA
+    seasonal naive          the same period one season earlier
+
+Each product gets the model with the lowest mean absolute error over the
+last few complete periods, and its forecasts carry a confidence level of
+100 * (1 - error / mean demand) over those periods. Forecasts start at the
+current period; earlier forecasts are kept, and their actual_quantity is
+filled in once their period is complete.
+
+With NumPy installed the models run on a products x periods matrix; without
+it, on one list per product. Products are split into contiguous id ranges
+that a process pool fits in parallel; the workers only read, and the
+results are written in bulk on the single writer connection.
+
+Usage: python forecasting.py [database] [workers]
+"""
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from database import CONNECTION_PRAGMAS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MODELS = ('moving_average', 'exponential_smoothing', 'seasonal_naive')
+
+ALPHA = 0.3
+
+# Period -> (complete periods of history, periods held out to pick the model,
+#            periods forecast from the current one, season length, moving average window)
+PERIODS = {
+    'Daily': (364, 28, 28, 7, 7),
+    'Weekly': (104, 8, 12, 52, 4),
+    'Monthly': (36, 3, 6, 12, 3),
+}
+
+DEMAND_SQL = '''
+    SELECT i.product_id, date(o.order_date), SUM(i.quantity)
+    FROM sales_order_items i
+    JOIN sales_orders o ON o.order_id = i.order_id
+    WHERE i.product_id BETWEEN :low AND :high
+    AND o.order_date >= :start AND o.order_date < :end
+    AND COALESCE(o.status, '') <> 'Cancelled'
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT product_id, date(transaction_date), -SUM(quantity_change)
+    FROM inventory_transactions
+    WHERE product_id BETWEEN :low AND :high
+    AND transaction_date >= :start AND transaction_date < :end
+    AND transaction_type = 'Sale' AND reference_id IS NULL
+    GROUP BY 1, 2
+'''
+
+
+def period_start(period, day):
+    if period == 'Daily':
+        return day
+    if period == 'Weekly':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def shift(period, start, count):
+    """The period start count periods after start (before it when negative)"""
+    if period == 'Daily':
+        return start + timedelta(days=count)
+    if period == 'Weekly':
+        return start + timedelta(weeks=count)
+    month = start.year * 12 + start.month - 1 + count
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def periods_between(period, first, start):
+    """Number of periods from first up to (not including) start"""
+    if period == 'Daily':
+        return (start - first).days
+    if period == 'Weekly':
+        return (start - first).days // 7
+    return (start.year - first.year) * 12 + start.month - first.month
+
+
+def history_start(period, today):
+    return shift(period, period_start(period, today), -PERIODS[period][0])
+
+
+def load_demand(conn, low, high, today, periods=PERIODS):
+    """{period: (product_ids, series)} for the products in [low, high] that
+    sold anything in the period's history; series[i] holds product_ids[i]'s
+    demand per complete period, oldest first."""
+    start = min(history_start(period, today) for period in periods)
+    rows = conn.execute(DEMAND_SQL, {'low': low, 'high': high, 'start': start.isoformat(),
+                                     'end': today.isoformat()}).fetchall()
+
+    # Column of every distinct day, per period
+    columns = {period: {} for period in periods}
+    for day in {day for _, day, _ in rows if day}:
+        parsed = date.fromisoformat(day)
+        for period, lookup in columns.items():
+            first = history_start(period, today)
+            if parsed >= first:
+                lookup[day] = periods_between(period, first, period_start(period, parsed))
+
+    result = {}
+    for period, lookup in columns.items():
+        width = PERIODS[period][0]
+        series = {}
+        for product_id, day, quantity in rows:
+            column = lookup.get(day)
+            if column is not None and column < width:
+                series.setdefault(product_id, [0.0] * width)[column] += quantity
+        product_ids = sorted(product_id for product_id, values in series.items() if any(values))
+        matrix = [series[product_id] for product_id in product_ids]
+        if numpy is not None:
+            matrix = numpy.array(matrix, dtype='float64').reshape(len(product_ids), width)
+        result[period] = (product_ids, matrix)
+    return result
+
+
+def fit(matrix, holdout, horizon, season, window, alpha=ALPHA):
+    """Pick a model per product and forecast the next horizon periods.
+
+    Returns (forecasts, confidence, models): one row of horizon forecasts,
+    one confidence level and one MODELS index per row of matrix.
+    """
+    if numpy is not None:
+        return _fit_numpy(matrix, holdout, horizon, season, window, alpha)
+    fitted = [_fit_series(values, holdout, horizon, season, window, alpha) for values in matrix]
+    return [row[0] for row in fitted], [row[1] for row in fitted], [row[2] for row in fitted]
+
+
+def _confidence(error, actual_mean):
+    if actual_mean <= 0:
+        return 100.0 if error == 0 else 0.0
+    return round(min(100.0, max(0.0, 100 * (1 - error / actual_mean))), 2)
+
+
+def _fit_series(values, holdout, horizon, season, window, alpha):
+    """fit() for one product's demand list"""
+    count = len(values)
+    tested = range(count - holdout, count)
+
+    level = values[0]
+    smoothed = [None]
+    for value in values[1:]:
+        smoothed.append(level)
+        level = alpha * value + (1 - alpha) * level
+
+    errors = [
+        sum(abs(values[t] - sum(values[t - window:t]) / window) for t in tested) / holdout,
+        sum(abs(values[t] - smoothed[t]) for t in tested) / holdout,
+        sum(abs(values[t] - values[t - season]) for t in tested) / holdout if count - holdout >= season
+        else float('inf'),
+    ]
+    model = errors.index(min(errors))
+    if model == 0:
+        forecasts = [sum(values[-window:]) / window] * horizon
+    elif model == 1:
+        forecasts = [level] * horizon
+    else:
+        forecasts = [values[count - season + step % season] for step in range(horizon)]
+    return forecasts, _confidence(errors[model], sum(values[t] for t in tested) / holdout), model
+
+
+def _fit_numpy(matrix, holdout, horizon, season, window, alpha):
+    """fit() for a products x periods array, a whole column at a time"""
+    products, count = matrix.shape
+    if not products:
+        return numpy.zeros((0, horizon)), numpy.zeros(0), numpy.zeros(0, dtype=int)
+    tested = matrix[:, count - holdout:]
+
+    sums = numpy.concatenate([numpy.zeros((products, 1)), numpy.cumsum(matrix, axis=1)], axis=1)
+    moving = (sums[:, count - holdout:count] - sums[:, count - holdout - window:count - window]) / window
+
+    smoothed = numpy.empty_like(matrix)
+    level = matrix[:, 0].copy()
+    for t in range(1, count):
+        smoothed[:, t] = level
+        level = alpha * matrix[:, t] + (1 - alpha) * level
+
+    errors = numpy.full((len(MODELS), products), numpy.inf)
+    errors[0] = numpy.abs(tested - moving).mean(axis=1)
+    errors[1] = numpy.abs(tested - smoothed[:, count - holdout:]).mean(axis=1)
+    if count - holdout >= season:
+        errors[2] = numpy.abs(tested - matrix[:, count - holdout - season:count - season]).mean(axis=1)
+    models = errors.argmin(axis=0)
+
+    steps = numpy.arange(horizon)
+    candidates = numpy.stack([
+        numpy.repeat(matrix[:, -window:].mean(axis=1)[:, None], horizon, axis=1),
+        numpy.repeat(level[:, None], horizon, axis=1),
+        matrix[:, count - season + steps % season],
+    ])
+    forecasts = candidates[models, numpy.arange(products)]
+
+    error = errors[models, numpy.arange(products)]
+    actual_mean = tested.mean(axis=1)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        confidence = numpy.clip(100 * (1 - error / actual_mean), 0, 100).round(2)
+    confidence = numpy.where(actual_mean > 0, confidence, numpy.where(error == 0, 100.0, 0.0))
+    return forecasts, confidence, models
+
+
+def forecast_partition(db_name, low, high, today, periods=tuple(PERIODS)):
+    """Fit the products with ids in [low, high]; runs in a worker process.
+
+    Returns (forecasts, actuals, model_counts): sales_forecasts rows to
+    insert, (actual_quantity, forecast_id) updates for complete periods,
+    and how many series each model won.
+    """
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    try:
+        demand = load_demand(conn, low, high, today, periods)
+        pending = conn.execute('''
+            SELECT forecast_id, product_id, forecast_period, forecast_date FROM sales_forecasts
+            WHERE product_id BETWEEN ? AND ? AND actual_quantity IS NULL
+        ''', (low, high)).fetchall()
+    finally:
+        conn.close()
+
+    forecasts, actuals = [], []
+    model_counts = dict.fromkeys(MODELS, 0)
+    for period, (product_ids, matrix) in demand.items():
+        _, holdout, horizon, season, window = PERIODS[period]
+        current = period_start(period, today)
+        dates = [shift(period, current, step).isoformat() for step in range(horizon)]
+        predicted, confidence, models = fit(matrix, holdout, horizon, season, window)
+        for row, product_id in enumerate(product_ids):
+            model_counts[MODELS[int(models[row])]] += 1
+            forecasts += [(product_id, day, period, int(round(max(0.0, float(quantity)))), float(confidence[row]))
+                          for day, quantity in zip(dates, predicted[row])]
+
+        # Forecasts whose period has completed, within the loaded history
+        first = history_start(period, today)
+        rows = {product_id: row for row, product_id in enumerate(product_ids)}
+        for forecast_id, product_id, forecast_period, forecast_date in pending:
+            if forecast_period != period or not forecast_date:
+                continue
+            day = date.fromisoformat(forecast_date[:10])
+            if not first <= day < current or period_start(period, day) != day:
+                continue
+            column = periods_between(period, first, day)
+            actual = matrix[rows[product_id]][column] if product_id in rows else 0
+            actuals.append((int(actual), forecast_id))
+    return forecasts, actuals, model_counts
+
+
+def partitions(conn, count):
+    """Split the product ids into count contiguous (low, high) ranges of similar size"""
+    product_ids = [row[0] for row in conn.execute("SELECT product_id FROM products ORDER BY product_id")]
+    if not product_ids:
+        return []
+    size = -(-len(product_ids) // count)
+    return [(product_ids[start], product_ids[min(start + size, len(product_ids)) - 1])
+            for start in range(0, len(product_ids), size)]
+
+
+def write_partition(db, low, high, today, forecasts, actuals):
+    """Replace the partition's forecasts from the current periods on and backfill actuals"""
+    with db.transaction(immediate=True) as cursor:
+        for period in PERIODS:
+            cursor.execute('''
+                DELETE FROM sales_forecasts
+                WHERE product_id BETWEEN ? AND ? AND forecast_period = ? AND forecast_date >= ?
+            ''', (low, high, period, period_start(period, today).isoformat()))
+        cursor.executemany('''
+            INSERT INTO sales_forecasts (product_id, forecast_date, forecast_period, forecasted_quantity,
+                                         confidence_level)
+            VALUES (?, ?, ?, ?, ?)
+        ''', forecasts)
+        cursor.executemany("UPDATE sales_forecasts SET actual_quantity = ? WHERE forecast_id = ?", actuals)
+
+
+def run(db, workers=1, today=None, partition_count=None, progress=print):
+    """Forecast every product; db is a BusinessDatabase.
+
+    The products are split into partition_count ranges (four per worker by
+    default) fitted by a pool of workers processes, or in this process when
+    workers is 1. Returns {'forecasts', 'actuals', model name: series won}.
+    """
+    today = today or date.today()
+    started = time.perf_counter()
+    ranges = partitions(db.conn, partition_count or workers * 4)
+    totals = {'forecasts': 0, 'actuals': 0, **dict.fromkeys(MODELS, 0)}
+
+    def store(low, high, result):
+        forecasts, actuals, model_counts = result
+        write_partition(db, low, high, today, forecasts, actuals)
+        totals['forecasts'] += len(forecasts)
+        totals['actuals'] += len(actuals)
+        for model, count in model_counts.items():
+            totals[model] += count
+
+    if workers > 1 and len(ranges) > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [(low, high, pool.submit(forecast_partition, db.db_name, low, high, today))
+                       for low, high in ranges]
+            for low, high, future in futures:
+                store(low, high, future.result())
+    else:
+        for low, high in ranges:
+            store(low, high, forecast_partition(db.db_name, low, high, today))
+
+    db.pool.cache.invalidate('sales_forecasts')
+    if progress:
+        progress(f"Forecast {len(ranges)} partitions in {time.perf_counter() - started:.2f}s: "
+                 f"{totals['forecasts']:,} forecasts, {totals['actuals']:,} actuals backfilled; "
+                 + ", ".join(f"{model} {totals[model]:,}" for model in MODELS))
+    return totals
+
+
+if __name__ == "__main__":
+    from ERPSQLiteDB import BusinessDatabase
+    from database import DEFAULT_DB_NAME
+
+    database = BusinessDatabase(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_NAME)
+    run(database, int(sys.argv[2]) if len(sys.argv) > 2 else 1)
+    database.close()
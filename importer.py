@@ -0,0 +1,285 @@
+import csv
+import dataclasses
+import sqlite3
+import time
+import typing
+from itertools import groupby, islice
+
+from models import Client, Product
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# Rows validated and written per transaction
+CHUNK_SIZE = 2000
+
+# Errors kept in the result; anything beyond is only counted
+MAX_ERRORS = 1000
+
+
+def read_rows(path):
+    """Yield each data row of a CSV or XLSX file as a dict keyed by header"""
+    if path.lower().endswith(".xlsx"):
+        if openpyxl is None:
+            raise RuntimeError("Reading Excel files requires openpyxl (pip install openpyxl)")
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(name).strip() if name is not None else "" for name in next(rows, [])]
+            for values in rows:
+                yield {name: ("" if value is None else str(value)) for name, value in zip(header, values)}
+        finally:
+            workbook.close()
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            yield {(name or "").strip(): (value or "") for name, value in row.items()}
+
+
+def _coerce(value, field_type):
+    """Convert a text cell to the type declared on the dataclass field"""
+    if typing.get_origin(field_type) is typing.Union:
+        field_type = next(arg for arg in typing.get_args(field_type) if arg is not type(None))
+    if field_type is float:
+        return float(value.replace(",", ""))
+    if field_type is int:
+        number = float(value.replace(",", ""))
+        if not number.is_integer():
+            raise ValueError(f"not a whole number: {value}")
+        return int(number)
+    if field_type is str:
+        return value
+    raise ValueError(f"unsupported field type {field_type}")
+
+
+def validate_client(client):
+    if not client.company_name:
+        return "company_name is required"
+    if client.credit_limit < 0:
+        return "credit_limit cannot be negative"
+    return None
+
+
+def validate_product(product):
+    if not product.product_code:
+        return "product_code is required"
+    if not product.product_name:
+        return "product_name is required"
+    if product.unit_price < 0 or product.cost_price < 0:
+        return "prices cannot be negative"
+    return None
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.error_count = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        return (f"{self.rows_imported:,} of {self.rows_read:,} rows imported, "
+                f"{self.error_count:,} errors, {self.rows_per_second:,.0f} rows/s")
+
+
+class Importer:
+    """Streams a file into one table, a chunk of rows per transaction.
+
+    Each row is coerced into the model dataclass, validated, then mapped to
+    table columns through column_map (dataclass field -> column). Only the
+    cells a row fills in are written: columns missing from the file or left
+    empty keep their current value on an existing row and get the table's
+    default on a new one. The table's NOT NULL columns are the exception:
+    the file must have them and a row that leaves one empty is an error,
+    since SQLite checks them before resolving the upsert. Rows are upserted
+    on key_column: an existing row with the same key is updated, anything
+    else is inserted. A row the database rejects (e.g. an unknown foreign
+    key) is reported as an error and the rest of its chunk is still written.
+    """
+
+    def __init__(self, model, table, column_map, key_column, validate):
+        self.model = model
+        self.table = table
+        self.column_map = column_map
+        self.key_column = key_column
+        self.validate = validate
+        self.field_types = {f.name: f.type for f in dataclasses.fields(model)}
+
+    def parse(self, row):
+        """Build the model from a file row and return it with the fields the
+        row filled in; raises ValueError on bad input"""
+        values = {}
+        for name, text in row.items():
+            if name not in self.field_types:
+                continue
+            text = text.strip()
+            if text == "":
+                continue
+            try:
+                values[name] = _coerce(text, self.field_types[name])
+            except ValueError:
+                raise ValueError(f"invalid value for {name}: {text!r}")
+
+        record = self.model(**values)
+        error = self.validate(record)
+        if error:
+            raise ValueError(error)
+        return record, values.keys()
+
+    def _sql(self, columns):
+        col_list = ", ".join(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col != self.key_column)
+        action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        return (f"INSERT INTO {self.table} ({col_list}) VALUES ({placeholders}) "
+                f"ON CONFLICT ({self.key_column}) {action}")
+
+    def required_columns(self, pool):
+        """Mapped columns that are NOT NULL without a default"""
+        with pool.reader() as conn:
+            return [row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")
+                    if row[3] and row[4] is None and row[1] in self.column_map.values()]
+
+    def write_chunk(self, pool, statements, batch):
+        """Write a chunk in one transaction, one executemany per run of rows
+        that fill in the same columns, so rows still apply in file order"""
+        with pool.writer() as conn:
+            for columns, rows in groupby(batch, key=lambda entry: entry[1]):
+                conn.executemany(statements[columns], [values for _, _, values in rows])
+
+    def write_rows(self, pool, statements, batch, result):
+        """Write a chunk one row at a time, reporting the rows that are rejected"""
+        imported = 0
+        with pool.writer() as conn:
+            for line, columns, values in batch:
+                conn.execute("SAVEPOINT import_row")
+                try:
+                    conn.execute(statements[columns], values)
+                    imported += 1
+                except sqlite3.IntegrityError as e:
+                    conn.execute("ROLLBACK TO import_row")
+                    result.add_error(line, str(e))
+                conn.execute("RELEASE import_row")
+        return imported
+
+    def run(self, pool, path, chunk_size=CHUNK_SIZE, progress=None):
+        """Import path and return an ImportResult; progress(result) is called per chunk"""
+        result = ImportResult()
+        started = time.perf_counter()
+        rows = enumerate(read_rows(path), start=2)  # line 1 is the header
+
+        fields = None
+        # Column tuple -> upsert statement, for the column sets rows fill in
+        statements = {}
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            if fields is None:
+                header = chunk[0][1]
+                fields = [name for name in self.column_map if name in header]
+                if not fields:
+                    raise ValueError(f"No importable columns found; expected some of: "
+                                     f"{', '.join(self.column_map)}")
+                required_columns = self.required_columns(pool)
+                required = [name for name, column in self.column_map.items() if column in required_columns]
+                missing = [name for name in required if name not in fields]
+                if missing:
+                    raise ValueError(f"Required columns missing from the file: {', '.join(missing)}")
+
+            batch = []
+            for line, row in chunk:
+                result.rows_read += 1
+                try:
+                    record, filled = self.parse(row)
+                except (ValueError, TypeError) as e:
+                    result.add_error(line, str(e))
+                    continue
+                empty = [name for name in required if name not in filled]
+                if empty:
+                    result.add_error(line, f"{', '.join(empty)} is required")
+                    continue
+                names = [name for name in fields if name in filled]
+                columns = tuple(self.column_map[name] for name in names)
+                if columns not in statements:
+                    statements[columns] = self._sql(columns)
+                batch.append((line, columns, tuple(getattr(record, name) for name in names)))
+
+            if batch:
+                try:
+                    self.write_chunk(pool, statements, batch)
+                    result.rows_imported += len(batch)
+                except sqlite3.IntegrityError:
+                    # Find the offending rows one at a time
+                    result.rows_imported += self.write_rows(pool, statements, batch, result)
+                pool.cache.invalidate(self.table)
+
+            result.elapsed = time.perf_counter() - started
+            if progress:
+                progress(result)
+
+        result.elapsed = time.perf_counter() - started
+        return result
+
+
+# Client.id, when given, updates that client instead of adding a new one
+CLIENT_IMPORTER = Importer(
+    Client, "clients",
+    column_map={
+        'id': 'client_id',
+        'company_name': 'company_name',
+        'contact_person': 'contact_person',
+        'email': 'email',
+        'phone': 'phone',
+        'address': 'address',
+        'city': 'city',
+        'country': 'country',
+        'tax_id': 'tax_id',
+        'credit_limit': 'credit_limit',
+        'payment_terms': 'payment_terms',
+        'status': 'status',
+    },
+    key_column='client_id',
+    validate=validate_client)
+
+# Products are matched on SKU. Stock is not imported: it only changes through
+# inventory movements, so the ledger that stock history, checkpoints and the
+# change log read stays complete
+PRODUCT_IMPORTER = Importer(
+    Product, "products",
+    column_map={
+        'product_code': 'sku',
+        'product_name': 'name',
+        'description': 'description',
+        'category': 'category',
+        'unit': 'unit_of_measure',
+        'unit_price': 'unit_price',
+        'cost_price': 'cost_price',
+        'reorder_point': 'reorder_level',
+        'supplier_id': 'supplier_id',
+    },
+    key_column='sku',
+    validate=validate_product)
+
+
+def import_clients(pool, path, chunk_size=CHUNK_SIZE, progress=None):
+    return CLIENT_IMPORTER.run(pool, path, chunk_size, progress)
+
+
+def import_products(pool, path, chunk_size=CHUNK_SIZE, progress=None):
+    return PRODUCT_IMPORTER.run(pool, path, chunk_size, progress)
@@ -0,0 +1,191 @@
+"""Query plan checks for the application's hot queries.
+
+Runs EXPLAIN QUERY PLAN over a registry of the queries the screens,
+reports and statements issue, and flags full table scans and temporary
+B-trees used for sorting or grouping. The indexes that fix them are
+shipped as versioned migrations (see migrations.py); this module reports
+what each query does before and after they are applied.
+
+Usage: python index_advisor.py [database]
+"""
+import re
+import sqlite3
+import sys
+import time
+
+from ar_aging import AGING_COMPUTE_SQL
+from keyset import KeysetQuery
+from migrations import MIGRATIONS, migrate, schema_version
+from sales_rollups import monthly_sales_sql, category_sales_sql
+from search_index import match_sql
+from statements import STATEMENT_INVOICES_SQL, STATEMENT_RECEIPTS_SQL
+
+# The Clients and Accounting grids, paged as the list is scrolled
+CLIENTS_GRID = KeysetQuery("SELECT client_id, company_name, contact_person, phone, email, city, status, "
+                           "credit_limit FROM clients WHERE 1=1",
+                           order_by=[("company_name", 1), ("client_id", 0)])
+RECEIPTS_GRID = KeysetQuery('''
+    SELECT r.receipt_id, r.receipt_number, i.invoice_number, c.company_name,
+           r.receipt_date, r.amount, r.payment_method, r.reference_number
+    FROM receipts r
+    JOIN invoices i ON r.invoice_id = i.invoice_id
+    JOIN sales_orders o ON i.order_id = o.order_id
+    JOIN clients c ON o.client_id = c.client_id
+    WHERE 1=1 AND r.receipt_date >= ? AND r.receipt_date <= ?
+''', ('2024-01-01', '2024-12-31'), order_by=[("r.receipt_date", 4), ("r.receipt_id", 0)], descending=True)
+
+# Query name -> (sql, sample parameters). Parameters only need the right
+# shape; plans do not depend on the values.
+QUERIES = {
+    'client_statement': ('''
+        SELECT i.invoice_number, i.invoice_date, i.due_date, i.grand_total, i.amount_paid,
+               i.balance_due, i.status, GROUP_CONCAT(DISTINCT o.order_number) as order_numbers
+        FROM invoices i
+        LEFT JOIN sales_orders o ON i.order_id = o.order_id
+        WHERE o.client_id = ? AND i.invoice_date >= ? AND i.invoice_date <= ?
+        GROUP BY i.invoice_id ORDER BY i.invoice_date DESC
+    ''', (1, '2024-01-01', '2024-12-31')),
+    'statement_invoices': (STATEMENT_INVOICES_SQL, (1, '2024-01-01', '2024-12-31')),
+    'statement_receipts': (STATEMENT_RECEIPTS_SQL, (1, '2024-01-01', '2024-12-31')),
+    # Whole months from the monthly rollups, partial months from the daily ones
+    'sales_statistics': monthly_sales_sql('2024-01-15', '2024-06-20'),
+    'sales_report': monthly_sales_sql('2024-01-15', '9999-12-31'),
+    'category_sales': category_sales_sql('2024-01-15', '2024-06-20'),
+    'aging_compute': (AGING_COMPUTE_SQL, {'as_of': '2024-01-01'}),
+    'invoice_receipts': ('''
+        SELECT receipt_number, receipt_date, amount FROM receipts
+        WHERE invoice_id = ? ORDER BY receipt_date
+    ''', (1,)),
+    'order_lines': ('''
+        SELECT product_id, quantity, unit_price, line_total FROM sales_order_items WHERE order_id = ?
+    ''', (1,)),
+    'clients_grid_first_page': CLIENTS_GRID.sql(),
+    'clients_grid_next_page': CLIENTS_GRID.sql(after=("Acme", 1)),
+    'clients_grid_previous_page': CLIENTS_GRID.sql(after=("Acme", 1), backward=True),
+    'receipts_grid_first_page': RECEIPTS_GRID.sql(),
+    'receipts_grid_next_page': RECEIPTS_GRID.sql(after=("2024-06-01", 1)),
+    'client_search': (match_sql('clients', "client_id, company_name, contact_person, phone, email, city, "
+                                           "status, credit_limit"), ('"acme"*', 200)),
+    'product_availability': ('''
+        SELECT p.product_id, p.sku, p.name, p.current_stock, s.company_name
+        FROM products p
+        LEFT JOIN suppliers s ON p.supplier_id = s.supplier_id
+        WHERE p.category = ?
+        ORDER BY p.current_stock ASC
+    ''', ('Electronics',)),
+}
+
+INDEX_NAME = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for one query"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def plan_issues(plan):
+    """Flag full table scans and temporary B-trees in a query plan.
+
+    A SCAN that goes through an index (covering or not) only reads the
+    index, which is what the partial and covering indexes are for, so it is
+    not flagged.
+    """
+    issues = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and " INDEX " not in detail and "CONSTANT ROW" not in detail:
+            issues.append(f"full scan: {detail}")
+        elif "TEMP B-TREE" in detail:
+            issues.append(f"temp b-tree: {detail}")
+    return issues
+
+
+def time_query(conn, sql, params=(), repeat=5):
+    """Best-of-repeat wall time for running a query to completion"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def analyze(conn, queries=QUERIES, timed=False):
+    """Plan (and optionally time) every registered query.
+
+    Returns {name: {'plan': [...], 'issues': [...], 'seconds': float or None}}.
+    A query that cannot be planned, e.g. the client search on a build
+    without FTS5, is reported as an issue with no plan.
+    """
+    results = {}
+    for name, (sql, params) in queries.items():
+        try:
+            plan = explain(conn, sql, params)
+        except sqlite3.OperationalError as e:
+            results[name] = {'plan': [], 'issues': [f"cannot plan: {e}"], 'seconds': None}
+            continue
+        results[name] = {
+            'plan': plan,
+            'issues': plan_issues(plan),
+            'seconds': time_query(conn, sql, params) if timed else None,
+        }
+    return results
+
+
+def missing_indexes(conn, migrations=MIGRATIONS):
+    """Indexes recommended by the migrations that the database does not have yet"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    missing = []
+    for version, _, statements in migrations:
+        for sql in statements:
+            if callable(sql):
+                continue
+            match = INDEX_NAME.search(sql)
+            if match and match.group(1) not in existing:
+                missing.append((version, match.group(1)))
+    return missing
+
+
+def format_results(results, before=None):
+    lines = []
+    for name, result in results.items():
+        timing = ""
+        if result['seconds'] is not None:
+            timing = f"  {result['seconds'] * 1000:8.1f} ms"
+            if before and before[name]['seconds']:
+                timing += f"  (was {before[name]['seconds'] * 1000:.1f} ms)"
+        lines.append(f"{name}{timing}")
+        for detail in result['plan']:
+            lines.append(f"    {detail}")
+        for issue in result['issues']:
+            lines.append(f"    ! {issue}")
+    return "\n".join(lines)
+
+
+def main(db_name):
+    from database import get_pool
+
+    pool = get_pool(db_name)
+    conn = pool.writer_connection
+    print(f"schema version {schema_version(conn)}")
+
+    before = analyze(conn, timed=True)
+    print(format_results(before))
+
+    missing = missing_indexes(conn)
+    if missing:
+        print("\nRecommended indexes not yet created:")
+        for version, name in missing:
+            print(f"    {name} (migration {version})")
+
+    if migrate(conn):
+        conn.execute("ANALYZE")
+        conn.commit()
+        after = analyze(conn, timed=True)
+        print("\nAfter migrations:")
+        print(format_results(after, before))
+
+
+if __name__ == "__main__":
+    from database import DEFAULT_DB_NAME
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_NAME)
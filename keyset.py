@@ -0,0 +1,48 @@
+"""Keyset (seek) pagination, shared by the Tk grids and the HTTP API."""
+
+
+class KeysetQuery:
+    """A SELECT paged with keyset (seek) pagination instead of OFFSET.
+
+    select_sql must end in a WHERE clause (use "WHERE 1=1" when there is no
+    filter). order_by is a list of (sql_expression, row_index) pairs whose
+    combined values are unique and non-NULL, e.g. [("company_name", 2), ("id", 0)].
+    """
+
+    def __init__(self, select_sql, params=(), order_by=(), descending=False):
+        self.select_sql = select_sql
+        self.params = list(params)
+        self.order_by = list(order_by)
+        self.descending = descending
+
+    def key(self, row):
+        return tuple(row[index] for _, index in self.order_by)
+
+    def sql(self, after=None, limit=200, backward=False):
+        """The (query, params) that fetch one page; see page()"""
+        # Reading backwards flips the comparison and the sort direction
+        reverse = self.descending != backward
+        comparison = "<" if reverse else ">"
+        direction = "DESC" if reverse else "ASC"
+
+        expressions = [expr for expr, _ in self.order_by]
+        query = self.select_sql
+        params = list(self.params)
+
+        if after is not None:
+            placeholders = ", ".join("?" for _ in expressions)
+            query += f" AND ({', '.join(expressions)}) {comparison} ({placeholders})"
+            params.extend(after)
+
+        query += " ORDER BY " + ", ".join(f"{expr} {direction}" for expr in expressions)
+        query += " LIMIT ?"
+        params.append(limit)
+        return query, params
+
+    def page(self, conn, after=None, limit=200, backward=False):
+        """Fetch the page that follows (or, with backward, precedes) the key after"""
+        query, params = self.sql(after, limit, backward)
+        rows = conn.execute(query, params).fetchall()
+        if backward:
+            rows.reverse()
+        return rows
@@ -0,0 +1,206 @@
+import threading
+from datetime import date
+
+# Counter name -> (table, condition a row must meet to be counted)
+KPI_COUNTERS = {
+    'total_clients': ('clients', None),
+    'active_suppliers': ('suppliers', "{row}.status = 'Active'"),
+    'inventory_items': ('products', None),
+    'pending_orders': ('sales_orders', "{row}.status = 'Pending'"),
+}
+
+# Invoices that count towards sales figures
+SALES_CONDITION = "{row}.status IS NOT 'Cancelled'"
+
+
+def _condition(template, row):
+    return template.format(row=row) if template else "1"
+
+
+def install_kpi_store(conn):
+    """Create the KPI tables and the triggers that keep them current.
+
+    Counters are adjusted by triggers on the source tables and daily sales
+    are accumulated per invoice date, so reading the dashboard never scans
+    the underlying tables. Returns True when the store was created now and
+    has been filled by a full recomputation.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'kpi_counters'").fetchone()
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS kpi_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS kpi_daily_sales (
+        sale_date DATE PRIMARY KEY,
+        invoice_count INTEGER NOT NULL DEFAULT 0,
+        total REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''')
+
+    for name, (table, condition) in KPI_COUNTERS.items():
+        new_cond = _condition(condition, "new")
+        old_cond = _condition(condition, "old")
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS kpi_{name}_ai AFTER INSERT ON {table} WHEN {new_cond} BEGIN
+            UPDATE kpi_counters SET value = value + 1 WHERE name = '{name}';
+        END
+        ''')
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS kpi_{name}_ad AFTER DELETE ON {table} WHEN {old_cond} BEGIN
+            UPDATE kpi_counters SET value = value - 1 WHERE name = '{name}';
+        END
+        ''')
+        if condition:
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS kpi_{name}_au AFTER UPDATE ON {table}
+            WHEN ({new_cond}) IS NOT ({old_cond}) BEGIN
+                UPDATE kpi_counters SET value = value + ({new_cond}) - ({old_cond}) WHERE name = '{name}';
+            END
+            ''')
+
+    add_sale = '''
+        INSERT INTO kpi_daily_sales (sale_date, invoice_count, total)
+        VALUES (COALESCE({row}.invoice_date, date({row}.created_at)), {sign}1, {sign}COALESCE({row}.grand_total, 0))
+        ON CONFLICT (sale_date) DO UPDATE SET
+            invoice_count = invoice_count + excluded.invoice_count,
+            total = total + excluded.total;
+    '''
+    new_sale = add_sale.format(row="new", sign="")
+    old_sale = add_sale.format(row="old", sign="-")
+    new_cond = _condition(SALES_CONDITION, "new")
+    old_cond = _condition(SALES_CONDITION, "old")
+
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS kpi_sales_ai AFTER INSERT ON invoices WHEN {new_cond} BEGIN
+        {new_sale}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS kpi_sales_ad AFTER DELETE ON invoices WHEN {old_cond} BEGIN
+        {old_sale}
+    END
+    ''')
+    # An update moves the invoice out of its old day and into its new one
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS kpi_sales_au_old AFTER UPDATE OF invoice_date, grand_total, status ON invoices
+    WHEN {old_cond} BEGIN
+        {old_sale}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS kpi_sales_au_new AFTER UPDATE OF invoice_date, grand_total, status ON invoices
+    WHEN {new_cond} BEGIN
+        {new_sale}
+    END
+    ''')
+
+    if exists:
+        return False
+
+    KPIStore.rebuild(conn)
+    return True
+
+
+class KPIStore:
+    """Reads dashboard KPIs from the materialized summary tables"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.refresh_thread = None
+        self.stop_event = threading.Event()
+        self.last_drift = {}
+
+    @staticmethod
+    def compute(conn):
+        """Recompute every KPI from the raw tables (full scan)"""
+        counters = {}
+        for name, (table, condition) in KPI_COUNTERS.items():
+            where = f" WHERE {_condition(condition, table)}" if condition else ""
+            counters[name] = conn.execute(f"SELECT COUNT(*) FROM {table}{where}").fetchone()[0]
+
+        daily = conn.execute(f'''
+            SELECT COALESCE(invoice_date, date(created_at)), COUNT(*), SUM(COALESCE(grand_total, 0))
+            FROM invoices
+            WHERE {_condition(SALES_CONDITION, "invoices")}
+            GROUP BY 1
+        ''').fetchall()
+        return counters, {day: (count, total) for day, count, total in daily}
+
+    @classmethod
+    def rebuild(cls, conn):
+        """Replace the stored KPIs with a full recomputation"""
+        counters, daily = cls.compute(conn)
+        conn.execute("DELETE FROM kpi_counters")
+        conn.executemany("INSERT INTO kpi_counters (name, value) VALUES (?, ?)", counters.items())
+        conn.execute("DELETE FROM kpi_daily_sales")
+        conn.executemany("INSERT INTO kpi_daily_sales (sale_date, invoice_count, total) VALUES (?, ?, ?)",
+                         [(day, count, total) for day, (count, total) in daily.items()])
+
+    def snapshot(self, today=None):
+        """Current KPI values; reads a handful of rows regardless of data volume"""
+        today = today or date.today()
+        with self.pool.reader() as conn:
+            values = dict(conn.execute("SELECT name, value FROM kpi_counters").fetchall())
+            today_sales = conn.execute("SELECT total FROM kpi_daily_sales WHERE sale_date = ?",
+                                       (today.isoformat(),)).fetchone()
+            month_sales = conn.execute('''
+                SELECT SUM(total) FROM kpi_daily_sales WHERE sale_date BETWEEN ? AND ?
+            ''', (today.replace(day=1).isoformat(), today.isoformat())).fetchone()
+
+        values['today_sales'] = today_sales[0] if today_sales else 0
+        values['monthly_revenue'] = month_sales[0] or 0
+        return values
+
+    def reconcile(self):
+        """Compare the stored KPIs with a full recomputation and repair any drift.
+
+        Returns a dict of the KPIs that differed, mapped to (stored, actual).
+        """
+        # Read the raw tables and the stored KPIs from one snapshot
+        with self.pool.reader() as conn:
+            conn.execute("BEGIN")
+            counters, daily = self.compute(conn)
+            stored_counters = dict(conn.execute("SELECT name, value FROM kpi_counters").fetchall())
+            stored_daily = {day: (count, total) for day, count, total in
+                            conn.execute("SELECT sale_date, invoice_count, total FROM kpi_daily_sales")}
+
+        drift = {}
+        for name, actual in counters.items():
+            if stored_counters.get(name) != actual:
+                drift[name] = (stored_counters.get(name), actual)
+        for day in set(daily) | set(stored_daily):
+            stored_count, stored_total = stored_daily.get(day, (0, 0))
+            actual_count, actual_total = daily.get(day, (0, 0))
+            if stored_count != actual_count or abs(stored_total - actual_total) > 0.005:
+                drift[f"sales {day}"] = (stored_daily.get(day), daily.get(day))
+
+        if drift:
+            with self.pool.writer() as conn:
+                self.rebuild(conn)
+
+        self.last_drift = drift
+        return drift
+
+    def start_background_refresh(self, interval=900):
+        """Reconcile against a full recomputation every interval seconds"""
+        if self.refresh_thread is not None:
+            return
+
+        def run():
+            while not self.stop_event.wait(interval):
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    print(f"KPI reconcile failed: {e}")
+
+        self.stop_event.clear()
+        self.refresh_thread = threading.Thread(target=run, name="kpi-refresh", daemon=True)
+        self.refresh_thread.start()
+
+    def stop_background_refresh(self):
+        self.stop_event.set()
+        self.refresh_thread = None
@@ -8,43 +8,88 @@ import os
 # Add modules directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
 
-# Import modules
-try:
-    from modules.clients import ClientsModule
-    from modules.suppliers import SuppliersModule
-    from modules.inventory import InventoryModule
-    from modules.sales import SalesModule
-    from modules.purchasing import PurchasingModule
-    from modules.accounting import AccountingModule
-    from database import create_database
-    from styles import apply_style
-except ImportError as e:
-    print(f"Import error: {e}")
+from database import create_database, get_pool
+from kpi_store import KPIStore
+from query_executor import QueryExecutor
+from ar_aging import ARAging
+from module_registry import ModuleRegistry
+from styles import apply_style
 
 
-    # Create dummy classes for testing
-    class ClientsModule:
-        def __init__(self, parent): pass
+class Dashboard:
+    def __init__(self, parent, kpis):
+        self.kpis = kpis
+        self.value_labels = {}
 
+        dashboard_frame = ttk.Frame(parent)
+        dashboard_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # Dashboard Title
+        ttk.Label(dashboard_frame, text="Dashboard Overview",
+                  font=("Arial", 16, "bold")).pack(pady=(0, 20))
+
+        # Stats Frame
+        stats_frame = ttk.Frame(dashboard_frame)
+        stats_frame.pack(fill=tk.X, pady=(0, 20))
+
+        # Statistics cards
+        stats = [
+            ("Total Clients", "total_clients", "👥"),
+            ("Active Suppliers", "active_suppliers", "🏭"),
+            ("Inventory Items", "inventory_items", "📦"),
+            ("Pending Orders", "pending_orders", "📋"),
+            ("Today's Sales", "today_sales", "💰"),
+            ("Monthly Revenue", "monthly_revenue", "📈")
+        ]
+
+        for i, (title, key, icon) in enumerate(stats):
+            card = ttk.Frame(stats_frame, relief=tk.RAISED, borderwidth=2)
+            card.grid(row=i // 3, column=i % 3, padx=10, pady=10, sticky="nsew")
+
+            ttk.Label(card, text=icon, font=("Arial", 24)).pack(pady=(10, 5))
+            self.value_labels[key] = ttk.Label(card, text="", font=("Arial", 18, "bold"))
+            self.value_labels[key].pack()
+            ttk.Label(card, text=title, font=("Arial", 10)).pack(pady=(0, 10))
 
-    class SuppliersModule:
-        def __init__(self, parent): pass
+        # Recent Activities
+        activities_frame = ttk.LabelFrame(dashboard_frame, text="Recent Activities")
+        activities_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
 
+        columns = ("Time", "Activity", "User", "Status")
+        tree = ttk.Treeview(activities_frame, columns=columns, show="headings", height=8)
 
-    class InventoryModule:
-        def __init__(self, parent): pass
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=150)
 
+        # Sample data
+        activities = [
+            ("10:30 AM", "New Quotation Created #QT-00123", "John Doe", "Pending"),
+            ("09:45 AM", "Purchase Order Confirmed #PO-00456", "Jane Smith", "Confirmed"),
+            ("09:15 AM", "Inventory Updated - Product XYZ", "Admin", "Completed"),
+            ("Yesterday", "Delivery Note #DN-00789", "Mike Brown", "Delivered"),
+            ("Yesterday", "Invoice Generated #INV-00321", "Sarah Lee", "Paid")
+        ]
 
-    class SalesModule:
-        def __init__(self, parent): pass
+        for activity in activities:
+            tree.insert("", tk.END, values=activity)
 
+        scrollbar = ttk.Scrollbar(activities_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
 
-    class PurchasingModule:
-        def __init__(self, parent): pass
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+        self.refresh()
 
-    class AccountingModule:
-        def __init__(self, parent): pass
+    def refresh(self):
+        kpis = self.kpis.snapshot()
+        for key, label in self.value_labels.items():
+            value = kpis.get(key, 0)
+            if key in ("today_sales", "monthly_revenue"):
+                label.config(text=f"${value:,.0f}")
+            else:
+                label.config(text=f"{value:,}")
 
 
 class ERPSystem:
@@ -53,8 +98,16 @@ class ERPSystem:
         self.root.title("ERP System - Complete Business Management")
         self.root.geometry("1200x700")
 
-        # Create database
-        create_database()
+        # Open the database, migrating the schema if it is out of date
+        self.db = create_database()
+
+        # Dashboard KPIs, reconciled against the raw tables in the background
+        self.kpis = KPIStore(get_pool())
+        self.kpis.start_background_refresh()
+
+        # Move receivables between aging buckets as due dates pass
+        self.aging = ARAging(get_pool())
+        self.aging.start_nightly_roll_forward()
 
         # Apply styling
         apply_style()
@@ -64,7 +117,21 @@ class ERPSystem:
         self.setup_main_frame()
         self.setup_status_bar()
 
-        # Initialize modules
+        # Long-running module actions run here instead of on the Tk thread
+        self.executor = QueryExecutor(self.root, on_busy=self.set_busy)
+
+        # Modules are imported and built the first time they are shown
+        self.modules = ModuleRegistry(self.main_container)
+        self.modules.register('dashboard', lambda parent: Dashboard(parent, self.kpis), "Dashboard loaded")
+        self.modules.register('clients', "modules.clients:ClientsModule", "Clients Management Module",
+                              executor=self.executor)
+        self.modules.register('suppliers', "modules.suppliers:SuppliersModule", "Suppliers Management Module")
+        self.modules.register('inventory', "modules.inventory:InventoryModule", "Inventory Management Module")
+        self.modules.register('sales', "modules.sales:SalesModule", "Sales & Quotations Module")
+        self.modules.register('purchasing', "modules.purchasing:PurchasingModule", "Purchasing Module")
+        self.modules.register('accounting', "modules.accounting:AccountingModule", "Accounting Module",
+                              executor=self.executor)
+        self.modules.register('diagnostics', "modules.diagnostics:DiagnosticsModule", "Query Diagnostics")
         self.current_module = None
 
         # Show dashboard initially
@@ -103,6 +170,7 @@ class ERPSystem:
         menubar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="About", command=self.show_about)
         help_menu.add_command(label="User Guide", command=self.show_user_guide)
+        help_menu.add_command(label="Query Diagnostics", command=self.show_diagnostics)
 
     def setup_main_frame(self):
         # Main container
@@ -136,108 +204,56 @@ class ERPSystem:
         self.status_bar = ttk.Frame(self.root, relief=tk.SUNKEN)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
-        self.status_label = ttk.Label(self.status_bar, text="Ready")
+        self.status_label = ttk.Label(self.status_bar,
+                                      text=f"Ready (database opened in {self.db.startup_time * 1000:.0f} ms)")
         self.status_label.pack(side=tk.LEFT, padx=5)
 
-        ttk.Label(self.status_bar, text=f"Date: {datetime.now().strftime('%Y-%m-%d')}").pack(side=tk.RIGHT, padx=5)
-
-    def clear_main_area(self):
-        for widget in self.main_container.winfo_children():
-            if widget not in [self.main_container.winfo_children()[0], self.main_container.winfo_children()[-1]]:
-                widget.destroy()
+        # Busy indicator, shown while background queries are running
+        self.busy_bar = ttk.Progressbar(self.status_bar, mode="indeterminate", length=120)
 
-    def show_dashboard(self):
-        self.clear_main_area()
-
-        dashboard_frame = ttk.Frame(self.main_container)
-        dashboard_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-        # Dashboard Title
-        ttk.Label(dashboard_frame, text="Dashboard Overview",
-                  font=("Arial", 16, "bold")).pack(pady=(0, 20))
-
-        # Stats Frame
-        stats_frame = ttk.Frame(dashboard_frame)
-        stats_frame.pack(fill=tk.X, pady=(0, 20))
-
-        # Statistics cards
-        stats = [
-            ("Total Clients", "150", "👥"),
-            ("Active Suppliers", "45", "🏭"),
-            ("Inventory Items", "320", "📦"),
-            ("Pending Orders", "12", "📋"),
-            ("Today's Sales", "$8,450", "💰"),
-            ("Monthly Revenue", "$125,000", "📈")
-        ]
-
-        for i, (title, value, icon) in enumerate(stats):
-            card = ttk.Frame(stats_frame, relief=tk.RAISED, borderwidth=2)
-            card.grid(row=i // 3, column=i % 3, padx=10, pady=10, sticky="nsew")
-
-            ttk.Label(card, text=icon, font=("Arial", 24)).pack(pady=(10, 5))
-            ttk.Label(card, text=value, font=("Arial", 18, "bold")).pack()
-            ttk.Label(card, text=title, font=("Arial", 10)).pack(pady=(0, 10))
-
-        # Recent Activities
-        activities_frame = ttk.LabelFrame(dashboard_frame, text="Recent Activities")
-        activities_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
-
-        columns = ("Time", "Activity", "User", "Status")
-        tree = ttk.Treeview(activities_frame, columns=columns, show="headings", height=8)
-
-        for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=150)
-
-        # Sample data
-        activities = [
-            ("10:30 AM", "New Quotation Created #QT-00123", "John Doe", "Pending"),
-            ("09:45 AM", "Purchase Order Confirmed #PO-00456", "Jane Smith", "Confirmed"),
-            ("09:15 AM", "Inventory Updated - Product XYZ", "Admin", "Completed"),
-            ("Yesterday", "Delivery Note #DN-00789", "Mike Brown", "Delivered"),
-            ("Yesterday", "Invoice Generated #INV-00321", "Sarah Lee", "Paid")
-        ]
+        ttk.Label(self.status_bar, text=f"Date: {datetime.now().strftime('%Y-%m-%d')}").pack(side=tk.RIGHT, padx=5)
 
-        for activity in activities:
-            tree.insert("", tk.END, values=activity)
+    def set_busy(self, busy):
+        if busy:
+            self.busy_bar.pack(side=tk.LEFT, padx=5)
+            self.busy_bar.start(10)
+        else:
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
 
-        scrollbar = ttk.Scrollbar(activities_frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+    def show_module(self, key):
+        # Query results for the module being left are no longer wanted;
+        # imports and exports keep running and report when they finish
+        self.executor.cancel_queries()
 
-        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.current_module = self.modules.show(key)
+        self.status_label.config(text=self.modules.entries[key].status)
 
-        self.status_label.config(text="Dashboard loaded")
+    def show_dashboard(self):
+        # KPI cards are cheap to read, so always show current values
+        self.modules.invalidate('dashboard')
+        self.show_module('dashboard')
 
     def show_clients(self):
-        self.clear_main_area()
-        self.current_module = ClientsModule(self.main_container)
-        self.status_label.config(text="Clients Management Module")
+        self.show_module('clients')
 
     def show_suppliers(self):
-        self.clear_main_area()
-        self.current_module = SuppliersModule(self.main_container)
-        self.status_label.config(text="Suppliers Management Module")
+        self.show_module('suppliers')
 
     def show_inventory(self):
-        self.clear_main_area()
-        self.current_module = InventoryModule(self.main_container)
-        self.status_label.config(text="Inventory Management Module")
+        self.show_module('inventory')
 
     def show_sales(self):
-        self.clear_main_area()
-        self.current_module = SalesModule(self.main_container)
-        self.status_label.config(text="Sales & Quotations Module")
+        self.show_module('sales')
 
     def show_purchasing(self):
-        self.clear_main_area()
-        self.current_module = PurchasingModule(self.main_container)
-        self.status_label.config(text="Purchasing Module")
+        self.show_module('purchasing')
 
     def show_accounting(self):
-        self.clear_main_area()
-        self.current_module = AccountingModule(self.main_container)
-        self.status_label.config(text="Accounting Module")
+        self.show_module('accounting')
+
+    def show_diagnostics(self):
+        self.show_module('diagnostics')
 
     def show_sales_stats(self):
         messagebox.showinfo("Sales Statistics", "Sales statistics report will be displayed here.")
@@ -273,6 +289,7 @@ def main():
     root = tk.Tk()
     app = ERPSystem(root)
     root.mainloop()
+    app.executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+import time
+
+from sales_rollups import ROLLUP_SCHEMA, ROLLUP_REBUILD
+from stock_checkpoints import CHECKPOINT_SCHEMA, CHECKPOINT_REBUILD
+from replenishment import REPLENISHMENT_SCHEMA, REPLENISHMENT_TRIGGER_UPGRADE
+from change_log import CHANGE_LOG_SCHEMA, CHANGE_LOG_TIME_INDEX
+from search_index import narrow_update_triggers
+
+# Ordered schema changes: (version, description, statements). A statement is
+# SQL, or a function of the connection for changes that depend on what the
+# database has. The database records the last applied version in PRAGMA
+# user_version; append new migrations at the end and never edit one that
+# has shipped. Version 0 is the baseline schema created by
+# BusinessDatabase.create_tables.
+MIGRATIONS = [
+    (1, "Covering and partial indexes for statement, aging and sales queries", [
+        # Client statements: orders by client, then the client's invoices by date
+        '''CREATE INDEX IF NOT EXISTS idx_invoices_order_date
+           ON invoices(order_id, invoice_date, invoice_number, due_date, grand_total, amount_paid, balance_due)''',
+        # Sales statistics and the sales report: invoice date range scans
+        '''CREATE INDEX IF NOT EXISTS idx_invoices_date
+           ON invoices(invoice_date, order_id, grand_total, amount_paid, balance_due)''',
+        # Statement payment history and receipt lookups per invoice
+        '''CREATE INDEX IF NOT EXISTS idx_receipts_invoice_date
+           ON receipts(invoice_id, receipt_date, amount, payment_method)''',
+        # Aging: only invoices with an open balance, ordered by due date
+        '''CREATE INDEX IF NOT EXISTS idx_invoices_open_due
+           ON invoices(due_date, order_id, balance_due) WHERE COALESCE(balance_due, 0) <> 0''',
+        # Order lines per order
+        "CREATE INDEX IF NOT EXISTS idx_sales_order_items_order ON sales_order_items(order_id)",
+        # Product availability filtered by category, ordered by stock
+        "CREATE INDEX IF NOT EXISTS idx_products_category_stock ON products(category, current_stock)",
+    ]),
+    (2, "Daily and monthly sales rollups per client and product category", ROLLUP_SCHEMA + ROLLUP_REBUILD),
+    (3, "Month-end stock checkpoints and a product/date ledger index", CHECKPOINT_SCHEMA + CHECKPOINT_REBUILD),
+    (4, "Replenishment plan with change tracking for incremental re-planning", REPLENISHMENT_SCHEMA),
+    (5, "Change log of client, supplier, product and employee records", CHANGE_LOG_SCHEMA),
+    (6, "Replenishment change tracking that works under upserts", REPLENISHMENT_TRIGGER_UPGRADE),
+    (7, "Indexes matching the keyset order of the clients and receipts grids", [
+        # Clients grid: pages by (company_name, client_id)
+        "CREATE INDEX IF NOT EXISTS idx_clients_name ON clients(company_name, client_id)",
+        # Receipts grid: newest first by (receipt_date, receipt_id)
+        "CREATE INDEX IF NOT EXISTS idx_receipts_date ON receipts(receipt_date, receipt_id)",
+    ]),
+    (8, "Change log index for time-range queries", CHANGE_LOG_TIME_INDEX),
+    (9, "Search index update triggers limited to the indexed columns", [narrow_update_triggers]),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version(migrations=MIGRATIONS):
+    return migrations[-1][0] if migrations else 0
+
+
+def pending_migrations(conn, migrations=MIGRATIONS):
+    current = schema_version(conn)
+    return [migration for migration in migrations if migration[0] > current]
+
+
+def migrate(conn, migrations=MIGRATIONS, baseline=None):
+    """Apply every pending migration in a single transaction.
+
+    On a database that has never been versioned (user_version 0),
+    baseline() runs first to create the original schema; it must be
+    idempotent, since databases created before versioning already have it.
+    Either everything pending is applied and user_version moves to the
+    latest migration, or nothing is. Returns the list of
+    (version, description, seconds) that were applied; when the schema is
+    current this costs one PRAGMA read and no DDL runs at all.
+    """
+    current = schema_version(conn)
+    pending = pending_migrations(conn, migrations)
+    if not pending:
+        return []
+
+    applied = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if current == 0 and baseline is not None:
+            started = time.perf_counter()
+            baseline()
+            applied.append((0, "Baseline schema", time.perf_counter() - started))
+
+        for version, description, statements in pending:
+            started = time.perf_counter()
+            for sql in statements:
+                if callable(sql):
+                    sql(conn)
+                else:
+                    conn.execute(sql)
+            applied.append((version, description, time.perf_counter() - started))
+        # PRAGMA does not accept parameters; the version is always an int
+        conn.execute(f"PRAGMA user_version = {int(pending[-1][0])}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    for version, description, seconds in applied:
+        print(f"Applied migration {version}: {description} ({seconds * 1000:.0f} ms)")
+    return applied
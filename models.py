@@ -1,3 +1,4 @@
+import dataclasses
 from dataclasses import dataclass
 from datetime import datetime, date
 from typing import Optional, List
@@ -145,3 +146,27 @@ class Invoice:
     payment_status: str = "Unpaid"
     notes: str = ""
     created_date: Optional[datetime] = None
+
+
+def slotted(model):
+    """Copy of a model dataclass with __slots__, for holding many records at once.
+
+    Instances have no per-object __dict__, which roughly halves their size;
+    fields, defaults and __post_init__ are the same as the model's.
+    """
+    fields = [(field.name, field.type, dataclasses.field(default=field.default,
+                                                         default_factory=field.default_factory))
+              for field in dataclasses.fields(model)]
+    namespace = {'__post_init__': model.__post_init__} if hasattr(model, '__post_init__') else {}
+    record = dataclasses.make_dataclass(f"{model.__name__}Record", fields, namespace=namespace, slots=True)
+    record.__module__ = __name__
+    return record
+
+
+ClientRecord = slotted(Client)
+SupplierRecord = slotted(Supplier)
+ProductRecord = slotted(Product)
+QuotationRecord = slotted(Quotation)
+SalesOrderRecord = slotted(SalesOrder)
+PurchaseOrderRecord = slotted(PurchaseOrder)
+InvoiceRecord = slotted(Invoice)
@@ -0,0 +1,88 @@
+import importlib
+import time
+import tkinter as tk
+from tkinter import ttk
+
+
+class ModuleEntry:
+    def __init__(self, key, target, status, options):
+        self.key = key
+        self.target = target
+        self.status = status
+        self.options = options
+        self.frame = None
+        self.instance = None
+        self.loaded_at = None
+        self.stale = False
+
+
+class ModuleRegistry:
+    """Builds application modules on first use and keeps them for reuse.
+
+    A module is registered as "package.module:ClassName" (imported only
+    when it is first shown) or as a callable taking the parent frame. Each
+    module is built once into its own frame; switching modules hides the
+    current frame and shows the cached one. A cached module is refreshed
+    when it is shown again, if it was invalidated or its data is older than
+    stale_after seconds, through its refresh() method when it has one.
+    """
+
+    def __init__(self, container, stale_after=60.0):
+        self.container = container
+        self.stale_after = stale_after
+        self.entries = {}
+        self.current = None
+        self.timings = {}
+
+    def register(self, key, target, status="", **options):
+        """options are passed to the module's constructor after the parent"""
+        self.entries[key] = ModuleEntry(key, target, status, options)
+
+    def load_class(self, target):
+        module_name, class_name = target.split(":")
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def build(self, entry):
+        entry.frame = ttk.Frame(self.container)
+        started = time.perf_counter()
+        try:
+            factory = self.load_class(entry.target) if isinstance(entry.target, str) else entry.target
+        except (ImportError, AttributeError) as e:
+            # Keep the rest of the application usable when one module is missing
+            print(f"Module {entry.key} unavailable: {e}")
+            ttk.Label(entry.frame, text=f"This module is not available ({e})").pack(pady=40)
+        else:
+            entry.instance = factory(entry.frame, **entry.options)
+        entry.loaded_at = time.monotonic()
+        self.timings[entry.key] = time.perf_counter() - started
+
+    def hide_current(self):
+        if self.current is not None:
+            self.entries[self.current].frame.pack_forget()
+            self.current = None
+
+    def show(self, key):
+        """Show a module, building it the first time; returns the module instance"""
+        entry = self.entries[key]
+        if self.current == key:
+            return entry.instance
+        self.hide_current()
+
+        if entry.frame is None:
+            self.build(entry)
+        elif entry.stale or time.monotonic() - entry.loaded_at > self.stale_after:
+            refresh = getattr(entry.instance, 'refresh', None)
+            if refresh is not None:
+                refresh()
+            entry.loaded_at = time.monotonic()
+        entry.stale = False
+
+        entry.frame.pack(fill=tk.BOTH, expand=True)
+        self.current = key
+        return entry.instance
+
+    def invalidate(self, key=None):
+        """Mark one module (or all of them) for a refresh the next time it is shown"""
+        for entry in self.entries.values():
+            if key is None or entry.key == key:
+                entry.stale = True
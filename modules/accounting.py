@@ -1,13 +1,26 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import sqlite3
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import random
 
+from database import get_pool
+from query_executor import QueryExecutor
+from ar_aging import ARAging
+from statements import render_statement, write_statement
+from reports import REPORTS, sales_report, aging_report
+from export import export_report
+from report_engine import ratio, row_totals
+from keyset import KeysetQuery
+from modules.virtual_grid import VirtualGrid
+
 
 class AccountingModule:
-    def __init__(self, parent):
+    def __init__(self, parent, executor=None):
         self.parent = parent
+        # Reports and statements run off the Tk thread
+        self.executor = executor or QueryExecutor(parent)
+        self.aging = ARAging(get_pool())
         self.setup_ui()
         self.load_receipts()
 
@@ -80,7 +93,8 @@ class AccountingModule:
         # Scrollbars
         vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.receipt_tree.yview)
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.receipt_tree.xview)
-        self.receipt_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.receipt_tree.configure(xscrollcommand=hsb.set)
+        self.receipt_grid = VirtualGrid(self.receipt_tree, get_pool(), scrollbar=vsb)
 
         self.receipt_tree.grid(row=0, column=0, sticky="nsew")
         vsb.grid(row=0, column=1, sticky="ns")
@@ -110,6 +124,7 @@ class AccountingModule:
         self.statement_period.pack(side=tk.LEFT, padx=5)
 
         ttk.Button(selection_frame, text="Generate", command=self.generate_statement).pack(side=tk.LEFT, padx=20)
+        ttk.Button(selection_frame, text="Save...", command=self.save_statement).pack(side=tk.LEFT, padx=5)
 
         # Load clients
         self.load_clients_list()
@@ -182,38 +197,44 @@ class AccountingModule:
         export_frame = ttk.Frame(parent)
         export_frame.pack(pady=10)
 
+        ttk.Label(export_frame, text="Export:").pack(side=tk.LEFT, padx=5)
+        self.export_choice = ttk.Combobox(export_frame, width=20, state="readonly",
+                                          values=[title for title, _, _ in REPORTS.values()])
+        self.export_choice.current(0)
+        self.export_choice.pack(side=tk.LEFT, padx=5)
+
         ttk.Button(export_frame, text="Export to Excel",
                    command=self.export_excel).pack(side=tk.LEFT, padx=5)
         ttk.Button(export_frame, text="Export to PDF",
                    command=self.export_pdf).pack(side=tk.LEFT, padx=5)
 
+        self.export_status = ttk.Label(export_frame, text="")
+        self.export_status.pack(side=tk.LEFT, padx=10)
+
     def load_clients_list(self):
-        conn = sqlite3.connect('erp_system.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, company_name FROM clients ORDER BY company_name")
-        clients = cursor.fetchall()
-        conn.close()
+        pool = get_pool()
+        with pool.reader() as conn:
+            clients = pool.cache.fetchall(conn, "SELECT client_id, company_name FROM clients ORDER BY company_name")
 
         self.statement_client['values'] = [f"{c[0]} - {c[1]}" for c in clients]
         if clients:
             self.statement_client.set(clients[0][1])
 
-    def load_receipts(self):
-        for item in self.receipt_tree.get_children():
-            self.receipt_tree.delete(item)
-
-        conn = sqlite3.connect('erp_system.db')
-        cursor = conn.cursor()
+    def refresh(self):
+        self.load_receipts()
+        self.load_clients_list()
 
+    def load_receipts(self):
         date_from = self.receipt_date_from.get()
         date_to = self.receipt_date_to.get()
 
         query = """
-            SELECT r.id, r.receipt_no, i.invoice_no, c.company_name, 
-                   r.receipt_date, r.amount, r.payment_method, r.reference_no
+            SELECT r.receipt_id, r.receipt_number, i.invoice_number, c.company_name,
+                   r.receipt_date, r.amount, r.payment_method, r.reference_number
             FROM receipts r
-            JOIN invoices i ON r.invoice_id = i.id
-            JOIN clients c ON i.client_id = c.id
+            JOIN invoices i ON r.invoice_id = i.invoice_id
+            JOIN sales_orders o ON i.order_id = o.order_id
+            JOIN clients c ON o.client_id = c.client_id
             WHERE 1=1
         """
         params = []
@@ -225,14 +246,10 @@ class AccountingModule:
             query += " AND r.receipt_date <= ?"
             params.append(date_to)
 
-        query += " ORDER BY r.receipt_date DESC"
-
-        cursor.execute(query, params)
-
-        for row in cursor.fetchall():
-            self.receipt_tree.insert("", tk.END, values=row)
-
-        conn.close()
+        # Newest first, paged on (receipt_date, receipt_id) as the list is scrolled
+        self.receipt_grid.load(KeysetQuery(query, params,
+                                           order_by=[("r.receipt_date", 4), ("r.receipt_id", 0)],
+                                           descending=True))
 
     def create_receipt(self):
         # This would open a receipt creation dialog
@@ -289,19 +306,22 @@ class AccountingModule:
         receipt_no = item['values'][1]
         messagebox.showinfo("Print", f"Printing receipt {receipt_no}...")
 
-    def generate_statement(self):
+    def selected_statement_client(self):
         client = self.statement_client.get()
-        period = self.statement_period.get()
 
         if not client:
             messagebox.showerror("Error", "Please select a client")
-            return
+            return None
 
         try:
-            client_id = int(client.split(" - ")[0])
+            return int(client.split(" - ")[0])
         except:
             messagebox.showerror("Error", "Invalid client selection")
-            return
+            return None
+
+    def statement_period_range(self):
+        """Return (from_date, to_date, today) for the selected period"""
+        period = self.statement_period.get()
 
         # Calculate date range based on period
         today = date.today()
@@ -342,173 +362,101 @@ class AccountingModule:
             from_date = date(today.year, today.month, 1)
             to_date = today
 
-        # Generate statement
-        conn = sqlite3.connect('erp_system.db')
-        cursor = conn.cursor()
+        return from_date, to_date, today
 
-        # Get client info
-        cursor.execute("SELECT company_name, address, city, country FROM clients WHERE id = ?", (client_id,))
-        client_info = cursor.fetchone()
+    def generate_statement(self):
+        client_id = self.selected_statement_client()
+        if client_id is None:
+            return
 
-        # Get invoices for period
-        cursor.execute("""
-            SELECT invoice_no, invoice_date, due_date, total_amount, amount_paid, balance
-            FROM invoices
-            WHERE client_id = ? 
-            AND invoice_date BETWEEN ? AND ?
-            ORDER BY invoice_date
-        """, (client_id, from_date.strftime("%Y-%m-%d"), to_date.strftime("%Y-%m-%d")))
+        from_date, to_date, today = self.statement_period_range()
 
-        invoices = cursor.fetchall()
+        # Stream the statement into the widget as it is rendered
+        self.statement_text.delete(1.0, tk.END)
+        self.executor.submit(
+            lambda task: self.stream_statement(task, client_id, from_date, to_date, today),
+            on_progress=lambda chunk: self.statement_text.insert(tk.END, chunk),
+            on_error=self.show_task_error,
+            timeout=300)
+
+    def stream_statement(self, task, client_id, from_date, to_date, today):
+        with task.reader(get_pool()) as conn:
+            for chunk in render_statement(conn, client_id, from_date, to_date, today):
+                task.report(chunk)
+
+    def save_statement(self):
+        client_id = self.selected_statement_client()
+        if client_id is None:
+            return
 
-        # Get receipts for period
-        cursor.execute("""
-            SELECT r.receipt_date, r.amount, r.payment_method, i.invoice_no
-            FROM receipts r
-            JOIN invoices i ON r.invoice_id = i.id
-            WHERE i.client_id = ?
-            AND r.receipt_date BETWEEN ? AND ?
-            ORDER BY r.receipt_date
-        """, (client_id, from_date.strftime("%Y-%m-%d"), to_date.strftime("%Y-%m-%d")))
-
-        receipts = cursor.fetchall()
-
-        conn.close()
-
-        # Build statement text
-        statement = f"""
-        {'=' * 60}
-        {'STATEMENT OF ACCOUNT':^60}
-        {'=' * 60}
-
-        Client: {client_info[0]}
-        Address: {client_info[1]}
-        {client_info[2]}, {client_info[3]}
-
-        Period: {from_date.strftime('%Y-%m-%d')} to {to_date.strftime('%Y-%m-%d')}
-        Statement Date: {today.strftime('%Y-%m-%d')}
-
-        {'=' * 60}
-        {'INVOICES':^60}
-        {'=' * 60}
-        {'Invoice No':<15} {'Date':<12} {'Due Date':<12} {'Amount':>10} {'Paid':>10} {'Balance':>10}
-        {'-' * 60}
-        """
+        period = self.statement_period_range()
 
-        total_invoiced = 0
-        total_paid = 0
-        total_balance = 0
-
-        for inv in invoices:
-            statement += f"{inv[0]:<15} {inv[1]:<12} {inv[2]:<12} ${inv[3]:>9,.2f} ${inv[4]:>9,.2f} ${inv[5]:>9,.2f}\n"
-            total_invoiced += inv[3]
-            total_paid += inv[4]
-            total_balance += inv[5]
-
-        statement += f"{'-' * 60}\n"
-        statement += f"{'TOTALS':<39} ${total_invoiced:>9,.2f} ${total_paid:>9,.2f} ${total_balance:>9,.2f}\n"
-
-        statement += f"""
-        {'=' * 60}
-        {'PAYMENT HISTORY':^60}
-        {'=' * 60}
-        {'Date':<12} {'Invoice':<15} {'Amount':>15} {'Method':<15}
-        {'-' * 60}
-        """
+        path = filedialog.asksaveasfilename(defaultextension=".txt",
+                                            filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
 
-        for rec in receipts:
-            statement += f"{rec[0]:<12} {rec[3]:<15} ${rec[1]:>14,.2f} {rec[2]:<15}\n"
-
-        statement += f"""
-        {'=' * 60}
-        SUMMARY:
-        Total Invoiced: ${total_invoiced:,.2f}
-        Total Paid: ${total_paid:,.2f}
-        Outstanding Balance: ${total_balance:,.2f}
-        {'=' * 60}
-
-        Please make payments to:
-        Account Name: Your Company Name
-        Bank: Your Bank Name
-        Account No: 123-456-789
-        Swift Code: ABCD1234
-
-        For inquiries, please contact:
-        Phone: +1-234-567-8900
-        Email: accounting@yourcompany.com
-        """
+        def write(task):
+            with task.reader(get_pool()) as conn:
+                write_statement(conn, path, client_id, *period)
 
-        self.statement_text.delete(1.0, tk.END)
-        self.statement_text.insert(1.0, statement)
+        self.executor.submit(write,
+                             on_done=lambda _: messagebox.showinfo("Success", f"Statement saved to {path}"),
+                             on_error=self.show_task_error,
+                             timeout=None,
+                             background=True)
 
     def generate_report(self, report_type):
         # Clear existing data
-        for item in self.report_tree.get_children():
-            self.report_tree.delete(item)
+        self.report_tree.delete(*self.report_tree.get_children())
 
-        conn = sqlite3.connect('erp_system.db')
-        cursor = conn.cursor()
+        self.executor.submit(
+            lambda task: self.fetch_report(task, report_type),
+            on_done=lambda data: self.show_report(report_type, data),
+            on_error=self.show_task_error)
 
-        if report_type == "sales_report":
-            cursor.execute("""
-                SELECT strftime('%Y-%m', invoice_date) as month,
-                       COUNT(*) as invoice_count,
-                       SUM(total_amount) as total_sales,
-                       SUM(amount_paid) as total_paid
-                FROM invoices
-                WHERE invoice_date >= date('now', '-6 months')
-                GROUP BY strftime('%Y-%m', invoice_date)
-                ORDER BY month DESC
-            """)
-
-            data = cursor.fetchall()
+    def fetch_report(self, task, report_type):
+        if report_type == "aging_report":
+            # Bring the buckets up to date if the nightly job has not run yet
+            self.aging.roll_forward()
+
+        with task.reader(get_pool()) as conn:
+            if report_type == "sales_report":
+                return sales_report(conn)
 
+            elif report_type == "aging_report":
+                # Pre-aggregated per client and bucket, one row per client
+                return aging_report(conn)
+
+            return []
+
+    def show_report(self, report_type, data):
+        if report_type == "sales_report":
             # Insert headers
             self.report_tree.insert("", tk.END, values=("Month", "Invoices", "Total Sales", "Amount Paid", ""))
             self.report_tree.insert("", tk.END, values=("-" * 20, "-" * 10, "-" * 15, "-" * 15, "-" * 10))
 
-            total_sales = 0
-            total_paid = 0
-
             for row in data:
                 self.report_tree.insert("", tk.END, values=(
                     row[0],
                     row[1],
                     f"${row[2]:,.2f}",
                     f"${row[3]:,.2f}",
-                    f"{(row[3] / row[2] * 100 if row[2] > 0 else 0):.1f}%"
+                    f"{ratio(row[3], row[2]) * 100:.1f}%"
                 ))
-                total_sales += row[2]
-                total_paid += row[3]
 
             # Insert totals
+            invoice_count, total_sales, total_paid = row_totals(data, 1, 2, 3)
             self.report_tree.insert("", tk.END, values=("-" * 20, "-" * 10, "-" * 15, "-" * 15, "-" * 10))
             self.report_tree.insert("", tk.END, values=(
                 "TOTAL",
-                sum([r[1] for r in data]),
+                int(invoice_count),
                 f"${total_sales:,.2f}",
                 f"${total_paid:,.2f}",
-                f"{(total_paid / total_sales * 100 if total_sales > 0 else 0):.1f}%"
+                f"{ratio(total_paid, total_sales) * 100:.1f}%"
             ))
 
         elif report_type == "aging_report":
-            cursor.execute("""
-                SELECT c.company_name,
-                       SUM(CASE WHEN i.balance > 0 AND i.due_date < date('now', '-90 days') THEN i.balance ELSE 0 END) as over_90,
-                       SUM(CASE WHEN i.balance > 0 AND i.due_date BETWEEN date('now', '-89 days') AND date('now', '-60 days') THEN i.balance ELSE 0 END) as days_61_90,
-                       SUM(CASE WHEN i.balance > 0 AND i.due_date BETWEEN date('now', '-59 days') AND date('now', '-30 days') THEN i.balance ELSE 0 END) as days_31_60,
-                       SUM(CASE WHEN i.balance > 0 AND i.due_date >= date('now', '-29 days') THEN i.balance ELSE 0 END) as current,
-                       SUM(i.balance) as total
-                FROM invoices i
-                JOIN clients c ON i.client_id = c.id
-                WHERE i.balance > 0
-                GROUP BY c.id, c.company_name
-                HAVING total > 0
-                ORDER BY total DESC
-            """)
-
-            data = cursor.fetchall()
-
             # Insert headers
             self.report_tree.insert("", tk.END,
                                     values=("Client", "Current", "31-60 Days", "61-90 Days", "Over 90", "Total"))
@@ -524,10 +472,52 @@ class AccountingModule:
                     f"${row[5]:,.2f}"
                 ))
 
-        conn.close()
+            # Insert totals
+            over_90, days_61_90, days_31_60, current, balance = row_totals(data, 1, 2, 3, 4, 5)
+            self.report_tree.insert("", tk.END, values=("-" * 20, "-" * 15, "-" * 15, "-" * 15, "-" * 15, "-" * 15))
+            self.report_tree.insert("", tk.END, values=(
+                "TOTAL",
+                f"${current:,.2f}",
+                f"${days_31_60:,.2f}",
+                f"${days_61_90:,.2f}",
+                f"${over_90:,.2f}",
+                f"${balance:,.2f}"
+            ))
+
+    def show_task_error(self, error):
+        messagebox.showerror("Error", f"Error running query: {str(error)}")
 
     def export_excel(self):
-        messagebox.showinfo("Export", "Report exported to Excel successfully")
+        report = list(REPORTS)[self.export_choice.current()]
+        title = REPORTS[report][0]
+
+        path = filedialog.asksaveasfilename(defaultextension=".xlsx",
+                                            initialfile=title.replace(" ", "_"),
+                                            filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv")])
+        if not path:
+            return
+
+        def export(task):
+            if report == "aging_report":
+                self.aging.roll_forward()
+            with task.reader(get_pool()) as conn:
+                return export_report(conn, report, path, progress=task.report)
+
+        def finished(rows):
+            self.export_status.config(text="")
+            messagebox.showinfo("Export", f"{title} exported to {path} ({rows:,} rows)")
+
+        def failed(error):
+            self.export_status.config(text="")
+            self.show_task_error(error)
+
+        self.export_status.config(text="Exporting...")
+        self.executor.submit(export,
+                             on_done=finished,
+                             on_error=failed,
+                             on_progress=lambda rows: self.export_status.config(text=f"{rows:,} rows written"),
+                             timeout=None,
+                             background=True)
 
     def export_pdf(self):
-        messagebox.showinfo("Export", "Report exported to PDF successfully")
+        messagebox.showwarning("Export", "PDF export is not supported yet; use Export to Excel instead")
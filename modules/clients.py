@@ -1,12 +1,28 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import sqlite3
 from datetime import datetime
 
+from database import get_pool
+from search_index import SearchIndex
+from keyset import KeysetQuery
+from modules.virtual_grid import VirtualGrid
+from query_executor import QueryExecutor
+from importer import import_clients
+
+CLIENT_COLUMNS = "client_id, company_name, contact_person, phone, email, city, status, credit_limit"
+
+# Columns edited in the client dialog, in the order the edit query selects them
+FORM_COLUMNS = ("client_id", "company_name", "contact_person", "email", "phone", "address", "city", "country",
+                "tax_id", "credit_limit", "payment_terms", "status")
+
 
 class ClientsModule:
-    def __init__(self, parent):
+    def __init__(self, parent, executor=None):
         self.parent = parent
+        self.executor = executor or QueryExecutor(parent)
+        self.search_index = SearchIndex(get_pool())
+        self.search_job = None
         self.setup_ui()
         self.load_clients()
 
@@ -31,6 +47,11 @@ class ClientsModule:
                    command=self.delete_client, style="Danger.TButton").pack(side=tk.LEFT, padx=2)
         ttk.Button(control_frame, text="🔄 Refresh",
                    command=self.load_clients).pack(side=tk.LEFT, padx=2)
+        ttk.Button(control_frame, text="📥 Import",
+                   command=self.import_clients).pack(side=tk.LEFT, padx=2)
+
+        self.import_status = ttk.Label(control_frame, text="")
+        self.import_status.pack(side=tk.LEFT, padx=10)
 
         # Search frame
         search_frame = ttk.Frame(main_frame)
@@ -40,6 +61,7 @@ class ClientsModule:
         self.search_var = tk.StringVar()
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
         search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<KeyRelease>", self.schedule_search)
         ttk.Button(search_frame, text="Search",
                    command=self.search_clients).pack(side=tk.LEFT, padx=5)
 
@@ -47,7 +69,7 @@ class ClientsModule:
         tree_frame = ttk.Frame(main_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True)
 
-        columns = ("ID", "Client Code", "Company Name", "Contact Person",
+        columns = ("ID", "Company Name", "Contact Person",
                    "Phone", "Email", "City", "Status", "Credit Limit")
 
         self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15)
@@ -65,7 +87,8 @@ class ClientsModule:
         # Scrollbars
         vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
+        self.grid = VirtualGrid(self.tree, get_pool(), scrollbar=vsb)
 
         self.tree.grid(row=0, column=0, sticky="nsew")
         vsb.grid(row=0, column=1, sticky="ns")
@@ -78,46 +101,55 @@ class ClientsModule:
         self.tree.bind("<Double-1>", lambda e: self.edit_client())
 
     def load_clients(self):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Load from database
-        conn = sqlite3.connect('erp_system.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, client_code, company_name, contact_person, phone, email, city, status, credit_limit FROM clients ORDER BY company_name")
+        # Load from database a page at a time as the list is scrolled
+        self.grid.load(KeysetQuery(f"SELECT {CLIENT_COLUMNS} FROM clients WHERE 1=1",
+                                   order_by=[("company_name", 1), ("client_id", 0)]))
 
-        for row in cursor.fetchall():
-            self.tree.insert("", tk.END, values=row)
+    def refresh(self):
+        # Reload the list, keeping any search that is in effect
+        self.search_clients()
 
-        conn.close()
+    def schedule_search(self, event=None):
+        # Debounce keystrokes so fast typing runs a single search
+        if self.search_job is not None:
+            self.parent.after_cancel(self.search_job)
+        self.search_job = self.parent.after(250, self.search_clients)
 
     def search_clients(self):
+        self.search_job = None
         search_term = self.search_var.get().strip()
 
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        conn = sqlite3.connect('erp_system.db')
-        cursor = conn.cursor()
+        if not search_term:
+            self.load_clients()
+            return
 
-        if search_term:
-            cursor.execute("""
-                SELECT id, client_code, company_name, contact_person, phone, email, city, status, credit_limit 
-                FROM clients 
-                WHERE company_name LIKE ? OR contact_person LIKE ? OR email LIKE ? OR phone LIKE ?
-                ORDER BY company_name
-            """, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-        else:
-            cursor.execute(
-                "SELECT id, client_code, company_name, contact_person, phone, email, city, status, credit_limit FROM clients ORDER BY company_name")
+        rows = self.search_index.search("clients", search_term, CLIENT_COLUMNS, order_by="company_name")
+        self.grid.set_rows(rows)
 
-        for row in cursor.fetchall():
-            self.tree.insert("", tk.END, values=row)
+    def import_clients(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx"),
+                                                     ("All files", "*.*")])
+        if not path:
+            return
 
-        conn.close()
+        def run(task):
+            return import_clients(get_pool(), path, progress=lambda result: task.report(result.summary()))
+
+        self.executor.submit(run,
+                             on_progress=lambda text: self.import_status.config(text=text),
+                             on_done=self.import_finished,
+                             on_error=lambda e: messagebox.showerror("Error", f"Import failed: {str(e)}"),
+                             timeout=None,
+                             background=True)
+
+    def import_finished(self, result):
+        self.import_status.config(text="")
+        message = result.summary()
+        if result.errors:
+            shown = "\n".join(f"Line {line}: {error}" for line, error in result.errors[:10])
+            message += f"\n\nFirst errors:\n{shown}"
+        messagebox.showinfo("Import", message)
+        self.load_clients()
 
     def add_client(self):
         self.show_client_dialog()
@@ -131,11 +163,9 @@ class ClientsModule:
         item = self.tree.item(selected[0])
         client_id = item['values'][0]
 
-        conn = sqlite3.connect('erp_system.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM clients WHERE id = ?", (client_id,))
-        client_data = cursor.fetchone()
-        conn.close()
+        with get_pool().reader() as conn:
+            client_data = conn.execute(f"SELECT {', '.join(FORM_COLUMNS)} FROM clients WHERE client_id = ?",
+                                       (client_id,)).fetchone()
 
         if client_data:
             self.show_client_dialog(client_data)
@@ -150,11 +180,9 @@ class ClientsModule:
             item = self.tree.item(selected[0])
             client_id = item['values'][0]
 
-            conn = sqlite3.connect('erp_system.db')
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM clients WHERE id = ?", (client_id,))
-            conn.commit()
-            conn.close()
+            with get_pool().writer() as conn:
+                conn.execute("DELETE FROM clients WHERE client_id = ?", (client_id,))
+            get_pool().cache.invalidate("clients")
 
             messagebox.showinfo("Success", "Client deleted successfully")
             self.load_clients()
@@ -174,19 +202,17 @@ class ClientsModule:
         row = 0
 
         fields = [
-            ("client_code", "Client Code:", 0, 0),
-            ("company_name", "Company Name*:", 0, 1),
-            ("contact_person", "Contact Person:", 1, 0),
-            ("email", "Email:", 1, 1),
-            ("phone", "Phone:", 2, 0),
-            ("tax_id", "Tax ID:", 2, 1),
-            ("address", "Address:", 3, 0),
-            ("city", "City:", 3, 1),
-            ("country", "Country:", 4, 0),
-            ("credit_limit", "Credit Limit:", 4, 1),
-            ("payment_terms", "Payment Terms:", 5, 0),
-            ("status", "Status:", 5, 1),
-            ("notes", "Notes:", 6, 0)
+            ("company_name", "Company Name*:", 0, 0),
+            ("contact_person", "Contact Person:", 0, 1),
+            ("email", "Email:", 1, 0),
+            ("phone", "Phone:", 1, 1),
+            ("tax_id", "Tax ID:", 2, 0),
+            ("address", "Address:", 2, 1),
+            ("city", "City:", 3, 0),
+            ("country", "Country:", 3, 1),
+            ("credit_limit", "Credit Limit:", 4, 0),
+            ("payment_terms", "Payment Terms:", 4, 1),
+            ("status", "Status:", 5, 0)
         ]
 
         for field_name, label_text, grid_row, grid_col in fields:
@@ -194,8 +220,6 @@ class ClientsModule:
 
             if field_name == "status":
                 entry = ttk.Combobox(form_frame, values=["Active", "Inactive", "Suspended"], state="readonly")
-            elif field_name == "notes":
-                entry = tk.Text(form_frame, height=4, width=40)
             else:
                 entry = ttk.Entry(form_frame, width=30)
 
@@ -206,15 +230,10 @@ class ClientsModule:
 
         # Fill form if editing
         if client_data:
-            field_names = ["id", "client_code", "company_name", "contact_person", "email", "phone",
-                           "address", "city", "country", "tax_id", "credit_limit", "payment_terms",
-                           "status", "created_date", "notes"]
-
-            for i, field_name in enumerate(field_names):
+            for i, field_name in enumerate(FORM_COLUMNS):
                 if field_name in entries:
-                    if field_name == "notes" and isinstance(entries[field_name], tk.Text):
-                        entries[field_name].delete(1.0, tk.END)
-                        entries[field_name].insert(1.0, client_data[i] or "")
+                    if field_name == "status":
+                        entries[field_name].set(client_data[i] or "")
                     else:
                         entries[field_name].delete(0, tk.END)
                         entries[field_name].insert(0, str(client_data[i] or ""))
@@ -235,42 +254,11 @@ class ClientsModule:
             messagebox.showerror("Error", "Company Name is required")
             return
 
-        conn = sqlite3.connect('erp_system.db')
-        cursor = conn.cursor()
-
         try:
-            if client_data:  # Update existing client
-                cursor.execute("""
-                    UPDATE clients SET
-                    client_code = ?, company_name = ?, contact_person = ?, email = ?,
-                    phone = ?, address = ?, city = ?, country = ?, tax_id = ?,
-                    credit_limit = ?, payment_terms = ?, status = ?, notes = ?
-                    WHERE id = ?
-                """, (
-                    entries["client_code"].get(),
-                    entries["company_name"].get(),
-                    entries["contact_person"].get(),
-                    entries["email"].get(),
-                    entries["phone"].get(),
-                    entries["address"].get(),
-                    entries["city"].get(),
-                    entries["country"].get(),
-                    entries["tax_id"].get(),
-                    float(entries["credit_limit"].get() or 0),
-                    entries["payment_terms"].get(),
-                    entries["status"].get(),
-                    entries["notes"].get("1.0", tk.END).strip() if isinstance(entries["notes"], tk.Text) else entries[
-                        "notes"].get(),
-                    client_data[0]
-                ))
-            else:  # Insert new client
-                cursor.execute("""
-                    INSERT INTO clients 
-                    (client_code, company_name, contact_person, email, phone, 
-                     address, city, country, tax_id, credit_limit, payment_terms, status, notes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    entries["client_code"].get(),
+            with get_pool().writer() as conn:
+                cursor = conn.cursor()
+
+                values = (
                     entries["company_name"].get(),
                     entries["contact_person"].get(),
                     entries["email"].get(),
@@ -281,19 +269,31 @@ class ClientsModule:
                     entries["tax_id"].get(),
                     float(entries["credit_limit"].get() or 0),
                     entries["payment_terms"].get(),
-                    entries["status"].get(),
-                    entries["notes"].get("1.0", tk.END).strip() if isinstance(entries["notes"], tk.Text) else entries[
-                        "notes"].get()
-                ))
+                    entries["status"].get()
+                )
+
+                if client_data:  # Update existing client
+                    cursor.execute("""
+                        UPDATE clients SET
+                        company_name = ?, contact_person = ?, email = ?,
+                        phone = ?, address = ?, city = ?, country = ?, tax_id = ?,
+                        credit_limit = ?, payment_terms = ?, status = ?
+                        WHERE client_id = ?
+                    """, values + (client_data[0],))
+                else:  # Insert new client
+                    cursor.execute("""
+                        INSERT INTO clients 
+                        (company_name, contact_person, email, phone, 
+                         address, city, country, tax_id, credit_limit, payment_terms, status)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, values)
+            get_pool().cache.invalidate("clients")
 
-            conn.commit()
             messagebox.showinfo("Success", "Client saved successfully")
             dialog.destroy()
             self.load_clients()
 
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error", "Client code already exists")
+        except sqlite3.IntegrityError as e:
+            messagebox.showerror("Error", f"Client could not be saved: {str(e)}")
         except Exception as e:
-            messagebox.showerror("Error", f"Error saving client: {str(e)}")
-        finally:
-            conn.close()
+            messagebox.showerror("Error", f"Error saving client: {str(e)}")
\ No newline at end of file
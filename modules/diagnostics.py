@@ -0,0 +1,160 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime
+
+from database import get_pool
+from query_profiler import PROFILER
+
+
+def one_line(sql, width=120):
+    text = " ".join(sql.split())
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+class DiagnosticsModule:
+    def __init__(self, parent):
+        self.parent = parent
+        self.slow_rows = {}
+        self.summary_rows = {}
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        main_frame = ttk.Frame(self.parent)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        ttk.Label(main_frame, text="Query Diagnostics",
+                  font=("Arial", 16, "bold")).pack(pady=(0, 10))
+
+        # Profiler settings
+        control_frame = ttk.Frame(main_frame)
+        control_frame.pack(fill=tk.X, pady=(0, 10))
+
+        self.enabled_var = tk.BooleanVar(value=PROFILER.enabled)
+        ttk.Checkbutton(control_frame, text="Profile SQL", variable=self.enabled_var,
+                        command=self.apply_settings).pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(control_frame, text="Slow over (ms):").pack(side=tk.LEFT, padx=(15, 2))
+        self.threshold_var = tk.StringVar(value=f"{PROFILER.threshold * 1000:g}")
+        ttk.Entry(control_frame, textvariable=self.threshold_var, width=8).pack(side=tk.LEFT)
+
+        ttk.Label(control_frame, text="Explain over (ms):").pack(side=tk.LEFT, padx=(15, 2))
+        explain = PROFILER.explain_threshold
+        self.explain_var = tk.StringVar(value="" if explain is None else f"{explain * 1000:g}")
+        ttk.Entry(control_frame, textvariable=self.explain_var, width=8).pack(side=tk.LEFT)
+
+        ttk.Button(control_frame, text="Apply", command=self.apply_settings).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="🔄 Refresh", command=self.refresh).pack(side=tk.LEFT, padx=2)
+        ttk.Button(control_frame, text="Clear", command=self.clear).pack(side=tk.LEFT, padx=2)
+
+        self.count_label = ttk.Label(control_frame, text="")
+        self.count_label.pack(side=tk.RIGHT, padx=5)
+
+        self.cache_label = ttk.Label(main_frame, text="")
+        self.cache_label.pack(anchor=tk.W, pady=(0, 5))
+
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True)
+
+        # Slowest individual statements
+        slow_tab = ttk.Frame(notebook)
+        notebook.add(slow_tab, text="Slowest Statements")
+        columns = ("Time", "ms", "Rows", "Binds", "Caller", "Statement")
+        self.slow_tree = self.make_tree(slow_tab, columns, {"Time": 80, "ms": 80, "Rows": 70, "Binds": 50,
+                                                            "Caller": 250, "Statement": 500})
+        self.slow_tree.bind('<<TreeviewSelect>>', self.show_slow_detail)
+
+        # Totals per distinct statement
+        summary_tab = ttk.Frame(notebook)
+        notebook.add(summary_tab, text="By Statement")
+        columns = ("Count", "Total ms", "Avg ms", "Max ms", "Rows", "Statement")
+        self.summary_tree = self.make_tree(summary_tab, columns, {"Count": 70, "Total ms": 90, "Avg ms": 80,
+                                                                  "Max ms": 80, "Rows": 80, "Statement": 550})
+        self.summary_tree.bind('<<TreeviewSelect>>', self.show_summary_detail)
+
+        # Full statement text and query plan of the selection
+        detail_frame = ttk.LabelFrame(main_frame, text="Statement")
+        detail_frame.pack(fill=tk.X, pady=(10, 0))
+        self.detail_text = tk.Text(detail_frame, height=10, wrap=tk.WORD, font=("Courier", 10))
+        self.detail_text.pack(fill=tk.X, padx=5, pady=5)
+
+    def make_tree(self, parent, columns, widths):
+        tree = ttk.Treeview(parent, columns=columns, show="headings", height=12)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=widths[col])
+
+        scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        return tree
+
+    def apply_settings(self):
+        try:
+            threshold = float(self.threshold_var.get() or 0)
+            explain = float(self.explain_var.get()) if self.explain_var.get().strip() else None
+        except ValueError:
+            messagebox.showerror("Error", "Thresholds must be numbers of milliseconds")
+            return
+
+        PROFILER.threshold = threshold / 1000
+        PROFILER.explain_threshold = explain / 1000 if explain is not None else None
+        if self.enabled_var.get():
+            PROFILER.enable()
+        else:
+            PROFILER.disable()
+        self.refresh()
+
+    def clear(self):
+        PROFILER.clear()
+        self.refresh()
+
+    def refresh(self):
+        self.slow_tree.delete(*self.slow_tree.get_children())
+        self.summary_tree.delete(*self.summary_tree.get_children())
+        self.slow_rows = {}
+        self.summary_rows = {}
+
+        for record in PROFILER.top():
+            item = self.slow_tree.insert("", tk.END, values=(
+                datetime.fromtimestamp(record.started).strftime("%H:%M:%S"),
+                f"{record.elapsed * 1000:.2f}",
+                "" if record.rows is None else record.rows,
+                "" if record.binds is None else record.binds,
+                record.caller,
+                one_line(record.sql)))
+            self.slow_rows[item] = record
+
+        for sql, count, total, worst, rows in PROFILER.statement_summary():
+            item = self.summary_tree.insert("", tk.END, values=(
+                count, f"{total * 1000:.2f}", f"{total * 1000 / count:.3f}", f"{worst * 1000:.2f}",
+                rows, one_line(sql)))
+            self.summary_rows[item] = sql
+
+        state = "on" if PROFILER.enabled else "off"
+        self.count_label.config(text=f"Profiling {state}, {PROFILER.statements:,} statements recorded")
+
+        cache = get_pool().cache.stats()
+        self.cache_label.config(text=f"Result cache: {cache['entries']} entries, {cache['bytes'] / 1024:,.0f} KB, "
+                                     f"hit rate {cache['hit_rate']:.0%} ({cache['hits']:,} hits, "
+                                     f"{cache['misses']:,} misses, {cache['invalidations']:,} invalidated)")
+
+    def show_detail(self, text):
+        self.detail_text.delete(1.0, tk.END)
+        self.detail_text.insert(1.0, text)
+
+    def show_slow_detail(self, event=None):
+        selected = self.slow_tree.selection()
+        if not selected:
+            return
+        record = self.slow_rows[selected[0]]
+        text = f"{record.caller}  {record.elapsed * 1000:.2f} ms\n\n{record.sql.strip()}\n"
+        if record.plan:
+            text += "\nQuery plan:\n" + "\n".join(f"  {detail}" for detail in record.plan)
+        self.show_detail(text)
+
+    def show_summary_detail(self, event=None):
+        selected = self.summary_tree.selection()
+        if selected:
+            self.show_detail(self.summary_rows[selected[0]].strip())
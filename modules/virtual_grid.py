@@ -0,0 +1,134 @@
+import tkinter as tk
+from collections import deque
+
+
+class VirtualGrid:
+    """Keeps only a sliding window of pages in a ttk.Treeview.
+
+    Pages are fetched on demand as the user scrolls towards either end of
+    the window; once more than max_pages are loaded, the page furthest from
+    the viewport is dropped, so memory stays constant regardless of table size.
+    """
+
+    def __init__(self, tree, pool, scrollbar=None, page_size=200, max_pages=5):
+        self.tree = tree
+        self.pool = pool
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+        self.query = None
+        self.pages = deque()
+        self.dropped_above = 0
+        self.at_end = True
+        self.loading = False
+
+        self.tree.configure(yscrollcommand=self.on_scroll)
+
+    def load(self, query):
+        """Show the first page of query, discarding the current window"""
+        self.query = query
+        self.clear()
+        self.at_end = False
+        self.append_page()
+
+    def refresh(self):
+        if self.query is not None:
+            self.load(self.query)
+
+    def set_rows(self, rows):
+        """Show a fixed list of rows (e.g. search results) without paging"""
+        self.query = None
+        self.clear()
+        self.pages.append(self._insert(rows, tk.END))
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.pages.clear()
+        self.dropped_above = 0
+        self.at_end = True
+
+    def _insert(self, rows, index):
+        items = []
+        for row in rows:
+            items.append(self.tree.insert("", index, values=row))
+            if index != tk.END:
+                index += 1
+        return {'items': items,
+                'first': self.query.key(rows[0]) if rows and self.query else None,
+                'last': self.query.key(rows[-1]) if rows and self.query else None}
+
+    def _fetch(self, after, backward):
+        with self.pool.reader() as conn:
+            return self.query.page(conn, after, self.page_size, backward)
+
+    def _top_fraction(self):
+        total = len(self.tree.get_children())
+        return self.tree.yview()[0] * total, total
+
+    def append_page(self):
+        if self.at_end or self.query is None:
+            return
+
+        after = self.pages[-1]['last'] if self.pages else None
+        rows = self._fetch(after, backward=False)
+        if len(rows) < self.page_size:
+            self.at_end = True
+        if not rows:
+            return
+
+        self.pages.append(self._insert(rows, tk.END))
+
+        if len(self.pages) > self.max_pages:
+            top, total = self._top_fraction()
+            dropped = self.pages.popleft()
+            self.tree.delete(*dropped['items'])
+            self.dropped_above += 1
+            # Keep the same rows in view after removing the ones above them
+            remaining = total - len(dropped['items'])
+            self.tree.yview_moveto(max(top - len(dropped['items']), 0) / max(remaining, 1))
+
+    def prepend_page(self):
+        if not self.dropped_above or not self.pages:
+            return
+
+        rows = self._fetch(self.pages[0]['first'], backward=True)
+        self.dropped_above -= 1
+        if not rows:
+            self.dropped_above = 0
+            return
+
+        top, total = self._top_fraction()
+        self.pages.appendleft(self._insert(rows, 0))
+
+        if len(self.pages) > self.max_pages:
+            dropped = self.pages.pop()
+            self.tree.delete(*dropped['items'])
+            self.at_end = False
+
+        remaining = len(self.tree.get_children())
+        self.tree.yview_moveto((top + len(rows)) / max(remaining, 1))
+
+    def on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+
+        if self.loading or self.query is None:
+            return
+
+        # Fetch the next page once the viewport nears either end of the window
+        if float(last) > 0.9 and not self.at_end:
+            self._schedule(self.append_page)
+        elif float(first) < 0.1 and self.dropped_above:
+            self._schedule(self.prepend_page)
+
+    def _schedule(self, loader):
+        self.loading = True
+
+        def run():
+            try:
+                loader()
+            finally:
+                self.loading = False
+
+        self.tree.after_idle(run)
@@ -0,0 +1,178 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from queue import Queue, Empty
+
+
+class TaskCancelled(Exception):
+    """Raised inside a worker when its task has been cancelled"""
+
+
+class Task:
+    """Handle for one unit of background work.
+
+    The worker function receives the task and should borrow connections
+    through task.reader() so a cancel can interrupt a running statement,
+    and may call task.check() between steps of long Python loops.
+    Partial results passed to task.report() reach on_progress on the Tk thread.
+    A background task (an import, export or save) is left running when the
+    user moves to another screen.
+    """
+
+    def __init__(self, fn, on_done=None, on_error=None, timeout=None, on_progress=None, background=False):
+        self.fn = fn
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.progress = Queue()
+        self.timeout = timeout
+        self.background = background
+        self.started = time.monotonic()
+        self.future = None
+        self.cancel_event = threading.Event()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+
+    def report(self, value):
+        """Queue a progress update or partial result for the Tk thread"""
+        self.check()
+        self.progress.put(value)
+
+    def drain_progress(self):
+        while self.on_progress is not None:
+            try:
+                value = self.progress.get_nowait()
+            except Empty:
+                return
+            self.on_progress(value)
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+        # Abort any statement currently running for this task
+        with self.lock:
+            for conn in self.connections:
+                conn.interrupt()
+
+    @contextmanager
+    def reader(self, pool):
+        self.check()
+        with pool.reader() as conn:
+            with self.lock:
+                self.connections.append(conn)
+            try:
+                yield conn
+            finally:
+                with self.lock:
+                    self.connections.remove(conn)
+        self.check()
+
+    def run(self):
+        try:
+            return self.fn(self)
+        except sqlite3.OperationalError:
+            # An interrupted statement surfaces as OperationalError
+            if self.cancelled:
+                raise TaskCancelled()
+            raise
+
+
+class QueryExecutor:
+    """Runs slow work on worker threads and delivers results on the Tk thread.
+
+    Completion is polled with widget.after, so on_done/on_error callbacks
+    always run on the mainloop and may touch widgets. on_busy(True/False) is
+    called when the executor goes from idle to busy and back.
+    """
+
+    def __init__(self, widget, max_workers=2, poll_interval=50, on_busy=None):
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self.on_busy = on_busy
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self.tasks = []
+        self.poll_job = None
+
+    def submit(self, fn, on_done=None, on_error=None, timeout=60, on_progress=None, background=False):
+        """Run fn(task) in the background; returns the Task handle"""
+        task = Task(fn, on_done, on_error, timeout, on_progress, background)
+        task.future = self.pool.submit(task.run)
+
+        if not self.tasks and self.on_busy:
+            self.on_busy(True)
+        self.tasks.append(task)
+
+        if self.poll_job is None:
+            self.poll_job = self.widget.after(self.poll_interval, self.poll)
+        return task
+
+    def poll(self):
+        self.poll_job = None
+        now = time.monotonic()
+
+        for task in list(self.tasks):
+            if task.timeout and not task.future.done() and now - task.started > task.timeout:
+                task.cancel()
+                self.tasks.remove(task)
+                if task.on_error:
+                    task.on_error(TimeoutError(f"Query did not finish within {task.timeout} seconds"))
+                continue
+
+            if task.cancelled:
+                self.tasks.remove(task)
+                continue
+
+            # Deliver partial results before checking for completion, so
+            # on_done always runs after the last on_progress
+            done = task.future.done()
+            task.drain_progress()
+
+            if not done:
+                continue
+
+            self.tasks.remove(task)
+            error = task.future.exception()
+            if isinstance(error, TaskCancelled):
+                continue
+            if error is not None:
+                if task.on_error:
+                    task.on_error(error)
+                else:
+                    print(f"Background task failed: {error}")
+            elif task.on_done:
+                task.on_done(task.future.result())
+
+        if self.tasks:
+            self.poll_job = self.widget.after(self.poll_interval, self.poll)
+        elif self.on_busy:
+            self.on_busy(False)
+
+    def cancel_all(self):
+        """Cancel every pending task; their callbacks will not run"""
+        for task in self.tasks:
+            task.cancel()
+
+    def cancel_queries(self):
+        """Cancel pending read queries; their callbacks will not run.
+
+        Tasks submitted with background=True keep running and still deliver
+        their callbacks.
+        """
+        for task in self.tasks:
+            if not task.background:
+                task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.pool.shutdown(wait=False)
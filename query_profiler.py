@@ -0,0 +1,247 @@
+"""Statement-level SQL profiling.
+
+Every pooled connection is opened with ProfiledConnection, whose cursors
+time execute/executemany and the fetches that follow when the profiler
+is enabled. When it is disabled a statement costs one extra Python call
+and fetches are not intercepted at all. Rows read by iterating a cursor
+are not counted.
+
+Enable it with PROFILER.enable() or by setting ERP_PROFILE_SQL=1 (and
+optionally ERP_PROFILE_THRESHOLD_MS / ERP_PROFILE_EXPLAIN_MS).
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Slowest statements kept for the slow-query table
+TOP_N = 50
+
+# Source files whose frames are skipped when looking for the caller
+_INTERNAL_FILES = {os.path.abspath(__file__)}
+
+
+class QueryRecord:
+    __slots__ = ('sql', 'binds', 'elapsed', 'rows', 'caller', 'started', 'plan')
+
+    def __init__(self, sql, binds, elapsed, rows, caller):
+        self.sql = sql
+        self.binds = binds
+        self.elapsed = elapsed
+        self.rows = rows
+        self.caller = caller
+        self.started = time.time()
+        self.plan = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class QueryProfiler:
+    """Collects timings for statements run through ProfiledCursor.
+
+    Statements slower than threshold_ms are candidates for the slow-query
+    table (the top_n slowest are kept); statements slower than explain_ms
+    also get their EXPLAIN QUERY PLAN captured. Every statement is counted
+    in the per-statement summary regardless of the threshold.
+    """
+
+    def __init__(self, top_n=TOP_N, threshold_ms=0.0, explain_ms=None):
+        self.enabled = False
+        self.top_n = top_n
+        self.threshold = threshold_ms / 1000
+        self.explain_threshold = explain_ms / 1000 if explain_ms is not None else None
+        self.lock = threading.Lock()
+        self.slow = []
+        self.summary = {}
+        self.statements = 0
+
+    def enable(self, threshold_ms=None, explain_ms=None):
+        if threshold_ms is not None:
+            self.threshold = threshold_ms / 1000
+        if explain_ms is not None:
+            self.explain_threshold = explain_ms / 1000
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self.lock:
+            self.slow = []
+            self.summary = {}
+            self.statements = 0
+
+    def caller(self):
+        """file:line function of the first frame outside the database plumbing"""
+        frame = sys._getframe(2)
+        while frame is not None and os.path.abspath(frame.f_code.co_filename) in _INTERNAL_FILES:
+            frame = frame.f_back
+        if frame is None:
+            return "?"
+        return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+    def record(self, sql, binds, elapsed, rows):
+        entry = QueryRecord(sql, binds, elapsed, rows, self.caller())
+        with self.lock:
+            self.statements += 1
+            stats = self.summary.get(sql)
+            if stats is None:
+                # count, total seconds, max seconds, rows
+                self.summary[sql] = stats = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            stats[3] += rows or 0
+
+            if elapsed >= self.threshold:
+                self.slow.append(entry)
+                # Trim occasionally instead of keeping a heap: fetches can still
+                # add time to an entry after it was recorded
+                if len(self.slow) > self.top_n * 4:
+                    self.slow.sort(key=lambda r: r.elapsed, reverse=True)
+                    del self.slow[self.top_n:]
+        return entry
+
+    def add_fetch(self, entry, elapsed, rows):
+        """Fold the time and rows of a fetch into its statement's entry"""
+        with self.lock:
+            entry.elapsed += elapsed
+            entry.rows = (entry.rows or 0) + rows
+            stats = self.summary.get(entry.sql)
+            if stats is not None:
+                stats[1] += elapsed
+                stats[2] = max(stats[2], entry.elapsed)
+                stats[3] += rows
+            # A statement that only becomes slow while fetching still qualifies
+            if entry.elapsed >= self.threshold and entry.elapsed - elapsed < self.threshold:
+                self.slow.append(entry)
+
+    def maybe_explain(self, entry, conn, params):
+        if (self.explain_threshold is None or entry.plan is not None
+                or entry.elapsed < self.explain_threshold):
+            return
+        if not entry.sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            return
+        try:
+            entry.plan = [row[3] for row in sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {entry.sql}",
+                                                                       params)]
+        except sqlite3.Error as e:
+            entry.plan = [f"(plan unavailable: {e})"]
+
+    def top(self, n=None):
+        """The slowest recorded statements, slowest first"""
+        with self.lock:
+            slow = sorted(self.slow, key=lambda r: r.elapsed, reverse=True)
+        return slow[:n or self.top_n]
+
+    def statement_summary(self):
+        """Rows of (sql, count, total seconds, max seconds, rows), by total time"""
+        with self.lock:
+            rows = [(sql, count, total, worst, fetched) for sql, (count, total, worst, fetched) in self.summary.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+PROFILER = QueryProfiler()
+
+if os.environ.get("ERP_PROFILE_SQL"):
+    PROFILER.enable(float(os.environ.get("ERP_PROFILE_THRESHOLD_MS", 0)),
+                    float(os.environ["ERP_PROFILE_EXPLAIN_MS"]) if "ERP_PROFILE_EXPLAIN_MS" in os.environ else None)
+
+
+def _bind_count(parameters):
+    try:
+        return len(parameters)
+    except TypeError:
+        return 0
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that times its statements while the profiler is enabled.
+
+    Only execute/executemany are intercepted. A profiled statement switches
+    the cursor to FetchTimingCursor so its fetches are timed as well; the
+    next unprofiled statement switches it back, so fetches cost nothing
+    extra while profiling is off.
+    """
+
+    profile_entry = None
+    profile_params = ()
+
+    def execute(self, sql, parameters=()):
+        if not PROFILER.enabled:
+            if self.profile_entry is not None:
+                self.profile_entry = None
+                self.__class__ = ProfiledCursor
+            return super().execute(sql, parameters)
+
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+        self.profile_entry = PROFILER.record(sql, _bind_count(parameters), elapsed,
+                                             self.rowcount if self.rowcount >= 0 else None)
+        self.profile_params = parameters
+        self.__class__ = FetchTimingCursor
+        PROFILER.maybe_explain(self.profile_entry, self.connection, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if not PROFILER.enabled:
+            if self.profile_entry is not None:
+                self.profile_entry = None
+                self.__class__ = ProfiledCursor
+            return super().executemany(sql, seq_of_parameters)
+
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        elapsed = time.perf_counter() - started
+        self.profile_entry = PROFILER.record(sql, None, elapsed, self.rowcount if self.rowcount >= 0 else None)
+        self.profile_params = ()
+        self.__class__ = ProfiledCursor
+        return self
+
+
+class FetchTimingCursor(ProfiledCursor):
+    def _fetched(self, started, rows):
+        PROFILER.add_fetch(self.profile_entry, time.perf_counter() - started, rows)
+        PROFILER.maybe_explain(self.profile_entry, self.connection, self.profile_params)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose cursors are ProfiledCursors.
+
+    conn.execute() goes straight to the C implementation while profiling is
+    off, so the common path pays for a single Python call.
+    """
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        if not PROFILER.enabled:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not PROFILER.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,282 @@
+"""Replenishment planning: reorder suggestions and draft purchase orders.
+
+For every product the plan works out
+
+    available      = on hand + open purchase order quantity - open sales order demand
+    daily demand   = monthly forecast (sales_forecasts) / 30.4
+    reorder point  = reorder_level + daily demand * supplier lead time
+
+and, when available falls to the reorder point, suggests ordering up to
+the reorder point plus COVER_DAYS of forecast demand (at least one more
+reorder_level when there is no forecast). Open purchase orders include
+drafts, so planning again after drafting does not order twice.
+
+The plan is one set-based statement over the products to plan, stored in
+replenishment_plan. Triggers on the tables it reads (stock, order lines,
+order status, deliveries, forecasts, lead times) record the products they
+touch in replenishment_dirty, and plan() re-plans only those; the
+migration marks every product, so the first run plans them all.
+
+Usage: python replenishment.py [database] [plan|full|draft]
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+# Days of forecast demand an order covers beyond the reorder point
+COVER_DAYS = 30
+
+# Lead time for products whose supplier has none recorded
+DEFAULT_LEAD_TIME_DAYS = 14
+
+DAYS_PER_MONTH = 30.4
+
+OPEN_PURCHASE_STATUSES = ('Draft', 'Sent', 'Confirmed')
+OPEN_SALES_STATUSES = ('Pending', 'Confirmed', 'Processing')
+
+
+def _quoted(values):
+    return ", ".join(f"'{value}'" for value in values)
+
+
+def _mark(select):
+    # Not INSERT OR IGNORE: trigger bodies take the outer statement's conflict
+    # policy, so under an upsert an OR IGNORE would still fail on a product
+    # that is already marked. select must end in VALUES or a WHERE clause,
+    # which keeps ON CONFLICT from parsing as a join constraint.
+    return f"INSERT INTO replenishment_dirty (product_id) {select} ON CONFLICT DO NOTHING;"
+
+
+def _triggers():
+    """(name, CREATE TRIGGER statement) for every change-tracking trigger"""
+    # table -> (columns whose update changes the plan, statements marking a row's products)
+    sources = {
+        'products': ("current_stock, reorder_level, supplier_id",
+                     lambda row: _mark(f"VALUES ({row}.product_id)")),
+        'purchase_order_items': ("po_id, product_id, quantity, received_quantity, status",
+                                 lambda row: _mark(f"VALUES ({row}.product_id)")),
+        'sales_order_items': ("order_id, product_id, quantity, status",
+                              lambda row: _mark(f"VALUES ({row}.product_id)")),
+        'sales_forecasts': ("product_id, forecast_date, forecast_period, forecasted_quantity",
+                            lambda row: _mark(f"SELECT {row}.product_id WHERE {row}.product_id IS NOT NULL")),
+        'delivery_note_items': ("order_item_id, quantity_delivered",
+                                lambda row: _mark(f"SELECT product_id FROM sales_order_items "
+                                                  f"WHERE order_item_id = {row}.order_item_id")),
+    }
+    triggers = []
+    for table, (columns, mark) in sources.items():
+        triggers += [
+            (f"replenishment_{table}_ai", f"AFTER INSERT ON {table} BEGIN {mark('new')} END"),
+            (f"replenishment_{table}_ad", f"AFTER DELETE ON {table} BEGIN {mark('old')} END"),
+            (f"replenishment_{table}_au",
+             f"AFTER UPDATE OF {columns} ON {table} BEGIN {mark('old')} {mark('new')} END"),
+        ]
+
+    # Changes that reach every line of an order or every product of a supplier
+    triggers += [
+        ("replenishment_purchase_orders_au", "AFTER UPDATE OF status ON purchase_orders "
+         f"BEGIN {_mark('SELECT product_id FROM purchase_order_items WHERE po_id = new.po_id')} END"),
+        ("replenishment_sales_orders_au", "AFTER UPDATE OF status ON sales_orders "
+         f"BEGIN {_mark('SELECT product_id FROM sales_order_items WHERE order_id = new.order_id')} END"),
+        ("replenishment_suppliers_au", "AFTER UPDATE OF lead_time_days ON suppliers "
+         f"BEGIN {_mark('SELECT product_id FROM products WHERE supplier_id = new.supplier_id')} END"),
+    ]
+    return [(name, f"CREATE TRIGGER IF NOT EXISTS {name} {definition}") for name, definition in triggers]
+
+
+def _schema():
+    statements = [
+        '''CREATE TABLE IF NOT EXISTS replenishment_plan (
+            product_id INTEGER PRIMARY KEY,
+            supplier_id INTEGER,
+            on_hand INTEGER NOT NULL,
+            on_order INTEGER NOT NULL,
+            allocated INTEGER NOT NULL, -- open sales order lines not yet delivered
+            daily_demand REAL NOT NULL,
+            lead_time_days INTEGER NOT NULL,
+            reorder_point REAL NOT NULL,
+            suggested_quantity INTEGER NOT NULL,
+            planned_at TEXT NOT NULL
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_replenishment_plan_suggested ON replenishment_plan(supplier_id) "
+        "WHERE suggested_quantity > 0",
+        '''CREATE TABLE IF NOT EXISTS replenishment_dirty (
+            product_id INTEGER PRIMARY KEY
+        )''',
+        # Per-product lookups made by the plan and by the triggers below
+        "CREATE INDEX IF NOT EXISTS idx_purchase_order_items_product ON purchase_order_items(product_id)",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_order_items_po ON purchase_order_items(po_id)",
+        "CREATE INDEX IF NOT EXISTS idx_sales_order_items_product ON sales_order_items(product_id)",
+        "CREATE INDEX IF NOT EXISTS idx_delivery_note_items_order_item ON delivery_note_items(order_item_id)",
+        "CREATE INDEX IF NOT EXISTS idx_products_supplier ON products(supplier_id)",
+        '''CREATE INDEX IF NOT EXISTS idx_sales_forecasts_product
+           ON sales_forecasts(product_id, forecast_period, forecast_date)''',
+    ]
+
+    statements += [sql for _, sql in _triggers()]
+    # The first plan() covers every product
+    statements.append("INSERT OR IGNORE INTO replenishment_dirty (product_id) SELECT product_id FROM products")
+    return statements
+
+
+# Creates the plan tables, indexes and triggers; run by migration 4
+REPLENISHMENT_SCHEMA = _schema()
+
+# Recreates the triggers of databases migrated before they marked products
+# with ON CONFLICT DO NOTHING; run by migration 6
+REPLENISHMENT_TRIGGER_UPGRADE = ([f"DROP TRIGGER IF EXISTS {name}" for name, _ in _triggers()]
+                                 + [sql for _, sql in _triggers()])
+
+# Plans the products in replenishment_dirty as of :today
+PLAN_SQL = f'''
+    INSERT OR REPLACE INTO replenishment_plan (product_id, supplier_id, on_hand, on_order, allocated, daily_demand,
+                                               lead_time_days, reorder_point, suggested_quantity, planned_at)
+    SELECT product_id, supplier_id, on_hand, on_order, allocated, daily_demand, lead_time_days, reorder_point,
+           CASE WHEN on_hand + on_order - allocated <= reorder_point
+                THEN CAST(order_up_to - (on_hand + on_order - allocated) + 0.999999 AS INTEGER)
+                ELSE 0 END,
+           :planned_at
+    FROM (
+        SELECT *, reorder_level + daily_demand * lead_time_days AS reorder_point,
+               reorder_level + daily_demand * lead_time_days + MAX(daily_demand * {COVER_DAYS}, reorder_level, 1)
+                   AS order_up_to
+        FROM (
+            SELECT p.product_id, p.supplier_id,
+                   COALESCE(p.current_stock, 0) AS on_hand,
+                   COALESCE(p.reorder_level, 0) AS reorder_level,
+                   COALESCE(s.lead_time_days, {DEFAULT_LEAD_TIME_DAYS}) AS lead_time_days,
+                   COALESCE((SELECT SUM(MAX(i.quantity - COALESCE(i.received_quantity, 0), 0))
+                             FROM purchase_order_items i JOIN purchase_orders o ON o.po_id = i.po_id
+                             WHERE i.product_id = p.product_id
+                             AND o.status IN ({_quoted(OPEN_PURCHASE_STATUSES)})
+                             AND COALESCE(i.status, '') NOT IN ('Received', 'Cancelled')), 0) AS on_order,
+                   COALESCE((SELECT SUM(MAX(i.quantity - COALESCE((SELECT SUM(d.quantity_delivered)
+                                                                   FROM delivery_note_items d
+                                                                   WHERE d.order_item_id = i.order_item_id), 0), 0))
+                             FROM sales_order_items i JOIN sales_orders o ON o.order_id = i.order_id
+                             WHERE i.product_id = p.product_id
+                             AND o.status IN ({_quoted(OPEN_SALES_STATUSES)})
+                             AND COALESCE(i.status, '') NOT IN ('Delivered', 'Cancelled')), 0) AS allocated,
+                   -- Forecast months from this one to the end of the lead time, else the latest earlier one
+                   COALESCE((SELECT AVG(f.forecasted_quantity) FROM sales_forecasts f
+                             WHERE f.product_id = p.product_id AND f.forecast_period = 'Monthly'
+                             AND f.forecast_date BETWEEN date(:today, 'start of month')
+                             AND date(:today, '+' || COALESCE(s.lead_time_days, {DEFAULT_LEAD_TIME_DAYS}) || ' days')),
+                            (SELECT f.forecasted_quantity FROM sales_forecasts f
+                             WHERE f.product_id = p.product_id AND f.forecast_period = 'Monthly'
+                             AND f.forecast_date < date(:today, 'start of month')
+                             ORDER BY f.forecast_date DESC LIMIT 1), 0) / {DAYS_PER_MONTH} AS daily_demand
+            FROM replenishment_dirty r
+            JOIN products p ON p.product_id = r.product_id
+            LEFT JOIN suppliers s ON s.supplier_id = p.supplier_id
+        )
+    )
+'''
+
+# (supplier_id, product_id, quantity, unit cost, lead time) to order, by supplier
+SUGGESTIONS_SQL = '''
+    SELECT r.supplier_id, r.product_id, r.suggested_quantity, COALESCE(p.cost_price, 0), r.lead_time_days
+    FROM replenishment_plan r JOIN products p ON p.product_id = r.product_id
+    WHERE r.suggested_quantity > 0
+'''
+
+
+def plan(conn, full=False, today=None):
+    """Re-plan the products changed since the last run (every product when
+    full) in the caller's transaction. Returns the number of products planned."""
+    today = (today or date.today()).isoformat()
+    if full:
+        conn.execute("INSERT OR IGNORE INTO replenishment_dirty (product_id) SELECT product_id FROM products")
+    planned = conn.execute(PLAN_SQL, {'today': today, 'planned_at': today}).rowcount
+    # Products that were deleted since they were planned
+    conn.execute('''
+        DELETE FROM replenishment_plan WHERE product_id IN (
+            SELECT r.product_id FROM replenishment_dirty r
+            WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.product_id = r.product_id))
+    ''')
+    conn.execute("DELETE FROM replenishment_dirty")
+    return planned
+
+
+def suggestions(conn, supplier_ids=None):
+    """Suggested orders grouped by supplier: {supplier_id: [(product_id, quantity, unit_cost, lead_time_days)]}.
+
+    Products without a supplier are listed under None.
+    """
+    sql, params = SUGGESTIONS_SQL, []
+    if supplier_ids is not None:
+        supplier_ids = list(supplier_ids)
+        sql += f" AND r.supplier_id IN ({', '.join('?' * len(supplier_ids))})"
+        params = supplier_ids
+    grouped = {}
+    for supplier_id, *line in conn.execute(sql + " ORDER BY r.supplier_id, r.product_id", params):
+        grouped.setdefault(supplier_id, []).append(tuple(line))
+    return grouped
+
+
+def draft_purchase_orders(db, supplier_ids=None, created_by=None, today=None):
+    """Turn the current suggestions into one Draft purchase order per supplier.
+
+    db is a BusinessDatabase. Lines are priced at the product's cost price;
+    tax is left for when the order is confirmed. The drafted products are
+    re-planned straight away, so their suggestions drop to what is still
+    missing. Returns [(po_id, po_number, supplier_id, lines, total)].
+    """
+    today = today or date.today()
+    with db.transaction(immediate=True) as cursor:
+        plan(db.conn, today=today)
+        grouped = suggestions(db.conn, supplier_ids)
+        grouped.pop(None, None)
+        if not grouped:
+            return []
+
+        numbers = db.reserve_document_numbers('purchase_order', len(grouped))
+        drafted = []
+        for po_number, (supplier_id, lines) in zip(numbers, grouped.items()):
+            lead_time = max(lead_time_days for _, _, _, lead_time_days in lines)
+            expected = (today + timedelta(days=lead_time)).isoformat()
+            total = round(sum(quantity * cost for _, quantity, cost, _ in lines), 2)
+            cursor.execute('''
+                INSERT INTO purchase_orders (po_number, supplier_id, issue_date, expected_delivery_date, status,
+                                             total_amount, tax_amount, grand_total, created_by)
+                VALUES (?, ?, ?, ?, 'Draft', ?, 0, ?, ?)
+            ''', (po_number, supplier_id, today.isoformat(), expected, total, total, created_by))
+            po_id = cursor.lastrowid
+            cursor.executemany('''
+                INSERT INTO purchase_order_items (po_id, product_id, quantity, unit_price, line_total, expected_date,
+                                                  received_quantity, status)
+                VALUES (?, ?, ?, ?, ?, ?, 0, 'Pending')
+            ''', [(po_id, product_id, quantity, cost, round(quantity * cost, 2),
+                   (today + timedelta(days=lead_time_days)).isoformat())
+                  for product_id, quantity, cost, lead_time_days in lines])
+            drafted.append((po_id, po_number, supplier_id, len(lines), total))
+
+        plan(db.conn, today=today)
+    db.pool.cache.invalidate('purchase_orders', 'purchase_order_items')
+    return drafted
+
+
+def main(db_name, command="plan"):
+    from ERPSQLiteDB import BusinessDatabase
+
+    db = BusinessDatabase(db_name)
+    started = time.perf_counter()
+    if command == "draft":
+        drafted = draft_purchase_orders(db)
+        for _, po_number, supplier_id, lines, total in drafted:
+            print(f"{po_number}  supplier {supplier_id:<6} {lines:>5} lines  ${total:,.2f}")
+        print(f"Drafted {len(drafted)} purchase orders in {time.perf_counter() - started:.2f}s")
+    else:
+        with db.transaction(immediate=True):
+            planned = plan(db.conn, full=command == "full")
+        grouped = suggestions(db.conn)
+        lines = sum(len(items) for items in grouped.values())
+        print(f"Planned {planned:,} products in {time.perf_counter() - started:.2f}s: "
+              f"{lines:,} to reorder from {len(grouped)} suppliers")
+    db.close()
+
+
+if __name__ == "__main__":
+    from database import DEFAULT_DB_NAME
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_NAME,
+         sys.argv[2] if len(sys.argv) > 2 else "plan")
@@ -0,0 +1,31 @@
+"""Column-at-a-time totals for the report screens.
+
+The sales and aging reports get their rows from the rollups and the
+maintained aging summary, and statements keep running totals as they
+stream; what is left to compute in Python is the totals and ratios shown
+under the sales and aging grids and in API statements. Those are summed a
+column at a time - with NumPy when it is installed, otherwise with the
+built-in sum.
+"""
+from operator import itemgetter
+
+from columnar import numpy
+
+
+def total(values):
+    """Sum of a numeric column"""
+    if numpy is not None:
+        return float(numpy.sum(numpy.asarray(values, dtype='float64')))
+    return sum(values)
+
+
+def ratio(part, whole):
+    return part / whole if whole else 0.0
+
+
+def row_totals(rows, *positions):
+    """Sums of the given positions over a list of row tuples"""
+    if numpy is None:
+        return tuple(sum(map(itemgetter(position), rows)) for position in positions)
+    columns = list(zip(*rows)) if rows else []
+    return tuple(total(columns[position]) if columns else 0 for position in positions)
@@ -0,0 +1,61 @@
+from ar_aging import ARAging
+from sales_rollups import monthly_sales
+
+SALES_REPORT_HEADERS = ("Month", "Invoices", "Total Sales", "Amount Paid")
+
+
+AGING_REPORT_HEADERS = ("Client", "Over 90", "61-90 Days", "31-60 Days", "Current", "Total")
+
+INVOICE_LEDGER_HEADERS = ("Invoice No", "Invoice Date", "Due Date", "Order No", "Client",
+                          "Subtotal", "Tax", "Total", "Paid", "Balance", "Status")
+
+INVOICE_LEDGER_SQL = """
+    SELECT i.invoice_number, i.invoice_date, i.due_date, o.order_number, c.company_name,
+           i.subtotal, i.tax_amount, i.grand_total, i.amount_paid, i.balance_due, i.status
+    FROM invoices i
+    LEFT JOIN sales_orders o ON i.order_id = o.order_id
+    LEFT JOIN clients c ON o.client_id = c.client_id
+    ORDER BY i.invoice_id
+"""
+
+RECEIPT_LEDGER_HEADERS = ("Receipt No", "Receipt Date", "Invoice No", "Client", "Type",
+                          "Payment Method", "Amount", "Reference No")
+
+RECEIPT_LEDGER_SQL = """
+    SELECT r.receipt_number, r.receipt_date, i.invoice_number, c.company_name, r.receipt_type,
+           r.payment_method, r.amount, r.reference_number
+    FROM receipts r
+    LEFT JOIN invoices i ON r.invoice_id = i.invoice_id
+    LEFT JOIN sales_orders o ON i.order_id = o.order_id
+    LEFT JOIN clients c ON o.client_id = c.client_id
+    ORDER BY r.receipt_id
+"""
+
+
+def sales_report(conn):
+    """Monthly invoiced and paid totals for the last six months, from the sales rollups"""
+    start = conn.execute("SELECT date('now', '-6 months')").fetchone()[0]
+    rows = monthly_sales(conn, start, '9999-12-31')
+    return [(month, invoices, total or 0, paid) for month, invoices, _, total, _, _, paid in reversed(rows)]
+
+
+def aging_report(conn):
+    """Receivables per client and aging bucket, from the maintained summary"""
+    return ARAging.report_rows(conn)
+
+
+def invoice_ledger(conn):
+    return conn.execute(INVOICE_LEDGER_SQL)
+
+
+def receipt_ledger(conn):
+    return conn.execute(RECEIPT_LEDGER_SQL)
+
+
+# Report name -> (title, column headers, function returning rows for a connection)
+REPORTS = {
+    'sales_report': ("Sales Report", SALES_REPORT_HEADERS, sales_report),
+    'aging_report': ("Aging Report", AGING_REPORT_HEADERS, aging_report),
+    'invoice_ledger': ("Invoice Ledger", INVOICE_LEDGER_HEADERS, invoice_ledger),
+    'receipt_ledger': ("Receipt Ledger", RECEIPT_LEDGER_HEADERS, receipt_ledger),
+}
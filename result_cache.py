@@ -0,0 +1,190 @@
+"""In-process cache for small, frequently repeated read queries.
+
+Results are keyed by SQL text and parameters and remember the tables they
+were read from. Code that writes to a table calls invalidate(table) so
+every cached result depending on it is dropped; entries also expire after
+a TTL, which bounds staleness for writes that bypass invalidation (other
+processes, ad-hoc scripts).
+
+Only use it for lookups whose results are small and read far more often
+than the underlying tables change - client and product pick lists, stock
+availability - not for reports.
+"""
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_TTL = 60.0
+
+TABLE_NAME = re.compile(r'\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)', re.IGNORECASE)
+
+
+def tables_in(sql):
+    """Tables named after FROM/JOIN in sql"""
+    return frozenset(name.lower() for name in TABLE_NAME.findall(sql))
+
+
+def result_size(rows):
+    """Approximate memory held by a tuple of row tuples"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class CacheEntry:
+    __slots__ = ('rows', 'tables', 'expires', 'size')
+
+    def __init__(self, rows, tables, expires, size):
+        self.rows = rows
+        self.tables = tables
+        self.expires = expires
+        self.size = size
+
+
+class ResultCache:
+    """LRU + TTL cache of query results with table-level invalidation.
+
+    in_transaction, if given, reports whether the writer connection has an
+    open transaction. An invalidation made inside a transaction keeps its
+    tables uncacheable until that transaction ends, so readers cannot cache
+    the pre-commit state after the entries were dropped.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL,
+                 in_transaction=None):
+        self.enabled = True
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.in_transaction = in_transaction or (lambda: False)
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.by_table = {}
+        self.versions = {}
+        self.pending = set()
+        self.generation = 0
+        self.bytes = 0
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'uncached': 0,
+        }
+
+    def fetchall(self, conn, sql, params=(), tables=None, ttl=None):
+        """conn.execute(sql, params).fetchall() through the cache.
+
+        tables defaults to the tables named in sql. The result is a tuple of
+        rows shared between callers, so it must not be modified.
+        """
+        key = (sql, tuple(params))
+        tables = tables_in(sql) if tables is None else frozenset(table.lower() for table in tables)
+        return self.get_or_load(key, tables,
+                                lambda: tuple(conn.execute(sql, params).fetchall()), ttl)
+
+    def get_or_load(self, key, tables, loader, ttl=None):
+        """Return the cached value for key, or call loader() and cache its result"""
+        if not self.enabled:
+            return loader()
+
+        now = time.monotonic()
+        with self.lock:
+            self._flush_pending()
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry.expires > now:
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return entry.rows
+                self._remove(key)
+                self.counters['expired'] += 1
+            self.counters['misses'] += 1
+            generation = self.generation
+            versions = [self.versions.get(table, 0) for table in tables]
+
+        rows = loader()
+
+        with self.lock:
+            # A write to one of the tables while loading makes the result suspect
+            if (self.pending.intersection(tables) or generation != self.generation
+                    or versions != [self.versions.get(table, 0) for table in tables]):
+                self.counters['uncached'] += 1
+                return rows
+            self._store(key, rows, tables, now + (self.ttl if ttl is None else ttl))
+        return rows
+
+    def _flush_pending(self):
+        if self.pending and not self.in_transaction():
+            for table in self.pending:
+                self.versions[table] = self.versions.get(table, 0) + 1
+            self.pending.clear()
+
+    def _store(self, key, rows, tables, expires):
+        if key in self.entries:
+            self._remove(key)
+        size = result_size(rows)
+        if size > self.max_bytes:
+            self.counters['uncached'] += 1
+            return
+        self.entries[key] = CacheEntry(rows, tables, expires, size)
+        self.bytes += size
+        for table in tables:
+            self.by_table.setdefault(table, set()).add(key)
+
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.counters['evictions'] += 1
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.bytes -= entry.size
+        for table in entry.tables:
+            keys = self.by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_table[table]
+
+    def invalidate(self, *tables):
+        """Drop every cached result read from any of tables.
+
+        Call it after writing to those tables, either inside the write
+        transaction or after it has committed.
+        """
+        with self.lock:
+            for table in tables:
+                table = table.lower()
+                for key in list(self.by_table.get(table, ())):
+                    self._remove(key)
+                    self.counters['invalidations'] += 1
+                if self.in_transaction():
+                    self.pending.add(table)
+                else:
+                    self.versions[table] = self.versions.get(table, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.by_table.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters, size and hit rate"""
+        with self.lock:
+            snapshot = dict(self.counters)
+            snapshot['entries'] = len(self.entries)
+            snapshot['bytes'] = self.bytes
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        return snapshot
@@ -0,0 +1,357 @@
+"""Daily and monthly sales rollups per client and per product category.
+
+sales_daily / sales_monthly hold invoice counts and totals per client, and
+category_sales_daily / category_sales_monthly the invoiced order lines per
+product category. Triggers on invoices and sales_order_items keep all four
+current. A date range is answered from the monthly rows for the months it
+covers completely plus the daily rows of the partial months at either end,
+so a query reads a few hundred rows however many invoices the range spans.
+
+The figures follow get_sales_statistics: every invoice with an invoice date
+counts, whatever its status, under the client of its sales order. Order
+lines count under the invoice date and the category their product had when
+they were posted; rebuild() restates everything from the raw tables.
+
+Usage: python sales_rollups.py [database] [check|rebuild]
+"""
+import calendar
+import sys
+import time
+from datetime import date, timedelta
+
+ROLLUP_TABLES = ('sales_daily', 'sales_monthly', 'category_sales_daily', 'category_sales_monthly')
+
+UNCATEGORIZED = 'Uncategorized'
+
+# Rollup table -> (key column, expression for the key of an invoice date)
+PERIODS = {
+    'daily': ('sale_date', '{date}'),
+    'monthly': ('month', "strftime('%Y-%m', {date})"),
+}
+
+CLIENT_COLUMNS = "invoice_count, priced_count, total, paid, outstanding"
+CATEGORY_COLUMNS = "line_count, quantity, revenue"
+
+# Adds ({sign} empty) or removes ({sign} '-') one invoice for its client
+CLIENT_CHANGE = '''
+    INSERT INTO sales_{period} ({key}, client_id, invoice_count, priced_count, total, paid, outstanding)
+    SELECT {key_expr}, o.client_id, {sign}1, {sign}({row}.grand_total IS NOT NULL),
+           {sign}COALESCE({row}.grand_total, 0), {sign}COALESCE({row}.amount_paid, 0),
+           {sign}COALESCE({row}.balance_due, 0)
+    FROM sales_orders o WHERE o.order_id = {row}.order_id
+    ON CONFLICT ({key}, client_id) DO UPDATE SET
+        invoice_count = invoice_count + excluded.invoice_count,
+        priced_count = priced_count + excluded.priced_count,
+        total = total + excluded.total,
+        paid = paid + excluded.paid,
+        outstanding = outstanding + excluded.outstanding;
+'''
+
+# Adds or removes all lines of an invoice's order, dated by the invoice
+CATEGORY_INVOICE_CHANGE = '''
+    INSERT INTO category_sales_{period} ({key}, category, line_count, quantity, revenue)
+    SELECT {key_expr}, COALESCE(p.category, '{uncategorized}'), {sign}COUNT(*), {sign}SUM(i.quantity),
+           {sign}SUM(COALESCE(i.line_total, 0))
+    FROM sales_order_items i LEFT JOIN products p ON p.product_id = i.product_id
+    WHERE i.order_id = {row}.order_id
+    GROUP BY 2
+    ON CONFLICT ({key}, category) DO UPDATE SET
+        line_count = line_count + excluded.line_count,
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue;
+'''
+
+# Adds or removes one order line under every invoice of its order
+CATEGORY_LINE_CHANGE = '''
+    INSERT INTO category_sales_{period} ({key}, category, line_count, quantity, revenue)
+    SELECT {key_expr}, COALESCE((SELECT category FROM products WHERE product_id = {row}.product_id),
+                                '{uncategorized}'),
+           {sign}1, {sign}{row}.quantity, {sign}COALESCE({row}.line_total, 0)
+    FROM invoices inv WHERE inv.order_id = {row}.order_id AND inv.invoice_date IS NOT NULL
+    ON CONFLICT ({key}, category) DO UPDATE SET
+        line_count = line_count + excluded.line_count,
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue;
+'''
+
+
+def _changes(template, row, sign, date_expr):
+    """template applied to the daily and the monthly table"""
+    return "".join(template.format(period=period, key=key, key_expr=key_expr.format(date=date_expr),
+                                   row=row, sign=sign, uncategorized=UNCATEGORIZED)
+                   for period, (key, key_expr) in PERIODS.items())
+
+
+def _invoice_changes(row, sign, category=True):
+    body = _changes(CLIENT_CHANGE, row, sign, f"{row}.invoice_date")
+    if category:
+        body += _changes(CATEGORY_INVOICE_CHANGE, row, sign, f"{row}.invoice_date")
+    return body
+
+
+def _line_changes(row, sign):
+    return _changes(CATEGORY_LINE_CHANGE, row, sign, "inv.invoice_date")
+
+
+def _schema():
+    statements = []
+    for period, (key, _) in PERIODS.items():
+        statements.append(f'''
+        CREATE TABLE IF NOT EXISTS sales_{period} (
+            {key} TEXT NOT NULL,
+            client_id INTEGER NOT NULL,
+            invoice_count INTEGER NOT NULL DEFAULT 0,
+            priced_count INTEGER NOT NULL DEFAULT 0, -- invoices with a grand_total, for averages
+            total REAL NOT NULL DEFAULT 0,
+            paid REAL NOT NULL DEFAULT 0,
+            outstanding REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY ({key}, client_id)
+        ) WITHOUT ROWID
+        ''')
+        statements.append(f'''
+        CREATE TABLE IF NOT EXISTS category_sales_{period} (
+            {key} TEXT NOT NULL,
+            category TEXT NOT NULL,
+            line_count INTEGER NOT NULL DEFAULT 0,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY ({key}, category)
+        ) WITHOUT ROWID
+        ''')
+
+    dated_new = "new.invoice_date IS NOT NULL"
+    dated_old = "old.invoice_date IS NOT NULL"
+    statements += [
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_ai AFTER INSERT ON invoices WHEN {dated_new} BEGIN
+            {_invoice_changes("new", "")}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_ad AFTER DELETE ON invoices WHEN {dated_old} BEGIN
+            {_invoice_changes("old", "-")}
+        END''',
+        # Payments only touch the client figures; a new date or order moves the lines too
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_au_old
+            AFTER UPDATE OF grand_total, amount_paid, balance_due ON invoices
+            WHEN {dated_old} AND new.invoice_date IS old.invoice_date AND new.order_id IS old.order_id BEGIN
+            {_invoice_changes("old", "-", category=False)}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_au_new
+            AFTER UPDATE OF grand_total, amount_paid, balance_due ON invoices
+            WHEN {dated_new} AND new.invoice_date IS old.invoice_date AND new.order_id IS old.order_id BEGIN
+            {_invoice_changes("new", "", category=False)}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_move_old AFTER UPDATE OF invoice_date, order_id ON invoices
+            WHEN {dated_old} AND (new.invoice_date IS NOT old.invoice_date OR new.order_id IS NOT old.order_id) BEGIN
+            {_invoice_changes("old", "-")}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_move_new AFTER UPDATE OF invoice_date, order_id ON invoices
+            WHEN {dated_new} AND (new.invoice_date IS NOT old.invoice_date OR new.order_id IS NOT old.order_id) BEGIN
+            {_invoice_changes("new", "")}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_line_ai AFTER INSERT ON sales_order_items BEGIN
+            {_line_changes("new", "")}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_line_ad AFTER DELETE ON sales_order_items BEGIN
+            {_line_changes("old", "-")}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS sales_rollup_line_au
+            AFTER UPDATE OF order_id, product_id, quantity, line_total ON sales_order_items BEGIN
+            {_line_changes("old", "-")}
+            {_line_changes("new", "")}
+        END''',
+    ]
+    return statements
+
+
+def _rebuild_statements():
+    statements = [f"DELETE FROM {table}" for table in ROLLUP_TABLES]
+    statements += [
+        f'''INSERT INTO sales_daily (sale_date, client_id, {CLIENT_COLUMNS})
+            SELECT i.invoice_date, o.client_id, COUNT(*), COUNT(i.grand_total), SUM(COALESCE(i.grand_total, 0)),
+                   SUM(COALESCE(i.amount_paid, 0)), SUM(COALESCE(i.balance_due, 0))
+            FROM invoices i JOIN sales_orders o ON o.order_id = i.order_id
+            WHERE i.invoice_date IS NOT NULL
+            GROUP BY 1, 2''',
+        f'''INSERT INTO sales_monthly (month, client_id, {CLIENT_COLUMNS})
+            SELECT strftime('%Y-%m', sale_date), client_id, SUM(invoice_count), SUM(priced_count), SUM(total),
+                   SUM(paid), SUM(outstanding)
+            FROM sales_daily
+            GROUP BY 1, 2''',
+        f'''INSERT INTO category_sales_daily (sale_date, category, {CATEGORY_COLUMNS})
+            SELECT inv.invoice_date, COALESCE(p.category, '{UNCATEGORIZED}'), COUNT(*), SUM(i.quantity),
+                   SUM(COALESCE(i.line_total, 0))
+            FROM invoices inv
+            JOIN sales_order_items i ON i.order_id = inv.order_id
+            LEFT JOIN products p ON p.product_id = i.product_id
+            WHERE inv.invoice_date IS NOT NULL
+            GROUP BY 1, 2''',
+        f'''INSERT INTO category_sales_monthly (month, category, {CATEGORY_COLUMNS})
+            SELECT strftime('%Y-%m', sale_date), category, SUM(line_count), SUM(quantity), SUM(revenue)
+            FROM category_sales_daily
+            GROUP BY 1, 2''',
+    ]
+    return statements
+
+
+# Creates the tables and triggers; run by migration 2
+ROLLUP_SCHEMA = _schema()
+
+# Restates every rollup from invoices and order lines
+ROLLUP_REBUILD = _rebuild_statements()
+
+
+def rebuild(conn):
+    """Recompute all rollups from the raw tables in the caller's transaction"""
+    for sql in ROLLUP_REBUILD:
+        conn.execute(sql)
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def _month_start(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def split_range(start_date, end_date):
+    """Split [start_date, end_date] into (head, months, tail).
+
+    months is the (first, last) 'YYYY-MM' pair of the months lying wholly
+    inside the range; head and tail are the inclusive date ranges before and
+    after them. Any part may be None. Dates that are not plain ISO dates
+    are answered entirely from the daily rows.
+    """
+    try:
+        first = date.fromisoformat(start_date)
+        last = date.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        return (start_date, end_date), None, None
+    if first > last:
+        return None, None, None
+
+    first_month = _month_index(first) + (first.day != 1)
+    last_month = _month_index(last) - (last.day != calendar.monthrange(last.year, last.month)[1])
+    if first_month > last_month:
+        return (start_date, end_date), None, None
+
+    months = (_month_start(first_month).strftime('%Y-%m'), _month_start(last_month).strftime('%Y-%m'))
+    head = tail = None
+    if first.day != 1:
+        head = (start_date, (_month_start(first_month) - timedelta(days=1)).isoformat())
+    if last_month < _month_index(last):
+        tail = (_month_start(last_month + 1).isoformat(), end_date)
+    return head, months, tail
+
+
+def rollup_rows(start_date, end_date, table, columns):
+    """SQL and parameters selecting (month, columns) from table's rollups for the range"""
+    head, months, tail = split_range(start_date, end_date)
+    parts, params = [], []
+    if months:
+        parts.append(f"SELECT month, {columns} FROM {table}_monthly WHERE month BETWEEN ? AND ?")
+        params += months
+    for days in (head, tail):
+        if days:
+            parts.append(f"SELECT strftime('%Y-%m', sale_date) AS month, {columns} FROM {table}_daily "
+                         f"WHERE sale_date BETWEEN ? AND ?")
+            params += days
+    if not parts:
+        parts.append(f"SELECT NULL AS month, {columns} FROM {table}_daily WHERE 0")
+    return " UNION ALL ".join(parts), params
+
+
+def monthly_sales_sql(start_date, end_date):
+    parts, params = rollup_rows(start_date, end_date, "sales", f"client_id, {CLIENT_COLUMNS}")
+    return f'''
+        SELECT month,
+               SUM(invoice_count),
+               COUNT(DISTINCT CASE WHEN invoice_count > 0 THEN client_id END),
+               CASE WHEN SUM(priced_count) > 0 THEN SUM(total) END,
+               SUM(total) / NULLIF(SUM(priced_count), 0),
+               SUM(outstanding),
+               SUM(paid)
+        FROM ({parts})
+        GROUP BY month
+        HAVING SUM(invoice_count) > 0
+        ORDER BY month
+    ''', params
+
+
+def category_sales_sql(start_date, end_date):
+    parts, params = rollup_rows(start_date, end_date, "category_sales", f"category, {CATEGORY_COLUMNS}")
+    return f'''
+        SELECT month, category, SUM(line_count), SUM(quantity), SUM(revenue)
+        FROM ({parts})
+        GROUP BY month, category
+        HAVING SUM(line_count) > 0
+        ORDER BY month, 5 DESC
+    ''', params
+
+
+def monthly_sales(conn, start_date, end_date):
+    """Rows of (month, invoice_count, client_count, total_sales, avg_invoice_amount,
+    outstanding_amount, total_paid) for invoices dated in the range"""
+    return conn.execute(*monthly_sales_sql(start_date, end_date)).fetchall()
+
+
+def category_sales(conn, start_date, end_date):
+    """Rows of (month, category, line_count, quantity, revenue) for invoices dated in the range"""
+    return conn.execute(*category_sales_sql(start_date, end_date)).fetchall()
+
+
+def check(conn, tolerance=0.005):
+    """Compare the stored rollups with a recomputation; returns the differing rows.
+
+    Each difference is (table, key, stored, recomputed). The recomputation
+    runs inside a savepoint that is rolled back, so nothing is changed.
+    """
+    def snapshot():
+        tables = {}
+        for table in ROLLUP_TABLES:
+            rows = conn.execute(f"SELECT * FROM {table}").fetchall()
+            # Rows reduced to zero by deletes are equivalent to missing rows
+            tables[table] = {row[:2]: row[2:] for row in rows if row[2]}
+        return tables
+
+    stored = snapshot()
+    conn.execute("SAVEPOINT rollup_check")
+    try:
+        rebuild(conn)
+        actual = snapshot()
+    finally:
+        conn.execute("ROLLBACK TO rollup_check")
+        conn.execute("RELEASE rollup_check")
+
+    drift = []
+    for table in ROLLUP_TABLES:
+        for key in stored[table].keys() | actual[table].keys():
+            old, new = stored[table].get(key), actual[table].get(key)
+            if old is None or new is None or any(abs(a - b) > tolerance for a, b in zip(old, new)):
+                drift.append((table, key, old, new))
+    return drift
+
+
+def main(db_name, command="check"):
+    import sqlite3
+
+    conn = sqlite3.connect(db_name)
+    started = time.perf_counter()
+    if command == "rebuild":
+        with conn:
+            rebuild(conn)
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ROLLUP_TABLES}
+        print(f"Rebuilt sales rollups in {time.perf_counter() - started:.2f}s: "
+              + ", ".join(f"{table} {count:,}" for table, count in counts.items()))
+    else:
+        drift = check(conn)
+        for table, key, stored, actual in drift[:50]:
+            print(f"{table} {key}: stored {stored}, actual {actual}")
+        print(f"{len(drift)} rollup rows differ ({time.perf_counter() - started:.2f}s)"
+              + ("; run with 'rebuild' to repair" if drift else ""))
+    conn.close()
+
+
+if __name__ == "__main__":
+    from database import DEFAULT_DB_NAME
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_NAME,
+         sys.argv[2] if len(sys.argv) > 2 else "check")
@@ -0,0 +1,174 @@
+import re
+import sqlite3
+
+# Candidate columns to index per table; only the ones present in the schema are used
+SEARCH_COLUMNS = {
+    'clients': ['company_name', 'contact_person', 'email', 'phone'],
+    'suppliers': ['company_name', 'contact_person', 'email', 'phone'],
+    'products': ['sku', 'name', 'description', 'category'],
+}
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_available(conn):
+    """Check whether this SQLite build was compiled with FTS5"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def indexed_columns(conn, table):
+    existing = set(table_columns(conn, table))
+    return [col for col in SEARCH_COLUMNS[table] if col in existing]
+
+
+def update_trigger_sql(table, columns):
+    """Trigger that re-indexes a row when one of its indexed columns is written"""
+    fts = f"{table}_fts"
+    col_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{col}" for col in columns)
+    old_values = ", ".join(f"old.{col}" for col in columns)
+    return f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col_list} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_values});
+        END
+        '''
+
+
+def install_search_indexes(conn):
+    """Create FTS5 shadow indexes and the triggers that keep them in sync.
+
+    Each table gets an external-content ``<table>_fts`` index, so the text
+    itself is stored only once. The update trigger fires only when an indexed
+    column is written, so stock and price updates never touch the index.
+    Safe to call repeatedly; returns the list of tables that were indexed.
+    """
+    if not fts5_available(conn):
+        return []
+
+    installed = []
+    for table in SEARCH_COLUMNS:
+        columns = indexed_columns(conn, table)
+        if not columns:
+            continue
+
+        fts = f"{table}_fts"
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                              (fts,)).fetchone()
+
+        col_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{col}" for col in columns)
+        old_values = ", ".join(f"old.{col}" for col in columns)
+
+        conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {col_list},
+            content='{table}',
+            prefix='2 3',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''')
+
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_values});
+        END
+        ''')
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_values});
+        END
+        ''')
+        conn.execute(update_trigger_sql(table, columns))
+
+        # Index rows that existed before the index was created
+        if not exists:
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+        installed.append(table)
+
+    return installed
+
+
+def match_sql(table, columns="*"):
+    """Ranked FTS5 lookup of table; parameters are (match query, limit)"""
+    prefixed = ", ".join(f"t.{col.strip()}" for col in columns.split(",")) if columns != "*" else "t.*"
+    return f'''
+        SELECT {prefixed}
+        FROM {table}_fts f
+        JOIN {table} t ON t.rowid = f.rowid
+        WHERE {table}_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ?
+    '''
+
+
+def narrow_update_triggers(conn):
+    """Replace update triggers that fire on every update of an indexed table
+    with ones limited to the indexed columns; run by migration 9"""
+    for table in SEARCH_COLUMNS:
+        fts = f"{table}_fts"
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)).fetchone():
+            conn.execute(f"DROP TRIGGER IF EXISTS {fts}_au")
+            conn.execute(update_trigger_sql(table, table_columns(conn, fts)))
+
+
+def build_match_query(term):
+    """Turn free text into an FTS5 prefix query, e.g. 'abc co' -> '"abc"* "co"*'"""
+    tokens = TOKEN_PATTERN.findall(term)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+class SearchIndex:
+    """Ranked prefix search over clients, suppliers and products.
+
+    Uses the FTS5 shadow index when it exists and falls back to a LIKE scan
+    when FTS5 is unavailable or the index has not been installed.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.has_index = {}
+
+    def _index_exists(self, conn, table):
+        if table not in self.has_index:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                               (f"{table}_fts",)).fetchone()
+            self.has_index[table] = row is not None
+        return self.has_index[table]
+
+    def search(self, table, term, columns="*", order_by=None, limit=200):
+        """Return rows of table matching term, best matches first"""
+        term = term.strip()
+        with self.pool.reader() as conn:
+            match = build_match_query(term)
+            if match and self._index_exists(conn, table):
+                return conn.execute(match_sql(table, columns), (match, limit)).fetchall()
+
+            return self.like_search(conn, table, term, columns, order_by, limit)
+
+    def like_search(self, conn, table, term, columns="*", order_by=None, limit=200):
+        """Substring search with LIKE, used when no FTS5 index is available"""
+        query = f"SELECT {columns} FROM {table}"
+        params = []
+
+        if term:
+            search_cols = indexed_columns(conn, table)
+            query += " WHERE " + " OR ".join(f"{col} LIKE ?" for col in search_cols)
+            params = [f"%{term}%"] * len(search_cols)
+
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        query += " LIMIT ?"
+        params.append(limit)
+
+        return conn.execute(query, params).fetchall()
@@ -0,0 +1,142 @@
+import os
+from datetime import date
+
+# Rows buffered before a chunk of text is handed to the caller
+CHUNK_ROWS = 500
+
+# A client's invoices dated within a period: (client_id, from, to)
+STATEMENT_INVOICES_SQL = """
+    SELECT i.invoice_number, i.invoice_date, i.due_date,
+           COALESCE(i.grand_total, 0), COALESCE(i.amount_paid, 0), COALESCE(i.balance_due, 0)
+    FROM invoices i
+    JOIN sales_orders o ON i.order_id = o.order_id
+    WHERE o.client_id = ?
+    AND i.invoice_date BETWEEN ? AND ?
+    ORDER BY i.invoice_date
+"""
+
+# Receipts against a client's invoices within a period: (client_id, from, to)
+STATEMENT_RECEIPTS_SQL = """
+    SELECT r.receipt_date, r.amount, r.payment_method, i.invoice_number
+    FROM receipts r
+    JOIN invoices i ON r.invoice_id = i.invoice_id
+    JOIN sales_orders o ON i.order_id = o.order_id
+    WHERE o.client_id = ?
+    AND r.receipt_date BETWEEN ? AND ?
+    ORDER BY r.receipt_date
+"""
+
+
+def _rows(conn, query, params, chunk_rows):
+    """Iterate a query with fetchmany so the result set is never held in memory"""
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        yield from rows
+
+
+def render_statement(conn, client_id, from_date, to_date, today=None, chunk_rows=CHUNK_ROWS):
+    """Yield a client's statement of account as successive chunks of text.
+
+    Invoices and receipts are streamed from their cursors and running
+    totals are kept in a single pass, so memory use does not grow with the
+    number of documents in the period.
+    """
+    today = today or date.today()
+    period = (from_date.strftime("%Y-%m-%d"), to_date.strftime("%Y-%m-%d"))
+
+    client_info = conn.execute("SELECT company_name, address, city, country FROM clients WHERE client_id = ?",
+                               (client_id,)).fetchone()
+    if client_info is None:
+        raise ValueError(f"Client {client_id} not found")
+
+    yield f"""{'=' * 60}
+{'STATEMENT OF ACCOUNT':^60}
+{'=' * 60}
+
+Client: {client_info[0]}
+Address: {client_info[1] or ''}
+{client_info[2] or ''}, {client_info[3] or ''}
+
+Period: {period[0]} to {period[1]}
+Statement Date: {today.strftime('%Y-%m-%d')}
+
+{'=' * 60}
+{'INVOICES':^60}
+{'=' * 60}
+{'Invoice No':<15} {'Date':<12} {'Due Date':<12} {'Amount':>10} {'Paid':>10} {'Balance':>10}
+{'-' * 60}
+"""
+
+    total_invoiced = 0
+    total_paid = 0
+    total_balance = 0
+    lines = []
+
+    invoices = _rows(conn, STATEMENT_INVOICES_SQL, (client_id, *period), chunk_rows)
+
+    for number, invoice_date, due_date, amount, paid, balance in invoices:
+        lines.append(f"{number:<15} {invoice_date or '':<12} {due_date or '':<12} "
+                     f"${amount:>9,.2f} ${paid:>9,.2f} ${balance:>9,.2f}\n")
+        total_invoiced += amount
+        total_paid += paid
+        total_balance += balance
+
+        if len(lines) >= chunk_rows:
+            yield "".join(lines)
+            lines = []
+
+    lines.append(f"{'-' * 60}\n")
+    lines.append(f"{'TOTALS':<39} ${total_invoiced:>9,.2f} ${total_paid:>9,.2f} ${total_balance:>9,.2f}\n")
+    lines.append(f"""
+{'=' * 60}
+{'PAYMENT HISTORY':^60}
+{'=' * 60}
+{'Date':<12} {'Invoice':<15} {'Amount':>15} {'Method':<15}
+{'-' * 60}
+""")
+    yield "".join(lines)
+    lines = []
+
+    receipts = _rows(conn, STATEMENT_RECEIPTS_SQL, (client_id, *period), chunk_rows)
+
+    for receipt_date, amount, method, invoice_number in receipts:
+        lines.append(f"{receipt_date:<12} {invoice_number:<15} ${amount:>14,.2f} {method or '':<15}\n")
+
+        if len(lines) >= chunk_rows:
+            yield "".join(lines)
+            lines = []
+
+    lines.append(f"""
+{'=' * 60}
+SUMMARY:
+Total Invoiced: ${total_invoiced:,.2f}
+Total Paid: ${total_paid:,.2f}
+Outstanding Balance: ${total_balance:,.2f}
+{'=' * 60}
+
+Please make payments to:
+Account Name: Your Company Name
+Bank: Your Bank Name
+Account No: 123-456-789
+Swift Code: ABCD1234
+
+For inquiries, please contact:
+Phone: +1-234-567-8900
+Email: accounting@yourcompany.com
+""")
+    yield "".join(lines)
+
+
+def write_statement(conn, path, client_id, from_date, to_date, today=None):
+    """Write a statement straight to a text file, chunk by chunk; a failed
+    or cancelled write removes the partial file"""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk in render_statement(conn, client_id, from_date, to_date, today):
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
@@ -0,0 +1,199 @@
+"""Month-end stock checkpoints for point-in-time stock queries.
+
+products.current_stock only holds today's figure and inventory_transactions
+is an unbounded ledger, so the stock of a product on a past date used to
+mean summing its whole history. stock_checkpoints holds, for every product
+and month end in which it moved, the sum of its ledger up to and including
+that day. Stock on any date is then the nearest checkpoint at or before it
+plus the ledger tail after the checkpoint - at most about a month of rows,
+read through the (product_id, transaction_date) index.
+
+Triggers on inventory_transactions keep every stored checkpoint exact when
+rows are inserted, changed or deleted, back-dated ones included. New month
+ends are added by checkpoint(), which BusinessDatabase runs on open; until
+it runs a lookup is still exact, only its ledger tail is longer.
+
+Stock the ledger does not explain (opening balances keyed onto the product)
+counts from the start: stock on a date is current_stock less every movement
+dated after it.
+
+Dates are UTC throughout, like the ledger's CURRENT_TIMESTAMP, so a
+movement always falls in the checkpoint of the month it is dated in.
+
+Usage: python stock_checkpoints.py [database] [check|rebuild]
+"""
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+# Ledger rows dated on or before a checkpoint day are included in it
+CHECKPOINT_CHANGE = '''
+    UPDATE stock_checkpoints SET quantity = quantity {sign} {row}.quantity_change
+    WHERE product_id = {row}.product_id AND checkpoint_date >= substr({row}.transaction_date, 1, 10);
+'''
+
+CHECKPOINT_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS stock_checkpoints (
+        product_id INTEGER NOT NULL,
+        checkpoint_date TEXT NOT NULL, -- last day of a month
+        quantity INTEGER NOT NULL, -- ledger total through checkpoint_date
+        PRIMARY KEY (product_id, checkpoint_date)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS stock_checkpoint_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        through TEXT NOT NULL -- last month end checkpointed
+    )''',
+    # A product's ledger by date; replaces the product-only index it starts with
+    '''CREATE INDEX IF NOT EXISTS idx_inventory_transactions_product_date
+       ON inventory_transactions(product_id, transaction_date, quantity_change)''',
+    "DROP INDEX IF EXISTS idx_inventory_transactions_product",
+    f'''CREATE TRIGGER IF NOT EXISTS stock_checkpoint_ai AFTER INSERT ON inventory_transactions BEGIN
+        {CHECKPOINT_CHANGE.format(sign="+", row="new")}
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS stock_checkpoint_ad AFTER DELETE ON inventory_transactions BEGIN
+        {CHECKPOINT_CHANGE.format(sign="-", row="old")}
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS stock_checkpoint_au
+        AFTER UPDATE OF product_id, quantity_change, transaction_date ON inventory_transactions BEGIN
+        {CHECKPOINT_CHANGE.format(sign="-", row="old")}
+        {CHECKPOINT_CHANGE.format(sign="+", row="new")}
+    END''',
+]
+
+# Cumulative ledger per product at each month end before the current month
+CHECKPOINT_REBUILD = [
+    "DELETE FROM stock_checkpoints",
+    '''INSERT INTO stock_checkpoints (product_id, checkpoint_date, quantity)
+       SELECT product_id, month_end, SUM(change) OVER (PARTITION BY product_id ORDER BY month_end)
+       FROM (SELECT product_id,
+                    date(substr(transaction_date, 1, 10), 'start of month', '+1 month', '-1 day') AS month_end,
+                    SUM(quantity_change) AS change
+             FROM inventory_transactions
+             WHERE transaction_date < date('now', 'start of month')
+             GROUP BY 1, 2
+             HAVING month_end IS NOT NULL)''',
+    '''INSERT OR REPLACE INTO stock_checkpoint_state (id, through)
+       VALUES (1, date('now', 'start of month', '-1 day'))''',
+]
+
+
+def ledger_through(product, day=None):
+    """SQL for a product's ledger total through the day (a date expression);
+    the whole ledger when day is None"""
+    latest = (f"SELECT {{column}} FROM stock_checkpoints c WHERE c.product_id = {product}"
+              + (f" AND c.checkpoint_date <= {day}" if day else "")
+              + " ORDER BY c.checkpoint_date DESC LIMIT 1")
+    return f'''
+        COALESCE(({latest.format(column="c.quantity")}), 0)
+        + COALESCE((SELECT SUM(t.quantity_change) FROM inventory_transactions t
+                    WHERE t.product_id = {product}
+                    AND t.transaction_date >= COALESCE(({latest.format(column="date(c.checkpoint_date, '+1 day')")}), '')
+                    {f"AND t.transaction_date < date({day}, '+1 day')" if day else ""}), 0)
+    '''
+
+
+# (product_id, sku, name, stock) on :as_of, for every product
+STOCK_ON_SQL = f'''
+    SELECT p.product_id, p.sku, p.name,
+           p.current_stock - ({ledger_through("p.product_id")}) + ({ledger_through("p.product_id", ":as_of")})
+    FROM products p
+'''
+
+# Month ends from :start to :through for the products that moved in them
+CHECKPOINT_ADD_SQL = f'''
+    INSERT OR REPLACE INTO stock_checkpoints (product_id, checkpoint_date, quantity)
+    SELECT m.product_id, m.month_end,
+           ({ledger_through("m.product_id", "date(:start, '-1 day')")})
+           + SUM(m.change) OVER (PARTITION BY m.product_id ORDER BY m.month_end)
+    FROM (SELECT product_id,
+                 date(substr(transaction_date, 1, 10), 'start of month', '+1 month', '-1 day') AS month_end,
+                 SUM(quantity_change) AS change
+          FROM inventory_transactions
+          WHERE transaction_date >= :start AND transaction_date < date(:through, '+1 day')
+          GROUP BY 1, 2
+          HAVING month_end IS NOT NULL) m
+'''
+
+
+def _iso(day):
+    return day.isoformat() if isinstance(day, date) else day
+
+
+def last_month_end(today=None):
+    """The last day of the month before today (the current UTC date by default)"""
+    return (today or datetime.now(timezone.utc).date()).replace(day=1) - timedelta(days=1)
+
+
+def rebuild(conn):
+    """Recompute every checkpoint from the ledger in the caller's transaction"""
+    for sql in CHECKPOINT_REBUILD:
+        conn.execute(sql)
+
+
+def checkpoint(conn, through=None):
+    """Add the month ends after the last checkpointed one, up to through
+    (the end of last month by default). Returns the checkpoints written."""
+    through = _iso(through or last_month_end())
+    row = conn.execute("SELECT through FROM stock_checkpoint_state WHERE id = 1").fetchone()
+    if row is not None and row[0] >= through:
+        return 0
+
+    start = (date.fromisoformat(row[0]) + timedelta(days=1)).isoformat() if row else '0001-01-01'
+    written = conn.execute(CHECKPOINT_ADD_SQL, {'start': start, 'through': through}).rowcount
+    conn.execute("INSERT OR REPLACE INTO stock_checkpoint_state (id, through) VALUES (1, ?)", (through,))
+    return written
+
+
+def stock_rows(conn, as_of, product_ids=None):
+    """Rows of (product_id, sku, name, stock) at the end of as_of, for the
+    given products (all by default), in product order"""
+    sql, params = STOCK_ON_SQL, {'as_of': _iso(as_of)}
+    if product_ids is not None:
+        sql += " WHERE p.product_id IN (SELECT value FROM json_each(:product_ids))"
+        params['product_ids'] = json.dumps(list(product_ids))
+    return conn.execute(sql + " ORDER BY p.product_id", params).fetchall()
+
+
+def stock_on(conn, as_of, product_ids=None):
+    """{product_id: stock} at the end of as_of"""
+    return {product_id: stock for product_id, _, _, stock in stock_rows(conn, as_of, product_ids)}
+
+
+def check(conn):
+    """Compare the stored checkpoints with the ledger; returns the differing rows.
+
+    Each difference is (product_id, checkpoint_date, stored, actual).
+    """
+    rows = conn.execute('''
+        SELECT c.product_id, c.checkpoint_date, c.quantity,
+               (SELECT COALESCE(SUM(t.quantity_change), 0) FROM inventory_transactions t
+                WHERE t.product_id = c.product_id AND t.transaction_date < date(c.checkpoint_date, '+1 day'))
+        FROM stock_checkpoints c
+    ''').fetchall()
+    return [row for row in rows if row[2] != row[3]]
+
+
+def main(db_name, command="check"):
+    import sqlite3
+
+    conn = sqlite3.connect(db_name)
+    started = time.perf_counter()
+    if command == "rebuild":
+        with conn:
+            rebuild(conn)
+        count = conn.execute("SELECT COUNT(*) FROM stock_checkpoints").fetchone()[0]
+        print(f"Rebuilt {count:,} stock checkpoints in {time.perf_counter() - started:.2f}s")
+    else:
+        drift = check(conn)
+        for product_id, checkpoint_date, stored, actual in drift[:50]:
+            print(f"product {product_id} {checkpoint_date}: stored {stored}, actual {actual}")
+        print(f"{len(drift)} checkpoints differ ({time.perf_counter() - started:.2f}s)"
+              + ("; run with 'rebuild' to repair" if drift else ""))
+    conn.close()
+
+
+if __name__ == "__main__":
+    from database import DEFAULT_DB_NAME
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_NAME,
+         sys.argv[2] if len(sys.argv) > 2 else "check")